@@ -0,0 +1,211 @@
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from Dataset.store import load_store, store_path, store_version
+from app.profiling import profiled
+
+cube_path = os.path.join(project_root, 'Dataset', 'processed', 'eda_cube.pkl')
+
+# Ringkasan per sel (kabupaten, tahun, bulan) untuk halaman EDA. Selain
+# count/sum/sumsq, tiap sel menyimpan histogram curah hujan pada bin tetap:
+# bin 0 khusus hari tanpa hujan, sisanya bin logaritmik 0,1-1000 mm. Karena
+# bin sama untuk semua sel, histogram bisa dijumlahkan per bulan/kabupaten
+# dan kuantil (box plot) dihitung dari hasil gabungannya.
+N_BINS = 128
+POSITIVE_EDGES = np.geomspace(0.1, 1000.0, N_BINS + 1)
+SCATTER_SAMPLE = 5000
+CORR_COLUMNS = ['Curah_Hujan', 'Bulan', 'Tahun', 'Tanggal', 'Label']
+SUM_COLUMNS = ['count', 'sum', 'sumsq', 'rain_days', 'wet_days']
+CORR_CHUNK = 1 << 20
+TOP_KABUPATEN = 10
+
+def hist_bins(values):
+    bins = np.searchsorted(POSITIVE_EDGES, values, side='right')
+    bins = np.clip(bins, 1, N_BINS)
+    bins[values <= 0] = 0
+    return bins
+
+@profiled('eda_cube.build_cube')
+def build_cube(path=store_path):
+    df = load_store(columns=['Date', 'Tahun', 'Bulan', 'Tanggal', 'Kabupaten', 'Curah_Hujan', 'Label'], path=path)
+    # Kode -1 (kabupaten tidak dikenal) tidak punya sel; tanpa dibuang, indeks
+    # negatif akan jatuh ke kabupaten terakhir atau membuat bincount gagal
+    known = df['Kabupaten'].cat.codes.to_numpy() >= 0
+    unknown_rows = int(len(df) - known.sum())
+    if unknown_rows:
+        df = df[known].reset_index(drop=True)
+    rain = df['Curah_Hujan'].to_numpy()
+
+    # Indeks sel dihitung di tempat agar tidak ada banyak larik int64 sementara sekaligus
+    years = np.sort(df['Tahun'].unique()).astype(np.int64)
+    cell = df['Kabupaten'].cat.codes.to_numpy().astype(np.int64)
+    cell *= len(years)
+    cell += np.searchsorted(years, df['Tahun'].to_numpy())
+    cell *= 12
+    cell += df['Bulan'].to_numpy() - 1
+
+    n_cells = len(df['Kabupaten'].cat.categories) * len(years) * 12
+    count = np.bincount(cell, minlength=n_cells)
+    index = cell * (N_BINS + 1)
+    index += hist_bins(rain)
+    hist = np.bincount(index, minlength=n_cells * (N_BINS + 1)).reshape(n_cells, N_BINS + 1).astype(np.int32)
+    del index
+    # dtype sama dengan kolom hujan: ufunc.at jauh lebih lambat jika harus mengonversi tipe
+    low = np.full(n_cells, np.inf, dtype=rain.dtype)
+    high = np.full(n_cells, -np.inf, dtype=rain.dtype)
+    np.minimum.at(low, cell, rain)
+    np.maximum.at(high, cell, rain)
+
+    index = np.arange(n_cells)
+    cells = pd.DataFrame({
+        'Kabupaten': pd.Categorical.from_codes(index // (len(years) * 12), df['Kabupaten'].cat.categories),
+        'Tahun': years[index // 12 % len(years)],
+        'Bulan': index % 12 + 1,
+        'count': count,
+        'sum': np.bincount(cell, weights=rain, minlength=n_cells),
+        'sumsq': np.bincount(cell, weights=np.square(rain, dtype=np.float64), minlength=n_cells),
+        'rain_days': np.bincount(cell, weights=df['Label'].to_numpy(), minlength=n_cells).astype(np.int64),
+        'wet_days': np.bincount(cell, weights=rain > 0, minlength=n_cells).astype(np.int64),
+        'min': low.astype(np.float64),
+        'max': high.astype(np.float64),
+    })
+    # Sel kosong (kabupaten tanpa data di tahun/bulan itu) dibuang
+    keep = count > 0
+    cells, hist = cells[keep].reset_index(drop=True), hist[keep]
+    cells = pd.concat([cells, box_stats(cells, hist)[['q1', 'median', 'q3']]], axis=1)
+
+    sample = df[['Bulan', 'Curah_Hujan']].sample(min(SCATTER_SAMPLE, len(df)), random_state=42)
+    return {
+        'version': store_version(path),
+        'rows': len(df),
+        'unknown_rows': unknown_rows,
+        'date_min': df['Date'].min(),
+        'date_max': df['Date'].max(),
+        'cells': cells,
+        'hist': hist,
+        'corr': corr_matrix(df, CORR_COLUMNS),
+        'sample': sample.reset_index(drop=True),
+    }
+
+def corr_matrix(df, columns, chunk=CORR_CHUNK):
+    # Korelasi Pearson dari jumlah dan perkalian silang per potongan baris,
+    # tanpa menyalin seluruh kolom ke satu matriks float64
+    total = np.zeros(len(columns))
+    cross = np.zeros((len(columns), len(columns)))
+    for start in range(0, len(df), chunk):
+        block = np.column_stack([df[column].to_numpy()[start:start + chunk] for column in columns]).astype(np.float64)
+        total += block.sum(axis=0)
+        cross += block.T @ block
+    n = len(df)
+    cov = cross / n - np.outer(total / n, total / n)
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = cov / np.outer(std, std)
+    np.fill_diagonal(corr, 1.0)
+    return pd.DataFrame(corr, index=columns, columns=columns)
+
+def save_cube(cube, path=cube_path):
+    tmp = path + '.tmp'
+    pd.to_pickle(cube, tmp)
+    os.replace(tmp, path)
+
+def load_cube(path=cube_path, store=store_path):
+    # Cube dibangun ulang jika belum ada atau store sudah berubah sejak cube ditulis
+    version = store_version(store)
+    if os.path.exists(path):
+        cube = pd.read_pickle(path)
+        if cube.get('version') == version:
+            return cube
+    cube = build_cube(store)
+    try:
+        save_cube(cube, path)
+    except OSError:
+        pass
+    return cube
+
+def merge_cells(cube, by):
+    # Jumlahkan sel per kolom `by`; histogram ikut dijumlahkan agar kuantil tetap bisa dihitung
+    cells = cube['cells']
+    if isinstance(cells[by].dtype, pd.CategoricalDtype):
+        codes, groups = np.unique(cells[by].cat.codes, return_inverse=True)
+        keys = cells[by].cat.categories[codes]
+    else:
+        keys, groups = np.unique(cells[by], return_inverse=True)
+    # Sel diurutkan per grup lalu dijumlahkan per potongan (reduceat jauh lebih cepat dari np.add.at).
+    # Sel sudah terurut per kabupaten, jadi untuk Kabupaten tidak perlu disalin ulang.
+    order = slice(None) if np.all(groups[:-1] <= groups[1:]) else np.argsort(groups, kind='stable')
+    starts = np.searchsorted(groups[order], np.arange(len(keys)))
+    merged = pd.DataFrame({by: keys})
+    for column in SUM_COLUMNS:
+        merged[column] = np.add.reduceat(cells[column].to_numpy()[order], starts)
+    merged['min'] = np.minimum.reduceat(cells['min'].to_numpy()[order], starts)
+    merged['max'] = np.maximum.reduceat(cells['max'].to_numpy()[order], starts)
+    hist = np.add.reduceat(cube['hist'][order], starts, axis=0, dtype=np.int64)
+    merged['mean'] = merged['sum'] / merged['count']
+    return merged, hist
+
+def hist_quantile(hist, q, low, high):
+    # Kuantil dari histogram: bin ditemukan lewat jumlah kumulatif, lalu
+    # posisi di dalam bin diinterpolasi secara geometris antara tepi bin
+    total = hist.sum(axis=1)
+    cum = np.cumsum(hist, axis=1)
+    target = q * total
+    b = np.minimum((cum < target[:, None]).sum(axis=1), N_BINS)
+    before = np.where(b > 0, np.take_along_axis(cum, np.maximum(b - 1, 0)[:, None], axis=1)[:, 0], 0)
+    inside = np.take_along_axis(hist, b[:, None], axis=1)[:, 0]
+    frac = np.clip((target - before) / np.maximum(inside, 1), 0, 1)
+    lo = POSITIVE_EDGES[np.maximum(b - 1, 0)]
+    hi = POSITIVE_EDGES[np.maximum(b, 1)]
+    value = np.where(b == 0, 0.0, lo * (hi / lo) ** frac)
+    return np.clip(value, low, high)
+
+def box_stats(merged, hist):
+    low, high = merged['min'].to_numpy(), merged['max'].to_numpy()
+    q1 = hist_quantile(hist, 0.25, low, high)
+    median = hist_quantile(hist, 0.5, low, high)
+    q3 = hist_quantile(hist, 0.75, low, high)
+    iqr = q3 - q1
+    count = merged['count'].to_numpy()
+    mean = merged['sum'].to_numpy() / count
+    var = np.maximum(merged['sumsq'].to_numpy() / count - mean ** 2, 0)
+    return pd.DataFrame({
+        'q1': q1, 'median': median, 'q3': q3,
+        'lowerfence': np.maximum(low, q1 - 1.5 * iqr),
+        'upperfence': np.minimum(high, q3 + 1.5 * iqr),
+        'mean': mean, 'sd': np.sqrt(var),
+    })
+
+def page_summary(cube):
+    # Semua tabel kecil yang digambar halaman EDA; dihitung sekali per versi data
+    by_month, hist_month = merge_cells(cube, 'Bulan')
+    by_year, _ = merge_cells(cube, 'Tahun')
+    by_kab, hist_kab = merge_cells(cube, 'Kabupaten')
+    top = by_kab['mean'].nlargest(TOP_KABUPATEN).index
+    return {
+        'rows': cube['rows'],
+        'n_kabupaten': len(by_kab),
+        'date_min': cube['date_min'],
+        'date_max': cube['date_max'],
+        'by_month': by_month,
+        'by_year': by_year,
+        'box_month': box_stats(by_month, hist_month),
+        'top_kabupaten': by_kab.loc[top, 'Kabupaten'].astype(str).to_numpy(),
+        'box_kabupaten': box_stats(by_kab.loc[top], hist_kab[top]),
+        'rain_days': int(cube['cells']['rain_days'].sum()),
+        'corr': cube['corr'],
+        'sample': cube['sample'],
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bangun cube agregat untuk halaman EDA")
+    parser.add_argument("--output", default=cube_path)
+    args = parser.parse_args()
+    cube = build_cube()
+    save_cube(cube, args.output)
+    print(f"Cube EDA: {len(cube['cells'])} sel dari {cube['rows']} baris -> {args.output}")
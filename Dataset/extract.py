@@ -1,7 +1,38 @@
 import pdfplumber
 import pandas as pd
+import numpy as np
 import re
 import os
+import sys
+import glob
+import json
+import hashlib
+import argparse
+from pdfminer.pdftypes import resolve1
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+EXTRACTOR_VERSION = "2"
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+input_root = os.path.join(project_root, 'Dataset', 'Input')
+output_root = os.path.join(project_root, 'Dataset', 'Output')
+manifest_file = os.path.join(output_root, '.extract_manifest.json')
+page_cache_dir = os.path.join(project_root, 'Dataset', '.cache', 'pages')
+sys.path.insert(0, project_root)
+
+from app.profiling import count, profiled, span
+
+META_COLS = ["Nama Pos", "Kabupaten", "Kecamatan"]
+MONTH_COLS = ["Jan", "Feb", "Mar", "Apr", "Mei", "Jun",
+              "Jul", "Ags", "Sep", "Okt", "Nov", "Des"]
+OUTPUT_COLS = META_COLS + ["Tanggal"] + MONTH_COLS
+
+# PDF yang nama output-nya tidak sama dengan nama file input
+OUTPUT_NAMES = {
+    "PUBLIKASI CURAH HUJAN 2024_compressed": "data",
+}
+
+PAGES_PER_TASK = 15
 
 def clean_num(x):
     if x is None:
@@ -19,7 +50,7 @@ def clean_num(x):
 def extract_metadata_from_text(text):
     meta = {}
     patterns = {
-        "Nama Pos": r"(Nama Pos|Pos)\s*[: ]+\s*(.+)",
+        "Nama Pos": r"(Nama Pos|Nama Stasiun|Pos)\s*[: ]+\s*(.+)",
         "Kabupaten": r"(Kabupaten|Kota/Kabupaten)\s*[: ]+\s*(.+)",
         "Kecamatan": r"(Kecamatan)\s*[: ]+\s*(.+)"
     }
@@ -29,47 +60,6 @@ def extract_metadata_from_text(text):
             meta[key] = m.group(2).strip()
     return meta
 
-def extract_metadata_from_table(page):
-    meta = {}
-    # GANTI: Gunakan extract_tables() (jamak) untuk mengambil SEMUA tabel di halaman,
-    # termasuk tabel header kecil di atas.
-    tables = page.extract_tables()
-    
-    if not tables:
-        return meta
-
-    for table in tables:
-        for row in table:
-            # Pastikan row memiliki data dan minimal 2 kolom
-            # Filter None values agar tidak error saat di-strip()
-            clean_row = [str(x).strip() if x is not None else "" for x in row]
-            
-            if len(clean_row) < 2:
-                continue
-
-            key = clean_row[0].lower() # Ubah ke huruf kecil biar gampang ceknya
-            value = clean_row[1]
-
-            # Lewati jika key kosong
-            if not key:
-                continue
-
-            # LOGIKA PENCOCOKAN
-            # Cek variasi "Nama Stasiun" atau "Nama Pos"
-            if "nama stasiun" in key or "nama pos" in key or "stasiun" in key:
-                # Ambil value, tapi jika value kosong, coba cek kolom berikutnya (jika ada)
-                if value == "" and len(clean_row) > 2:
-                    value = clean_row[2] # Kadang ada kolom kosong di tengah
-                meta["Nama Pos"] = value
-            
-            elif "kabupaten" in key or "kota" in key:
-                meta["Kabupaten"] = value
-                
-            elif "kecamatan" in key:
-                meta["Kecamatan"] = value
-
-    return meta
-
 def parse_table_line(line):
     parts = line.strip().split()
     if len(parts) < 13:
@@ -82,34 +72,106 @@ def parse_table_line(line):
     nums = [clean_num(x) for x in parts[1:13]]
     return day, nums
 
-def process_pdf(pdf_path):
-    all_rows = []
-    last_meta = {"Nama Pos": None, "Kabupaten": None, "Kecamatan": None}
+@profiled('extract.parse_page')
+def parse_page(page):
+    # Satu kali analisis layout per halaman: metadata dan baris tabel
+    # sama-sama diambil dari teks hasil extract_text().
+    text = page.extract_text() or ""
+    meta = extract_metadata_from_text(text)
+    rows = []
+    for line in text.splitlines():
+        parsed = parse_table_line(line)
+        if not parsed:
+            continue
+        day, nums = parsed
+        rows.append([day, *nums])
+    return meta, rows
+
+@profiled('extract.page_key')
+def page_key(page):
+    # Hash content stream halaman (+ XObject yang dipakai) dan versi ekstraktor
+    h = hashlib.sha256(EXTRACTOR_VERSION.encode())
+    for stream in page.page_obj.contents:
+        h.update(resolve1(stream).get_data())
+    resources = resolve1(page.page_obj.resources) or {}
+    xobjects = resolve1(resources.get("XObject")) or {}
+    for name in sorted(xobjects):
+        h.update(name.encode())
+        h.update(resolve1(xobjects[name]).get_data())
+    return h.hexdigest()
+
+def cache_path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], key + ".json")
+
+def cache_get(cache_dir, key):
+    path = cache_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+        return entry["meta"], entry["rows"]
+    except (ValueError, KeyError):
+        return None
+
+def cache_put(cache_dir, key, meta, rows):
+    path = cache_path(cache_dir, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"meta": meta, "rows": rows}, f)
+    os.replace(tmp, path)
+
+@profiled('extract.read_page_range')
+def read_page_range(pdf_path, start=0, stop=None, cache_dir=None):
+    pages = []
+    stats = {"hit": 0, "miss": 0}
     with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text() or ""
-            meta = extract_metadata_from_text(text)
-            table_meta = extract_metadata_from_table(page)
-            if table_meta:
-                meta.update(table_meta)
-            if meta:
-                last_meta.update(meta)
-            for line in text.splitlines():
-                parsed = parse_table_line(line)
-                if not parsed:
-                    continue
-                day, nums = parsed
-                all_rows.append({
-                    "Nama Pos": last_meta.get("Nama Pos") or "Unknown",
-                    "Kabupaten": last_meta.get("Kabupaten") or "Unknown",
-                    "Kecamatan": last_meta.get("Kecamatan") or "Unknown",
-                    "Tanggal": day,
-                    "Jan": nums[0], "Feb": nums[1], "Mar": nums[2],
-                    "Apr": nums[3], "Mei": nums[4], "Jun": nums[5],
-                    "Jul": nums[6], "Ags": nums[7], "Sep": nums[8],
-                    "Okt": nums[9], "Nov": nums[10], "Des": nums[11]
-                })
-    return pd.DataFrame(all_rows)
+        for page in pdf.pages[start:stop]:
+            with span('extract.page', pdf=os.path.basename(pdf_path), page=page.page_number):
+                key = page_key(page) if cache_dir else None
+                cached = cache_get(cache_dir, key) if cache_dir else None
+                if cached is not None:
+                    stats["hit"] += 1
+                    count('extract.cache_hit')
+                    meta, rows = cached
+                else:
+                    meta, rows = parse_page(page)
+                    if cache_dir:
+                        stats["miss"] += 1
+                        count('extract.cache_miss')
+                        cache_put(cache_dir, key, meta, rows)
+                pages.append((key, meta, rows))
+                page.close()
+    return pages, stats
+
+def iter_rows(pages):
+    # Metadata stasiun terbawa ke halaman berikutnya sampai ada header baru
+    last_meta = {"Nama Pos": None, "Kabupaten": None, "Kecamatan": None}
+    for _, meta, rows in pages:
+        if meta:
+            last_meta.update(meta)
+        nama_pos = last_meta.get("Nama Pos") or "Unknown"
+        kabupaten = last_meta.get("Kabupaten") or "Unknown"
+        kecamatan = last_meta.get("Kecamatan") or "Unknown"
+        for row in rows:
+            yield (nama_pos, kabupaten, kecamatan, *row)
+
+@profiled('extract.rows_to_frame')
+def rows_to_frame(rows):
+    columns = list(zip(*rows))
+    if not columns:
+        return pd.DataFrame()
+    data = {name: list(columns[i]) for i, name in enumerate(META_COLS)}
+    data["Tanggal"] = np.array(columns[3], dtype=np.int64)
+    for i, name in enumerate(MONTH_COLS, start=4):
+        data[name] = np.array(columns[i], dtype=np.float64)
+    return pd.DataFrame(data, columns=OUTPUT_COLS)
+
+@profiled('extract.process_pdf')
+def process_pdf(pdf_path, cache_dir=None):
+    pages, _ = read_page_range(pdf_path, cache_dir=cache_dir)
+    return rows_to_frame(iter_rows(pages))
 
 def save_output(df, output_folder, filename):
     if df.empty:
@@ -119,7 +181,143 @@ def save_output(df, output_folder, filename):
     file_path = os.path.join(output_folder, filename + ".csv")
     df.to_csv(file_path, index=False)
 
-if __name__ == "__main__":
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def load_manifest(path=manifest_file):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(manifest, path=manifest_file):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def find_pdfs(input_folder=input_root):
+    jobs = []
+    for pdf_path in sorted(glob.glob(os.path.join(input_folder, "*", "*.pdf"))):
+        year = os.path.basename(os.path.dirname(pdf_path))
+        stem = os.path.splitext(os.path.basename(pdf_path))[0]
+        jobs.append((pdf_path, year, OUTPUT_NAMES.get(stem, stem)))
+    return jobs
+
+def count_pages(pdf_path):
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+def page_ranges(n_pages, pages_per_task=PAGES_PER_TASK):
+    return [(start, min(start + pages_per_task, n_pages))
+            for start in range(0, max(n_pages, 1), pages_per_task)]
+
+def load_cache_index(cache_dir):
+    return load_manifest(os.path.join(cache_dir, "index.json"))
+
+def prune_page_cache(cache_dir, index, sources):
+    # Buang entri milik PDF yang sudah tidak ada, lalu hapus halaman
+    # yang tidak lagi dirujuk oleh PDF mana pun.
+    for source in list(index):
+        if source not in sources:
+            del index[source]
+    live = {key for keys in index.values() for key in keys}
+    removed = 0
+    for path in glob.glob(os.path.join(cache_dir, "*", "*.json")):
+        if os.path.splitext(os.path.basename(path))[0] not in live:
+            os.remove(path)
+            removed += 1
+    save_manifest(index, os.path.join(cache_dir, "index.json"))
+    return removed
+
+@profiled('extract.process_all')
+def process_all(input_folder=input_root, output_folder=output_root,
+                workers=None, pages_per_task=PAGES_PER_TASK, force=False,
+                cache_dir=page_cache_dir):
+    manifest_path = os.path.join(output_folder, '.extract_manifest.json')
+    manifest = {} if force else load_manifest(manifest_path)
+    cache_index = load_cache_index(cache_dir) if cache_dir else {}
+    stats = {"hit": 0, "miss": 0}
+
+    pending = []
+    sources = set()
+    skipped = 0
+    for pdf_path, year, name in find_pdfs(input_folder):
+        key = os.path.relpath(pdf_path, input_folder).replace(os.sep, "/")
+        sources.add(key)
+        digest = file_hash(pdf_path)
+        out_file = os.path.join(output_folder, year, name + ".csv")
+        entry = manifest.get(key)
+        if (entry and entry.get("sha256") == digest
+                and entry.get("version") == EXTRACTOR_VERSION
+                and os.path.exists(out_file)):
+            skipped += 1
+            continue
+        pending.append((key, pdf_path, year, name, digest))
+
+    print(f"{len(pending)} PDF akan diproses, {skipped} PDF tidak berubah (skip).")
+    for key in set(manifest) - sources:
+        del manifest[key]
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            chunks = {}
+            for key, pdf_path, year, name, digest in pending:
+                ranges = page_ranges(count_pages(pdf_path), pages_per_task)
+                chunks[key] = [None] * len(ranges)
+                for i, (start, stop) in enumerate(ranges):
+                    fut = pool.submit(read_page_range, pdf_path, start, stop, cache_dir)
+                    futures[fut] = (key, i)
+
+            info = {key: (year, name, digest) for key, _, year, name, digest in pending}
+            for fut in as_completed(futures):
+                key, i = futures[fut]
+                try:
+                    pages, chunk_stats = fut.result()
+                    chunks[key][i] = pages
+                    stats["hit"] += chunk_stats["hit"]
+                    stats["miss"] += chunk_stats["miss"]
+                except Exception as e:
+                    print(f"Error memproses {key} (bagian {i}): {e}")
+                    chunks[key][i] = e
+                if any(part is None for part in chunks[key]):
+                    continue
+
+                parts = chunks.pop(key)
+                if any(isinstance(part, Exception) for part in parts):
+                    continue
+                pages = [page for part in parts for page in part]
+                year, name, digest = info[key]
+                df = rows_to_frame(iter_rows(pages))
+                save_output(df, os.path.join(output_folder, year), name)
+                if cache_dir:
+                    cache_index[key] = [k for k, _, _ in pages]
+                manifest[key] = {
+                    "sha256": digest,
+                    "version": EXTRACTOR_VERSION,
+                    "rows": len(df),
+                    "output": f"{year}/{name}.csv",
+                }
+                save_manifest(manifest, manifest_path)
+                print(f"Selesai: {key} -> {year}/{name}.csv ({len(df)} baris)")
+
+    if cache_dir:
+        removed = prune_page_cache(cache_dir, cache_index, sources)
+        total = stats["hit"] + stats["miss"]
+        rate = stats["hit"] / total if total else 0.0
+        print(f"Cache halaman: {stats['hit']} hit, {stats['miss']} miss "
+              f"({rate:.0%} hit), {removed} entri basi dihapus.")
+    save_manifest(manifest, manifest_path)
+
+    return manifest
+
+def interactive():
     pdf_path = input("Masukkan path file PDF: ").strip()
     output_folder = input("Masukkan folder output: ").strip()
     output_name = input("Masukkan nama file output (tanpa .csv): ").strip()
@@ -127,3 +325,24 @@ if __name__ == "__main__":
         exit()
     df = process_pdf(pdf_path)
     save_output(df, output_folder, output_name)
+
+if __name__ == "__main__":
+    if len(sys.argv) == 1:
+        interactive()
+    else:
+        parser = argparse.ArgumentParser(description="Ekstraksi data curah hujan dari PDF PUSDATARU")
+        parser.add_argument("--batch", action="store_true", help="proses semua PDF di Dataset/Input/<tahun>/")
+        parser.add_argument("--input", default=input_root)
+        parser.add_argument("--output", default=output_root)
+        parser.add_argument("--workers", type=int, default=None)
+        parser.add_argument("--pages-per-task", type=int, default=PAGES_PER_TASK)
+        parser.add_argument("--force", action="store_true", help="abaikan manifest, proses ulang semua PDF")
+        parser.add_argument("--cache-dir", default=page_cache_dir, help="lokasi cache hasil parsing per halaman")
+        parser.add_argument("--no-cache", action="store_true", help="jangan pakai cache halaman")
+        args = parser.parse_args()
+        if args.batch:
+            cache_dir = None if args.no_cache else args.cache_dir
+            process_all(args.input, args.output, args.workers, args.pages_per_task,
+                        args.force, cache_dir)
+        else:
+            interactive()
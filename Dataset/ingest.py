@@ -0,0 +1,326 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from Dataset.store import EPOCH, load_store, read_stations, store_exists, store_path, store_version
+from app.profiling import profiled, count
+
+ingest_path = os.path.join(project_root, 'Dataset', 'processed', 'ingest')
+
+# Pembacaan harian (pos, tanggal, curah hujan) ditambahkan ke log JSONL yang
+# hanya bisa ditambah. State per pos (nilai terakhir dan jumlah jendela
+# 3/7/14/30 hari yang berakhir di hari terakhir) diperbarui O(1) per
+# observasi, lalu snapshot berisi state dan rata-rata harian per kabupaten
+# ditulis ulang secara atomik. Aplikasi cukup menggabungkan rata-rata harian
+# itu ke lookup yang sudah dimuat, tanpa membaca ulang store.
+WINDOWS = (3, 7, 14, 30)
+HISTORY = max(WINDOWS)
+SNAPSHOT_FORMAT = 1
+
+def log_file(path=ingest_path):
+    return os.path.join(path, 'log.jsonl')
+
+def snapshot_file(path=ingest_path):
+    return os.path.join(path, 'snapshot.pkl')
+
+def to_day(value):
+    # Tanggal di log selalu berformat YYYY-MM-DD
+    return int(np.datetime64(value, 'D').astype(np.int64))
+
+class StationState:
+    # Ring berisi curah hujan HISTORY hari terakhir (NaN = tidak ada bacaan),
+    # diindeks dengan nomor hari modulo HISTORY
+    __slots__ = ('last_day', 'ring', 'sums', 'counts')
+
+    def __init__(self):
+        self.last_day = None
+        self.ring = [np.nan] * HISTORY
+        self.sums = [0.0] * len(WINDOWS)
+        self.counts = [0] * len(WINDOWS)
+
+    @property
+    def last_value(self):
+        return np.nan if self.last_day is None else self.ring[self.last_day % HISTORY]
+
+    def add(self, day, value):
+        # Hari baru: jendela digeser maju paling banyak HISTORY langkah.
+        # Hari lama yang masih di dalam ring: hanya jendela pos ini dihitung ulang.
+        if self.last_day is not None and day <= self.last_day:
+            if self.last_day - day >= HISTORY:
+                return 'stale'
+            self.ring[day % HISTORY] = value
+            self.recompute()
+            return 'late'
+        if self.last_day is None or day - self.last_day >= HISTORY:
+            self.ring = [np.nan] * HISTORY
+            self.last_day = day - 1
+            self.recompute()
+        for t in range(self.last_day + 1, day + 1):
+            for i, w in enumerate(WINDOWS):
+                leaving = self.ring[(t - w) % HISTORY]
+                if leaving == leaving:
+                    self.sums[i] -= leaving
+                    self.counts[i] -= 1
+            current = value if t == day else np.nan
+            self.ring[t % HISTORY] = current
+            if current == current:
+                for i in range(len(WINDOWS)):
+                    self.sums[i] += current
+                    self.counts[i] += 1
+        self.last_day = day
+        return 'new'
+
+    def to_tuple(self):
+        return self.last_day, self.ring, self.sums, self.counts
+
+    @classmethod
+    def from_tuple(cls, values):
+        state = cls()
+        state.last_day, state.ring, state.sums, state.counts = values
+        return state
+
+    def recompute(self):
+        for i, w in enumerate(WINDOWS):
+            values = [self.ring[(self.last_day - k) % HISTORY] for k in range(w)]
+            values = [v for v in values if v == v]
+            self.sums[i] = float(sum(values))
+            self.counts[i] = len(values)
+
+class Ingestor:
+    def __init__(self, path=ingest_path, store=store_path):
+        self.path = path
+        self.store = store
+        self.store_version = store_version(store) if store_exists(store) else None
+        self.store_last_day = None
+        self.seq = 0
+        self.offset = 0
+        # Pos dikenali dari (nama bersih, kabupaten), sama dengan katalog stasiun store
+        self.stations = {}
+        # (kabupaten, hari) -> {pos: curah hujan} dari ingest, dan bacaan store
+        # untuk hari yang sama (dimuat hanya jika bacaan ingest jatuh di rentang store)
+        self.readings = {}
+        self.base = {}
+        self.daily = {}
+        self.partitions = {}
+
+    @classmethod
+    def open(cls, path=ingest_path, store=store_path):
+        # Lanjut dari snapshot jika store belum berubah, lalu putar ulang sisa log
+        os.makedirs(path, exist_ok=True)
+        ingestor = None
+        if os.path.exists(snapshot_file(path)):
+            snapshot = load_snapshot(path)
+            state = snapshot.get('state')
+            current = store_version(store) if store_exists(store) else None
+            if snapshot.get('format') == SNAPSHOT_FORMAT and snapshot.get('store_version') == current:
+                ingestor = cls(path, store)
+                for name, value in state.items():
+                    setattr(ingestor, name, value)
+                ingestor.stations = {key: StationState.from_tuple(values) for key, values in state['stations'].items()}
+                ingestor.seq, ingestor.offset = snapshot['seq'], snapshot['offset']
+        if ingestor is None:
+            ingestor = cls(path, store)
+            ingestor.seed()
+        ingestor.replay()
+        return ingestor
+
+    @profiled('ingest.seed')
+    def seed(self):
+        # State awal tiap pos dari HISTORY hari terakhir datanya di store
+        if not store_exists(self.store):
+            return
+        catalog = read_stations(self.store)
+        df = load_store(columns=['Date', 'Stasiun', 'Curah_Hujan'], path=self.store)
+        if df.empty:
+            return
+        days = ((df['Date'].to_numpy().astype('datetime64[D]') - EPOCH).astype(np.int64))
+        self.store_last_day = int(days.max())
+        station = df['Stasiun'].to_numpy()
+        last = pd.Series(days).groupby(station).transform('max').to_numpy()
+        recent = np.flatnonzero(days > last - HISTORY)
+        recent = recent[np.lexsort((days[recent], station[recent]))]
+        rain = df['Curah_Hujan'].to_numpy()
+        for i in recent:
+            s = catalog[station[i]]
+            self.stations.setdefault((s['name'], s['kabupaten']), StationState()).add(int(days[i]), float(rain[i]))
+
+    def store_rows(self, kabupaten, day):
+        # Bacaan store untuk satu (kabupaten, hari); partisi tahunnya dibaca sekali lewat mmap
+        year = int(str((EPOCH + np.timedelta64(day, 'D')).astype('datetime64[Y]')))
+        if year not in self.partitions:
+            catalog = read_stations(self.store)
+            df = load_store(columns=['Date', 'Stasiun', 'Kabupaten', 'Curah_Hujan'], years={year}, path=self.store)
+            days = (df['Date'].to_numpy().astype('datetime64[D]') - EPOCH).astype(np.int64)
+            self.partitions[year] = (days, df['Kabupaten'].astype(str).to_numpy(), df['Stasiun'].to_numpy(),
+                                     df['Curah_Hujan'].to_numpy(), catalog)
+        days, kab, station, rain, catalog = self.partitions[year]
+        rows = {}
+        for i in np.flatnonzero((days == day) & (kab == kabupaten)):
+            s = catalog[station[i]]
+            rows.setdefault((s['name'], s['kabupaten']), []).append(float(rain[i]))
+        return rows
+
+    def apply(self, record):
+        day = to_day(record['date'])
+        key = (record['station'], record['kabupaten'])
+        value = float(record['rain'])
+        status = self.stations.setdefault(key, StationState()).add(day, value)
+
+        cell = (record['kabupaten'], day)
+        readings = self.readings.setdefault(cell, {})
+        if key in readings:
+            status = 'correction'
+        readings[key] = value
+        if self.store_last_day is not None and day <= self.store_last_day and cell not in self.base:
+            self.base[cell] = self.store_rows(*cell)
+        # Rata-rata kabupaten = semua bacaan hari itu; bacaan ingest menggantikan
+        # bacaan store dari pos yang sama
+        values = [v for station, vs in self.base.get(cell, {}).items() if station not in readings for v in vs]
+        values.extend(readings.values())
+        self.daily[cell] = float(np.mean(values))
+        count(f'ingest.{status}')
+        return status
+
+    def replay(self):
+        if not os.path.exists(log_file(self.path)):
+            return 0
+        n = 0
+        with open(log_file(self.path), 'rb') as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                record = json.loads(line)
+                self.apply(record)
+                self.seq = record['seq']
+                self.offset += len(line)
+                n += 1
+        return n
+
+    @profiled('ingest.append')
+    def append(self, records):
+        # Log ditulis (dan di-fsync) dulu, baru state diperbarui: snapshot selalu bisa
+        # dibangun ulang dari log
+        stats = {'new': 0, 'late': 0, 'stale': 0, 'correction': 0}
+        if not records:
+            return stats
+        lines = []
+        for record in records:
+            self.seq += 1
+            lines.append(json.dumps({'seq': self.seq, 'ts': time.time(), **record}, ensure_ascii=False) + '\n')
+        data = ''.join(lines).encode('utf-8')
+        with open(log_file(self.path), 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        for line in lines:
+            stats[self.apply(json.loads(line))] += 1
+        self.offset += len(data)
+        return stats
+
+    def station_table(self):
+        rows = []
+        for (name, kabupaten), state in self.stations.items():
+            row = {'Nama Pos': name, 'Kabupaten': kabupaten,
+                   'Date': EPOCH + np.timedelta64(state.last_day, 'D'), 'Curah_Hujan': state.last_value}
+            for w, total, n in zip(WINDOWS, state.sums, state.counts):
+                row[f'sum_{w}'] = total
+                row[f'count_{w}'] = n
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def daily_frame(self):
+        cells = sorted(self.daily)
+        return pd.DataFrame({
+            'Kabupaten': [kab for kab, _ in cells],
+            'Date': EPOCH + np.array([day for _, day in cells], dtype='timedelta64[D]'),
+            'Curah_Hujan': np.array([self.daily[cell] for cell in cells], dtype=np.float64),
+        })
+
+    @profiled('ingest.publish')
+    def publish(self):
+        snapshot = {
+            'format': SNAPSHOT_FORMAT,
+            'store_version': self.store_version,
+            'seq': self.seq,
+            'offset': self.offset,
+            'published': time.time(),
+            'daily': self.daily_frame(),
+            'stations': self.station_table(),
+            # State pos disimpan sebagai tuple biasa agar snapshot bisa dibaca proses lain
+            'state': {
+                'store_last_day': self.store_last_day,
+                'stations': {key: state.to_tuple() for key, state in self.stations.items()},
+                'readings': self.readings,
+                'base': self.base,
+                'daily': self.daily,
+            },
+        }
+        tmp = snapshot_file(self.path) + '.tmp'
+        pd.to_pickle(snapshot, tmp)
+        os.replace(tmp, snapshot_file(self.path))
+        return snapshot
+
+def snapshot_token(path=ingest_path):
+    # Murah dicek setiap rerun/interval: berubah setiap kali snapshot diterbitkan
+    try:
+        return os.stat(snapshot_file(path)).st_mtime_ns
+    except OSError:
+        return None
+
+def load_snapshot(path=ingest_path):
+    return pd.read_pickle(snapshot_file(path))
+
+def with_snapshot(lookup, path=ingest_path):
+    # Lookup dasar ditambah rata-rata harian dari snapshot ingest terbaru (jika ada)
+    if snapshot_token(path) is None:
+        return lookup
+    from app.forecast import apply_observations
+    snapshot = load_snapshot(path)
+    return apply_observations(lookup, snapshot['daily'], snapshot['seq'])
+
+def read_observations(path):
+    # CSV dengan kolom Date, Nama Pos, Kabupaten, Curah_Hujan (nama sama dengan data training)
+    from Dataset.preprocessing import clean_kabupaten, clean_station_name
+    df = pd.read_csv(path, dtype={'Nama Pos': str, 'Kabupaten': str})
+    df['Kabupaten'] = df['Kabupaten'].map(clean_kabupaten)
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df['Curah_Hujan'] = pd.to_numeric(df['Curah_Hujan'], errors='coerce')
+    valid = df['Date'].notna() & (df['Curah_Hujan'] >= 0) & df['Nama Pos'].notna() & df['Kabupaten'].notna()
+    df = df[valid]
+    records = [{'date': date.strftime('%Y-%m-%d'), 'station': clean_station_name(name),
+                'kabupaten': kabupaten, 'rain': float(rain)}
+               for date, name, kabupaten, rain in df[['Date', 'Nama Pos', 'Kabupaten', 'Curah_Hujan']].itertuples(index=False)]
+    return records, int((~valid).sum())
+
+def ingest_file(path, ingest_dir=ingest_path, store=store_path):
+    records, rejected = read_observations(path)
+    ingestor = Ingestor.open(ingest_dir, store)
+    stats = ingestor.append(records)
+    ingestor.publish()
+    stats['rejected'] = rejected
+    return ingestor, stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tambahkan bacaan harian pos hujan ke log ingest dan terbitkan snapshot baru")
+    parser.add_argument("input", nargs='?', help="CSV berisi kolom Date, Nama Pos, Kabupaten, Curah_Hujan")
+    parser.add_argument("--rebuild", action="store_true", help="bangun ulang snapshot dari store dan seluruh log")
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(snapshot_file()):
+        os.remove(snapshot_file())
+    if args.input:
+        ingestor, stats = ingest_file(args.input)
+        print(f"{sum(stats.values())} baris: {stats['new']} baru, {stats['late']} terlambat, "
+              f"{stats['correction']} koreksi, {stats['stale']} di luar jendela, {stats['rejected']} ditolak")
+    else:
+        ingestor = Ingestor.open()
+        ingestor.publish()
+    print(f"Snapshot #{ingestor.seq}: {len(ingestor.stations)} pos, {len(ingestor.daily)} hari-kabupaten -> {snapshot_file()}")
@@ -1,11 +1,25 @@
 import os
+import sys
+import json
+import hashlib
+import argparse
+import numpy as np
 import pandas as pd
 import glob
+import re
 
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
 
-raw_data_path = os.path.join(project_root, 'dataset', 'output')
-processed_path = os.path.join(project_root, 'dataset', 'processed')
+from Dataset.store import write_store, store_is_current, store_path, load_store
+from app.modelling.features import build_lag_table, save_lag_table, lag_table_path
+from app.profiling import profiled, span
+from Dataset.eda_cube import build_cube, save_cube, cube_path
+
+raw_data_path = os.path.join(project_root, 'Dataset', 'Output')
+processed_path = os.path.join(project_root, 'Dataset', 'processed')
+output_file = os.path.join(processed_path, 'data_training_gabungan.csv')
+manifest_file = os.path.join(processed_path, 'manifest.json')
 
 os.makedirs(processed_path, exist_ok=True)
 
@@ -14,72 +28,190 @@ month_map = {
     'Jul': 7, 'Ags': 8, 'Sep': 9, 'Okt': 10, 'Nov': 11, 'Des': 12
 }
 
-def process_data():
-    all_data = []
-    
-    years = range(2019, 2025) 
-    
-    print("Mulai memproses data...")
-    
-    for year in years:
-        year_path = os.path.join(raw_data_path, str(year))
-        
-        if not os.path.exists(year_path):
-            print(f"Folder tahun {year} tidak ditemukan, skip.")
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+OUTPUT_COLS = ['Date', 'Tahun', 'Bulan', 'Tanggal', 'Nama Pos', 'Kabupaten', 'Kecamatan', 'Curah_Hujan', 'Label']
+
+# Header PDF ikut terbawa ke nama pos, mis. "Merden Provinsi :Jawa tengah".
+# Huruf "Provinsi" kadang diselingi karakter lain ("RantinPgrovinsi"), jadi
+# tiap hurufnya boleh diikuti satu karakter sisipan.
+STATION_SUFFIX = re.compile(r'\s*P.?r.?o.?v.?i.?n.?s.?i\s*:\s*Jawa\s*Tengah\s*$', re.IGNORECASE)
+# Kecamatan kadang diikuti koordinat dari kolom sebelahnya ("Undaan 110.8072222")
+KECAMATAN_NOISE = re.compile(r'(\s+-?\d+(\.\d+)?)+$')
+# Kabupaten kadang diikuti header kolom koordinat ("Kudus LONGITUDE");
+# baris tanpa lokasi diisi "Unknown" oleh ekstraktor
+KABUPATEN_NOISE = re.compile(r'(\s+(LONGITUDE|LATITUDE|-?\d+(\.\d+)?))+$', re.IGNORECASE)
+MISSING_KABUPATEN = ('', '0', '-', 'unknown')
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def load_manifest():
+    if not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file) as f:
+        return json.load(f)
+
+def save_manifest(manifest):
+    tmp = manifest_file + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, manifest_file)
+
+def find_csv_files():
+    files = []
+    for year_path in sorted(glob.glob(os.path.join(raw_data_path, '*'))):
+        year = os.path.basename(year_path)
+        if not (os.path.isdir(year_path) and year.isdigit()):
             continue
-            
-        csv_files = glob.glob(os.path.join(year_path, "*.csv"))
-        
-        for file_path in csv_files:
-            try:
-                df = pd.read_csv(file_path)
-                
-                df['Tahun'] = year 
-                
-                id_vars = ['Nama Pos', 'Kabupaten', 'Kecamatan', 'Tanggal', 'Tahun']
-                
-                value_vars = [col for col in month_map.keys() if col in df.columns]
-                
-                if not value_vars:
-                    print(f"Warning: Tidak ada kolom bulan di file {os.path.basename(file_path)}")
-                    continue
-
-                df_melted = df.melt(id_vars=id_vars, value_vars=value_vars, 
-                                    var_name='Bulan_Str', value_name='Curah_Hujan')
-                
-                df_melted['Bulan'] = df_melted['Bulan_Str'].map(month_map)
-                
+        for file_path in sorted(glob.glob(os.path.join(year_path, "*.csv"))):
+            files.append((f"{year}/{os.path.basename(file_path)}", file_path, int(year)))
+    return files
+
+@profiled('preprocessing.melt_file')
+def melt_file(file_path, year):
+    df = pd.read_csv(file_path)
+
+    df['Tahun'] = year
+
+    id_vars = ['Nama Pos', 'Kabupaten', 'Kecamatan', 'Tanggal', 'Tahun']
+
+    value_vars = [col for col in month_map.keys() if col in df.columns]
+
+    if not value_vars:
+        print(f"Warning: Tidak ada kolom bulan di file {os.path.basename(file_path)}")
+        return None
+
+    df_melted = df.melt(id_vars=id_vars, value_vars=value_vars,
+                        var_name='Bulan_Str', value_name='Curah_Hujan')
+
+    df_melted['Bulan'] = df_melted['Bulan_Str'].map(month_map)
+
+    return df_melted
+
+def clean_station_name(name):
+    return ' '.join(STATION_SUFFIX.sub('', str(name)).split())
+
+def clean_kecamatan(name):
+    if pd.isna(name):
+        return None
+    name = ' '.join(KECAMATAN_NOISE.sub('', str(name)).split())
+    return None if name in ('', '0', '-') else name
+
+def clean_kabupaten(name):
+    # Kode kabupaten hanya bertambah di belakang, jadi nama harus sudah bersih
+    # sebelum pertama kali dikodekan di store maupun tabel kode registry
+    if pd.isna(name):
+        return None
+    name = KABUPATEN_NOISE.sub('', ' '.join(str(name).split()))
+    return None if name.lower() in MISSING_KABUPATEN else name
+
+def clean_values(values, cleaner):
+    # Dibersihkan per kategori lalu dipetakan balik lewat kode, jadi tidak ada
+    # salinan teks per baris. Kategori hasil diurutkan abjad.
+    values = values.astype('category')
+    cleaned = pd.Series([cleaner(value) for value in values.cat.categories], dtype=object)
+    codes, names = pd.factorize(cleaned, sort=True)
+    raw = values.cat.codes.to_numpy()
+    mapped = np.where(raw >= 0, codes[raw], -1)
+    return pd.Series(pd.Categorical.from_codes(mapped, names), index=values.index)
+
+def build_dates(tahun, bulan, tanggal):
+    # Tanggal dibangun dari komponen integer; tanggal mustahil
+    # (mis. 30 Feb, 31 Apr) menjadi NaT.
+    tahun = np.asarray(tahun, dtype=np.int64)
+    bulan = np.asarray(bulan, dtype=np.int64)
+    tanggal = np.asarray(tanggal, dtype=np.int64)
+
+    kabisat = (tahun % 4 == 0) & ((tahun % 100 != 0) | (tahun % 400 == 0))
+    bulan_idx = np.clip(bulan, 1, 12) - 1
+    max_hari = DAYS_IN_MONTH[bulan_idx] + ((bulan == 2) & kabisat)
+    valid = (bulan >= 1) & (bulan <= 12) & (tanggal >= 1) & (tanggal <= max_hari)
+
+    awal_bulan = (tahun - 1970) * 12 + bulan_idx
+    dates = (awal_bulan.astype('datetime64[M]').astype('datetime64[D]')
+             + (tanggal - 1).astype('timedelta64[D]'))
+    dates[~valid] = np.datetime64('NaT')
+    return dates
+
+@profiled('preprocessing.finalize')
+def finalize(df):
+    df = df.dropna(subset=['Tanggal', 'Curah_Hujan'])
+
+    df = df.assign(Date=build_dates(df['Tahun'], df['Bulan'], df['Tanggal']))
+    df = df.dropna(subset=['Date'])
+
+    df['Label'] = (df['Curah_Hujan'] >= 1).astype(int)
+
+    # Nama mentah disimpan sebagai alias di katalog stasiun store
+    df['Nama Pos Asli'] = df['Nama Pos'].astype('category')
+    df['Nama Pos'] = clean_values(df['Nama Pos'], clean_station_name)
+    df['Kecamatan'] = clean_values(df['Kecamatan'], clean_kecamatan)
+    # Baris tanpa kabupaten tidak punya lokasi untuk fitur maupun lookup
+    df['Kabupaten'] = clean_values(df['Kabupaten'], clean_kabupaten)
+    df = df[df['Kabupaten'].notna()]
+
+    return df[OUTPUT_COLS + ['Nama Pos Asli']].sort_values(by=['Nama Pos', 'Date'])
+
+@profiled('preprocessing.process_data')
+def process_data(rebuild=False):
+    print("Mulai memproses data...")
+
+    manifest = {} if rebuild else load_manifest()
+    files = find_csv_files()
+    current = {key: file_hash(path) for key, path, _ in files}
+
+    changed = [key for key, digest in manifest.items() if current.get(key) != digest]
+    if changed or not os.path.exists(output_file) or not store_is_current():
+        if manifest and changed:
+            print(f"{len(changed)} file lama berubah/hilang, data diproses ulang dari awal.")
+        manifest = {}
+        rebuild = True
+
+    new_files = [(key, path, year) for key, path, year in files if key not in manifest]
+    if not new_files:
+        print("Tidak ada file baru, data sudah terbaru.")
+        return
+
+    all_data = []
+    for key, file_path, year in new_files:
+        try:
+            df_melted = melt_file(file_path, year)
+            if df_melted is not None:
                 all_data.append(df_melted)
-                
-            except Exception as e:
-                print(f"Error memproses file {file_path}: {e}")
+            manifest[key] = current[key]
+        except Exception as e:
+            print(f"Error memproses file {file_path}: {e}")
 
     if not all_data:
         print("Tidak ada data yang berhasil diproses.")
         return
 
-    final_df = pd.concat(all_data, ignore_index=True)
-    
-    final_df['Date_Str'] = final_df['Tahun'].astype(str) + '-' + \
-                           final_df['Bulan'].astype(str) + '-' + \
-                           final_df['Tanggal'].astype(str)
-    
-    final_df['Date'] = pd.to_datetime(final_df['Date_Str'], format='%Y-%m-%d', errors='coerce')
-    
-    final_df = final_df.dropna(subset=['Date', 'Curah_Hujan'])
-    
-    final_df['Label'] = final_df['Curah_Hujan'].apply(lambda x: 1 if x >= 1 else 0)
-    
-    cols = ['Date', 'Tahun', 'Bulan', 'Tanggal', 'Nama Pos', 'Kabupaten', 'Curah_Hujan', 'Label']
-    final_df = final_df[cols].sort_values(by=['Nama Pos', 'Date'])
-    
-    output_file = os.path.join(processed_path, 'data_training_gabungan.csv')
-    final_df.to_csv(output_file, index=False)
-    
-    print(f"Selesai! Data tersimpan di: {output_file}")
-    print(f"Total baris data: {len(final_df)}")
+    final_df = finalize(pd.concat(all_data, ignore_index=True))
+
+    with span('preprocessing.write_csv', rows=len(final_df)):
+        if rebuild:
+            final_df[OUTPUT_COLS].to_csv(output_file, index=False)
+        else:
+            final_df[OUTPUT_COLS].to_csv(output_file, mode='a', header=False, index=False)
+    with span('preprocessing.write_store', rows=len(final_df)):
+        write_store(final_df, rebuild=rebuild)
+    with span('preprocessing.lag_table'):
+        save_lag_table(build_lag_table(load_store(columns=['Date', 'Kabupaten', 'Curah_Hujan'])))
+    save_cube(build_cube())
+    save_manifest(manifest)
+
+    print(f"Selesai! {len(new_files)} file diproses, data tersimpan di: {output_file}")
+    print(f"Store kolumnar: {store_path}")
+    print(f"Tabel fitur lag: {lag_table_path}")
+    print(f"Cube EDA: {cube_path}")
+    print(f"Total baris data baru: {len(final_df)}")
     print("Contoh 5 data teratas:")
-    print(final_df.head())
+    print(final_df[OUTPUT_COLS].head())
 
 if __name__ == "__main__":
-    process_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Gabungkan CSV hasil ekstraksi menjadi data training")
+    parser.add_argument("--rebuild", action="store_true", help="proses ulang semua file, bukan hanya file baru")
+    args = parser.parse_args(sys.argv[1:])
+    process_data(rebuild=args.rebuild)
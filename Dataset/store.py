@@ -0,0 +1,234 @@
+import os
+import json
+import hashlib
+import shutil
+import numpy as np
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+store_path = os.path.join(project_root, 'Dataset', 'processed', 'store')
+
+# Tipe data tiap kolom di store. Kolom kategori disimpan sebagai kode integer,
+# Date sebagai nomor hari sejak 1970-01-01, dan stasiun sebagai id di katalog
+# stasiun (stations.json) yang menyimpan nama bersih, kabupaten, dan kecamatan.
+COLUMN_TYPES = {
+    'Date': 'int32',
+    'Tahun': 'int16',
+    'Bulan': 'int8',
+    'Tanggal': 'int8',
+    'Stasiun': 'int32',
+    'Kabupaten': 'int16',
+    'Curah_Hujan': 'float32',
+    'Label': 'int8',
+}
+CATEGORY_COLS = ['Kabupaten']
+STORE_FORMAT = 2
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+_legacy_versions = {}
+
+def store_exists(path=store_path):
+    return os.path.exists(os.path.join(path, 'meta.json'))
+
+def store_is_current(path=store_path):
+    # Store format lama (kolom Nama Pos berupa teks) perlu dibangun ulang
+    return store_exists(path) and read_meta(path).get('format') == STORE_FORMAT
+
+def read_meta(path=store_path):
+    with open(os.path.join(path, 'meta.json')) as f:
+        return json.load(f)
+
+def write_meta(meta, path=store_path):
+    tmp = os.path.join(path, 'meta.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, os.path.join(path, 'meta.json'))
+
+def column_file(path, year, column):
+    return os.path.join(path, str(year), column.replace(' ', '_') + '.npy')
+
+def partition_digest(arrays):
+    # Sidik isi satu partisi: koreksi nilai dengan jumlah baris yang sama
+    # tetap menghasilkan versi store baru
+    h = hashlib.sha1()
+    for column in COLUMN_TYPES:
+        values = np.ascontiguousarray(arrays[column])
+        h.update(f"{column}:{values.dtype.str}:{len(values)}".encode())
+        h.update(values.data)
+    return h.hexdigest()[:16]
+
+def content_version(meta):
+    h = hashlib.sha1()
+    h.update(json.dumps([meta['format'], meta['categories'], sorted(meta['digests'].items())],
+                        ensure_ascii=False).encode())
+    return h.hexdigest()[:12]
+
+def file_digests(meta, path=store_path):
+    return {year: partition_digest({column: np.load(column_file(path, year, column), mmap_mode='r')
+                                    for column in COLUMN_TYPES})
+            for year in meta['partitions']}
+
+def store_version(path=store_path):
+    # Berubah setiap kali isi store berubah (lihat partition_digest), dipakai
+    # sebagai kunci cache lookup, ramalan, grid, dan cube EDA. Store yang
+    # ditulis sebelum ada sidik isi dihitung dari file partisinya, sekali per
+    # perubahan meta.json.
+    meta = read_meta(path)
+    if 'content' in meta:
+        return meta['content']
+    stat = os.stat(os.path.join(path, 'meta.json'))
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _legacy_versions:
+        _legacy_versions[key] = content_version({**meta, 'digests': file_digests(meta, path)})
+    return _legacy_versions[key]
+
+def encode_categories(values, categories):
+    # Daftar kategori hanya bertambah di belakang, jadi kode lama tidak bergeser
+    index = {name: i for i, name in enumerate(categories)}
+    for name in pd.unique(values.dropna()):
+        if name not in index:
+            index[name] = len(categories)
+            categories.append(name)
+    return values.map(index).fillna(-1).to_numpy()
+
+def stations_file(path=store_path):
+    return os.path.join(path, 'stations.json')
+
+def read_stations(path=store_path):
+    if not os.path.exists(stations_file(path)):
+        return []
+    with open(stations_file(path)) as f:
+        return json.load(f)
+
+def write_stations(stations, path=store_path):
+    tmp = stations_file(path) + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(stations, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, stations_file(path))
+
+def encode_stations(df, stations):
+    # Stasiun dikenali dari (nama bersih, kabupaten). Seperti kategori, id
+    # hanya bertambah di belakang; kecamatan dan nama mentah dicatat di katalog.
+    index = {(s['name'], s['kabupaten']): s['id'] for s in stations}
+    keys = df[['Nama Pos', 'Kabupaten', 'Kecamatan', 'Nama Pos Asli']].drop_duplicates()
+    for name, kabupaten, kecamatan, raw in keys.itertuples(index=False):
+        key = (name, kabupaten)
+        if key not in index:
+            index[key] = len(stations)
+            stations.append({'id': len(stations), 'name': name, 'kabupaten': kabupaten,
+                             'kecamatan': None, 'aliases': []})
+        station = stations[index[key]]
+        if not pd.isna(kecamatan):
+            station['kecamatan'] = kecamatan
+        if raw not in station['aliases']:
+            station['aliases'].append(raw)
+    # Urutan grup (sort=False) sama dengan urutan kemunculan pertama pasangan
+    groups = df.groupby(['Nama Pos', 'Kabupaten'], sort=False, observed=True)
+    pairs = df[['Nama Pos', 'Kabupaten']].drop_duplicates().itertuples(index=False, name=None)
+    ids = np.array([index[pair] for pair in pairs], dtype=np.int64)
+    return ids[groups.ngroup().to_numpy()]
+
+def encode_frame(df, meta, stations):
+    arrays = {}
+    for column, dtype in COLUMN_TYPES.items():
+        if column == 'Date':
+            days = df['Date'].to_numpy().astype('datetime64[D]') - EPOCH
+            arrays[column] = days.astype(np.int64).astype(dtype)
+        elif column == 'Stasiun':
+            arrays[column] = encode_stations(df, stations).astype(dtype)
+        elif column in CATEGORY_COLS:
+            codes = encode_categories(df[column], meta['categories'][column])
+            arrays[column] = codes.astype(dtype)
+        else:
+            arrays[column] = df[column].to_numpy().astype(dtype)
+    return arrays
+
+def clear_partitions(path=store_path):
+    # Build ulang hanya menghapus partisi dan meta.json. Katalog stasiun tetap
+    # di tempatnya dan daftar kategori dikembalikan oleh pemanggil, sehingga
+    # id stasiun dan kode kategori lama tidak bergeser antar build.
+    categories = read_meta(path).get('categories', {}) if store_exists(path) else {}
+    for name in os.listdir(path):
+        target = os.path.join(path, name)
+        if name == os.path.basename(stations_file(path)):
+            continue
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        else:
+            os.remove(target)
+    return categories
+
+def write_store(df, rebuild=False, path=store_path):
+    categories = {}
+    if rebuild and os.path.exists(path):
+        categories = clear_partitions(path)
+    os.makedirs(path, exist_ok=True)
+
+    if store_exists(path):
+        meta = read_meta(path)
+    else:
+        meta = {
+            'format': STORE_FORMAT,
+            'columns': COLUMN_TYPES,
+            'categories': {column: list(categories.get(column, [])) for column in CATEGORY_COLS},
+            'partitions': {},
+        }
+    meta.setdefault('digests', {})
+    stations = read_stations(path)
+
+    for year, part in df.groupby('Tahun', sort=True):
+        year = str(int(year))
+        arrays = encode_frame(part, meta, stations)
+        if year in meta['partitions']:
+            for column in COLUMN_TYPES:
+                old = np.load(column_file(path, year, column))
+                arrays[column] = np.concatenate([old, arrays[column]])
+        os.makedirs(os.path.join(path, year), exist_ok=True)
+        for column, values in arrays.items():
+            np.save(column_file(path, year, column), values)
+        meta['partitions'][year] = int(len(arrays['Date']))
+        meta['digests'][year] = partition_digest(arrays)
+
+    # Partisi lama yang belum punya sidik (store dari versi sebelumnya) dihitung dari file
+    missing = {year: n for year, n in meta['partitions'].items() if year not in meta['digests']}
+    meta['digests'].update(file_digests({'partitions': missing}, path))
+    meta['content'] = content_version(meta)
+
+    # Katalog ditulis sebelum meta.json, jadi id di partisi selalu ada di katalog
+    write_stations(stations, path)
+    write_meta(meta, path)
+    return meta
+
+def load_store(columns=None, years=None, path=store_path):
+    # Kolom dibaca lewat np.load(mmap_mode='r'): hanya kolom yang diminta
+    # yang disentuh, dan isinya diambil dari page cache OS.
+    meta = read_meta(path)
+    columns = list(columns or meta['columns'])
+    partitions = [year for year in sorted(meta['partitions'])
+                  if years is None or int(year) in years]
+
+    data = {}
+    for column in columns:
+        parts = [np.load(column_file(path, year, column), mmap_mode='r') for year in partitions]
+        if not parts:
+            values = np.empty(0, dtype=COLUMN_TYPES[column])
+        elif len(parts) == 1:
+            values = parts[0]
+        else:
+            values = np.concatenate(parts)
+
+        if column == 'Date':
+            data[column] = (EPOCH + values.astype('timedelta64[D]')).astype('datetime64[ns]')
+        elif column in meta['categories']:
+            data[column] = pd.Categorical.from_codes(values, meta['categories'][column])
+        else:
+            data[column] = values
+    return pd.DataFrame(data, columns=columns)
+
+def load_stations(path=store_path):
+    # Katalog stasiun untuk lookup: diindeks dengan id yang sama dengan kolom
+    # Stasiun, dengan kabupaten memakai kategori (kode int16) yang sama dengan store
+    meta = read_meta(path)
+    catalog = pd.DataFrame(read_stations(path), columns=['id', 'name', 'kabupaten', 'kecamatan', 'aliases'])
+    catalog['kabupaten'] = pd.Categorical(catalog['kabupaten'], categories=meta['categories']['Kabupaten'])
+    return catalog.set_index('id')
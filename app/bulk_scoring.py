@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from Dataset.store import load_store
+from Dataset.ingest import with_snapshot
+from app.forecast import build_lookup, pair_features, rain_proba
+from app.modelling.registry import active_version, model_for_version
+from app.profiling import profiled
+
+CHUNK_ROWS = 50_000
+
+# File permintaan (tanggal, kabupaten) dibaca per potongan. Setiap potongan
+# dikirim ke worker yang sudah memuat model dan lookup sekali di awal, lalu
+# hasilnya ditulis berurutan begitu selesai. Jumlah potongan yang sedang
+# diproses dibatasi, jadi memori tidak bergantung pada ukuran file.
+
+_worker = {}
+
+def init_worker(version):
+    # Forest datar dimuat lewat mmap, jadi node-nya dipakai bersama antar worker
+    model, mapping = model_for_version(version)
+    df = load_store(columns=['Date', 'Bulan', 'Kabupaten', 'Curah_Hujan'])
+    _worker.update(model=model, codes={kab: i for i, kab in enumerate(mapping)}, lookup=with_snapshot(build_lookup(df)))
+
+def parse_dates(values):
+    # Format yang sama dengan parse_tanggal di prediction.py; baris yang tidak
+    # cocok dengan kedua format menjadi NaT dan probabilitasnya NaN
+    dates = pd.to_datetime(values, format='%Y-%m-%d', errors='coerce')
+    retry = dates.isna() & values.notna()
+    if retry.any():
+        dates[retry] = pd.to_datetime(values[retry], format='%d-%m-%Y', errors='coerce')
+    return dates.to_numpy().astype('datetime64[D]')
+
+@profiled('bulk_scoring.score_chunk')
+def score_chunk(kabupaten, days):
+    t0 = time.perf_counter()
+    # Kabupaten di luar mapping model diperlakukan seperti tanggal tidak valid
+    # (API mengembalikan 404 untuk kasus yang sama), bukan diskor dengan kode -1
+    kabupaten = np.asarray(kabupaten, dtype=object)
+    codes = pd.Series(kabupaten).map(_worker['codes']).fillna(-1).to_numpy(dtype=np.int64)
+    valid = ~np.isnat(days) & (codes >= 0)
+    prob = np.full(len(days), np.nan)
+    if valid.any():
+        X = pair_features(_worker['lookup'], kabupaten[valid].astype(str), codes[valid], days[valid])
+        prob[valid] = rain_proba(_worker['model'], X)
+    return prob, time.perf_counter() - t0
+
+class CsvWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.header = True
+
+    def write(self, frame):
+        frame.to_csv(self.file, header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        self.file.close()
+
+class ParquetWriter:
+    # Satu row group per potongan; pyarrow hanya dibutuhkan untuk keluaran .parquet
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Keluaran .parquet membutuhkan pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.writer = pq.ParquetWriter(path, pa.schema([
+            ('tanggal', pa.date32()), ('kabupaten', pa.string()),
+            ('probabilitas', pa.float32()), ('label', pa.int8()),
+        ]))
+
+    def write(self, frame):
+        pa = self.pa
+        self.writer.write_table(pa.Table.from_arrays([
+            pa.array(frame['tanggal'].to_numpy().astype('datetime64[D]')),
+            pa.array(frame['kabupaten'].to_numpy(), pa.string()),
+            pa.array(frame['probabilitas'].to_numpy()),
+            pa.array(frame['label'].to_numpy()),
+        ], schema=self.writer.schema))
+
+    def close(self):
+        self.writer.close()
+
+def open_writer(path):
+    return ParquetWriter(path) if path.endswith('.parquet') else CsvWriter(path)
+
+def result_frame(days, kabupaten, prob):
+    return pd.DataFrame({
+        'tanggal': days,
+        'kabupaten': np.asarray(kabupaten, dtype=object),
+        'probabilitas': prob.astype(np.float32),
+        'label': np.where(np.isnan(prob), -1, prob > 0.5).astype(np.int8),
+    })
+
+def read_chunks(path, date_col, kab_col, chunk_rows):
+    reader = pd.read_csv(path, usecols=[date_col, kab_col], dtype={date_col: str, kab_col: 'category'},
+                         chunksize=chunk_rows)
+    for frame in reader:
+        yield parse_dates(frame[date_col]), frame[kab_col].to_numpy()
+
+def score_file(input_path, output_path, date_col='tanggal', kab_col='kabupaten',
+               chunk_rows=CHUNK_ROWS, workers=None, version=None, log=print):
+    version = version or active_version()
+    workers = os.cpu_count() if workers is None else workers
+    writer = open_writer(output_path)
+    total, started = 0, time.perf_counter()
+
+    def finish(index, days, kabupaten, prob, seconds):
+        nonlocal total
+        writer.write(result_frame(days, kabupaten, prob))
+        total += len(days)
+        log(f"potongan {index}: {len(days):,} baris, {seconds:.2f} detik, "
+            f"{len(days) / max(seconds, 1e-9):,.0f} baris/s")
+
+    try:
+        chunks = read_chunks(input_path, date_col, kab_col, chunk_rows)
+        if workers <= 1:
+            init_worker(version)
+            for index, (days, kabupaten) in enumerate(chunks):
+                finish(index, days, kabupaten, *score_chunk(kabupaten, days))
+        else:
+            # Paling banyak 2 potongan per worker yang sedang diproses atau menunggu ditulis
+            with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(version,)) as pool:
+                pending = deque()
+                for index, (days, kabupaten) in enumerate(chunks):
+                    pending.append((index, days, kabupaten, pool.submit(score_chunk, kabupaten, days)))
+                    while len(pending) >= 2 * workers:
+                        index, days, kabupaten, future = pending.popleft()
+                        finish(index, days, kabupaten, *future.result())
+                while pending:
+                    index, days, kabupaten, future = pending.popleft()
+                    finish(index, days, kabupaten, *future.result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    log(f"Selesai: {total:,} baris dalam {elapsed:.1f} detik ({total / max(elapsed, 1e-9):,.0f} baris/s), "
+        f"model {version} -> {output_path}")
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Skor probabilitas hujan untuk file besar berisi pasangan (tanggal, kabupaten)")
+    parser.add_argument("input", help="file CSV permintaan")
+    parser.add_argument("output", help="file hasil .csv atau .parquet")
+    parser.add_argument("--date-col", default="tanggal")
+    parser.add_argument("--kab-col", default="kabupaten")
+    parser.add_argument("--chunk", type=int, default=CHUNK_ROWS, help="jumlah baris per potongan")
+    parser.add_argument("--workers", type=int, default=None, help="jumlah proses worker (1 = tanpa pool)")
+    parser.add_argument("--version", default=None, help="versi model di registry (default: versi aktif)")
+    args = parser.parse_args()
+
+    score_file(args.input, args.output, args.date_col, args.kab_col, args.chunk, args.workers, args.version)
@@ -0,0 +1,249 @@
+import os
+import numpy as np
+import pandas as pd
+
+from app.modelling.features import (
+    FEATURE_COLUMNS, LAG_COLUMNS, LAG_WINDOWS, build_rain_index, lag_windows,
+    merge_rain_index, monthly_climatology, seasonal_features, to_day_number,
+)
+from app.profiling import profiled
+
+MAX_HORIZON = 30
+MAX_WINDOW = 30
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+grid_cache_path = os.path.join(project_root, 'Dataset', 'processed', 'forecast_grid')
+
+@profiled('forecast.build_lookup')
+def build_lookup(df):
+    return {
+        'rain': build_rain_index(df),
+        'climatology': monthly_climatology(df),
+        # Rata-rata curah hujan pada hari hujan saja, untuk mengubah
+        # probabilitas hujan menjadi perkiraan curah hujan
+        'wet_climatology': monthly_climatology(df[df['Curah_Hujan'] >= 1]),
+    }
+
+@profiled('forecast.apply_observations')
+def apply_observations(lookup, daily, snapshot=None):
+    # Lookup baru dengan rata-rata harian per kabupaten dari snapshot ingest.
+    # Klimatologi tidak diubah: beberapa hari data baru hampir tidak menggesernya.
+    lookup = dict(lookup)
+    if len(daily):
+        lookup['rain'] = merge_rain_index(lookup['rain'], daily['Kabupaten'].to_numpy(),
+                                          to_day_number(daily['Date']), daily['Curah_Hujan'].to_numpy())
+    lookup['snapshot'] = snapshot
+    return lookup
+
+@profiled('forecast.rain_proba')
+def rain_proba(model, X, n_jobs=None):
+    # Forest datar membagi barisnya sendiri ke beberapa thread; estimator
+    # sklearn lewat parallel_config, jadi model yang dipakai bersama tidak diubah
+    from app.modelling.flat_forest import FlatForest
+    if n_jobs is None:
+        proba = model.predict_proba(X)
+    elif isinstance(model, FlatForest):
+        proba = model.predict_proba(X, n_jobs=n_jobs)
+    else:
+        from joblib import parallel_config
+        with parallel_config(backend='threading', n_jobs=n_jobs):
+            proba = model.predict_proba(X)
+    return proba[:, list(model.classes_).index(1)]
+
+def average_lags(avg_rain):
+    avg_rain = np.asarray(avg_rain, dtype=np.float64)
+    return {
+        'rain_prev_1': avg_rain, 'rain_prev_3': avg_rain, 'rain_prev_7': avg_rain,
+        'rain_prev_14': avg_rain * 14, 'rain_prev_30': avg_rain * 30,
+    }
+
+def _month_of(day_numbers):
+    return day_numbers.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64) % 12 + 1
+
+@profiled('forecast.forecast_grid')
+def forecast_grid(model, lookup, kabupaten_list, start_date, horizon=7,
+                  kabupaten_codes=None, passes=2, n_jobs=None):
+    # Matriks (kabupaten x hari) untuk tanggal awal + `horizon` hari berikutnya.
+    # Hari setelah data historis terakhir diisi perkiraan curah hujan
+    # (probabilitas x rata-rata hari hujan) lalu digulirkan ke fitur lag;
+    # setiap putaran hanya memanggil predict_proba sekali untuk semua baris.
+    kabupaten_list = list(kabupaten_list)
+    if kabupaten_codes is None:
+        kabupaten_codes = np.arange(len(kabupaten_list))
+    horizon = int(min(max(horizon, 0), MAX_HORIZON))
+    start = to_day_number([pd.to_datetime(start_date)])[0]
+    first = start - MAX_WINDOW
+    days = np.arange(first, start + horizon + 1)
+    target_cols = np.arange(MAX_WINDOW, len(days))
+    n_kab, n_target = len(kabupaten_list), len(target_cols)
+
+    empty = (np.empty(0, dtype=np.int64), np.empty(0), np.zeros(1))
+    rain = np.full((n_kab, len(days)), np.nan)
+    future = np.zeros((n_kab, len(days)), dtype=bool)
+    for i, kab in enumerate(kabupaten_list):
+        hist_days, hist_rain, _ = lookup['rain'].get(kab, empty)
+        lo = np.searchsorted(hist_days, first, side='left')
+        hi = np.searchsorted(hist_days, days[-1], side='left')
+        rain[i, hist_days[lo:hi] - first] = hist_rain[lo:hi]
+        last_day = hist_days[hi - 1] if hi > 0 else first - 1
+        future[i, max(last_day + 1 - first, 0):] = True
+
+    zeros = np.zeros(12)
+    climatology = np.array([lookup['climatology'].get(k, zeros) for k in kabupaten_list]).reshape(n_kab, 12)
+    wet_climatology = np.array([lookup['wet_climatology'].get(k, zeros) for k in kabupaten_list]).reshape(n_kab, 12)
+    months = _month_of(days)
+    rain[future] = climatology[:, months - 1][future]
+
+    dates = pd.DatetimeIndex(days[target_cols].astype('datetime64[D]'))
+    seasonal = seasonal_features(dates.month, dates.day)
+    X = pd.DataFrame({
+        'Kabupaten_Code': np.repeat(np.asarray(kabupaten_codes), n_target),
+        **{name: np.tile(values, n_kab) for name, values in seasonal.items()},
+    })
+    avg = average_lags(climatology[:, months[target_cols] - 1].ravel())
+
+    # Putaran tambahan hanya perlu kalau ada hari target yang ikut jadi lag
+    rolled = future[:, target_cols[:-1]].any()
+    prob = None
+    for _ in range(max(passes, 1) if rolled else 1):
+        if prob is not None:
+            update = future[:, target_cols]
+            estimate = prob * wet_climatology[:, months[target_cols] - 1]
+            block = rain[:, target_cols]
+            block[update] = estimate[update]
+            rain[:, target_cols] = block
+
+        windows = lag_windows(rain)
+        fallback = np.isnan(windows['rain_prev_1'][:, target_cols].ravel())
+        for name in LAG_COLUMNS:
+            X[name] = np.where(fallback, avg[name], windows[name][:, target_cols].ravel())
+        prob = rain_proba(model, X[FEATURE_COLUMNS], n_jobs).reshape(n_kab, n_target)
+
+    result = X[FEATURE_COLUMNS].copy()
+    result.insert(0, 'Date', np.tile(dates, n_kab))
+    result.insert(0, 'Kabupaten', np.repeat(np.asarray(kabupaten_list, dtype=object), n_target))
+    result['Probabilitas'] = prob.ravel()
+    result['Label'] = (result['Probabilitas'] > 0.5).astype(int)
+    return result
+
+@profiled('forecast.forecast_days')
+def forecast_days(model, lookup, kabupaten, kab_code, start_date, horizon=5, passes=2):
+    result = forecast_grid(model, lookup, [kabupaten], start_date, horizon,
+                           kabupaten_codes=[kab_code], passes=passes)
+    return result.drop(columns='Kabupaten')
+
+@profiled('forecast.pair_features')
+def pair_features(lookup, kabupaten, kabupaten_codes, dates):
+    # Fitur untuk pasangan (kabupaten, tanggal) sembarang, identik dengan
+    # forecast_grid(horizon=0): hari setelah data historis terakhir diisi
+    # klimatologi bulanan, lalu jendela lag dihitung dari matriks (n x 30)
+    # berisi curah hujan 1..30 hari sebelum tiap tanggal.
+    kabupaten = np.asarray(kabupaten, dtype=object)
+    target = to_day_number(pd.to_datetime(dates))
+    back = target[:, None] - 1 - np.arange(MAX_WINDOW)[None, :]
+    back_months = _month_of(back)
+    target_months = _month_of(target)
+
+    rain = np.full(back.shape, np.nan)
+    avg_rain = np.zeros(len(target))
+    empty = (np.empty(0, dtype=np.int64), np.empty(0), np.zeros(1))
+    zeros = np.zeros(12)
+    names, inverse = np.unique(kabupaten.astype(str), return_inverse=True)
+    for k, kab in enumerate(names):
+        rows = np.flatnonzero(inverse == k)
+        hist_days, hist_rain, _ = lookup['rain'].get(kab, empty)
+        climatology = lookup['climatology'].get(kab, zeros)
+
+        values = np.full((len(rows), MAX_WINDOW), np.nan)
+        if len(hist_days):
+            pos = np.minimum(np.searchsorted(hist_days, back[rows]), len(hist_days) - 1)
+            found = hist_days[pos] == back[rows]
+            values = np.where(found, hist_rain[pos], np.nan)
+            last = np.searchsorted(hist_days, target[rows], side='left') - 1
+            last_day = np.where(last >= 0, hist_days[np.maximum(last, 0)], np.iinfo(np.int64).min)
+        else:
+            last_day = np.full(len(rows), np.iinfo(np.int64).min)
+        future = back[rows] > last_day[:, None]
+        values[future] = climatology[back_months[rows] - 1][future]
+        rain[rows] = values
+        avg_rain[rows] = climatology[target_months[rows] - 1]
+
+    valid = ~np.isnan(rain)
+    filled = np.where(valid, rain, 0.0)
+    lags = {}
+    for name, (w, how) in LAG_WINDOWS.items():
+        total = filled[:, :w].sum(axis=1)
+        count = valid[:, :w].sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            value = total / count if how == 'mean' else total
+        lags[name] = np.where(count > 0, value, np.nan)
+
+    fallback = np.isnan(lags['rain_prev_1'])
+    avg = average_lags(avg_rain)
+    dates = pd.DatetimeIndex(target.astype('datetime64[D]'))
+    X = pd.DataFrame({
+        'Kabupaten_Code': np.asarray(kabupaten_codes),
+        **seasonal_features(dates.month, dates.day),
+        **{name: np.where(fallback, avg[name], lags[name]) for name in LAG_COLUMNS},
+    })
+    return X[FEATURE_COLUMNS]
+
+def grid_generation(version, data_version=None, snapshot=None):
+    # Satu folder per (versi model, versi store, snapshot ingest)
+    parts = [str(version)]
+    if data_version is not None:
+        parts.append(f"d{data_version}")
+    if snapshot is not None:
+        parts.append(f"s{snapshot}")
+    return '_'.join(parts)
+
+def grid_cache_file(version, run_date, horizon, cache_dir=grid_cache_path, snapshot=None, data_version=None):
+    run_date = pd.to_datetime(run_date).strftime('%Y-%m-%d')
+    return os.path.join(cache_dir, grid_generation(version, data_version, snapshot), f"{run_date}_{int(horizon)}.pkl")
+
+def prune_grid_cache(keep, cache_dir=grid_cache_path):
+    # Hasil generasi lain (model diganti, store ditulis ulang, snapshot baru)
+    # tidak akan dipakai lagi; file datar dari format lama ikut dibuang
+    import shutil
+    for name in os.listdir(cache_dir):
+        if name == keep:
+            continue
+        target = os.path.join(cache_dir, name)
+        if os.path.isdir(target):
+            shutil.rmtree(target, ignore_errors=True)
+        else:
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+
+@profiled('forecast.cached_forecast_grid')
+def cached_forecast_grid(model, lookup, kabupaten_list, version, run_date, horizon=7,
+                         n_jobs=None, cache_dir=grid_cache_path, data_version=None):
+    # Hasil grid disimpan per (versi model, versi store, snapshot ingest, tanggal run, horizon)
+    path = grid_cache_file(version, run_date, horizon, cache_dir, lookup.get('snapshot'), data_version)
+    if os.path.exists(path):
+        return pd.read_pickle(path)
+    result = forecast_grid(model, lookup, kabupaten_list, run_date, horizon, n_jobs=n_jobs)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    result.to_pickle(tmp)
+    os.replace(tmp, path)
+    prune_grid_cache(os.path.basename(os.path.dirname(path)), cache_dir)
+    return result
+
+def grid_heatmap_frame(result):
+    table = result.pivot(index='Kabupaten', columns='Date', values='Probabilitas')
+    table.columns = [d.strftime('%d/%m') for d in table.columns]
+    return table
+
+def export_grid(result, path):
+    if not isinstance(path, str) or path.endswith('.npz'):
+        np.savez(path,
+                 Kabupaten=result['Kabupaten'].to_numpy(dtype=str),
+                 Date=result['Date'].to_numpy().astype('datetime64[D]'),
+                 Probabilitas=result['Probabilitas'].to_numpy(dtype=np.float32),
+                 Label=result['Label'].to_numpy(dtype=np.int8))
+    else:
+        result[['Kabupaten', 'Date', 'Probabilitas', 'Label']].to_csv(path, index=False)
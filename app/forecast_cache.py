@@ -0,0 +1,162 @@
+import os
+import time
+import pickle
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+from app.profiling import count
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+forecast_cache_path = os.path.join(project_root, 'Dataset', 'processed', 'forecast_cache')
+
+# Cache hasil ramalan untuk satu proses (dipakai bersama semua sesi Streamlit).
+# Kunci = generasi (versi model, versi data) + (kabupaten, tanggal, horizon).
+# Versi model berubah saat registry pindah versi atau model_rf.pkl diganti,
+# versi data saat store ditulis ulang atau snapshot ingest baru terbit; begitu
+# generasi baru terlihat, entri generasi lama dibuang dari memori dan disk.
+MAX_ENTRIES = int(os.environ.get('JATENG_FORECAST_CACHE_SIZE', 1024))
+TTL_SECONDS = float(os.environ.get('JATENG_FORECAST_CACHE_TTL', 6 * 3600))
+DISK_ENABLED = os.environ.get('JATENG_FORECAST_CACHE_DISK', '1').lower() not in ('', '0', 'false', 'no')
+STAT_NAMES = ('hits', 'disk_hits', 'misses', 'evictions', 'expired', 'invalidations')
+
+class ForecastCache:
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, disk_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self.entries = OrderedDict()
+        self.generation = None
+        self.stats = dict.fromkeys(STAT_NAMES, 0)
+        self.lock = threading.Lock()
+        # Satu kunci per entri yang sedang dihitung: sesi lain dengan permintaan
+        # yang sama menunggu hasilnya alih-alih menghitung ulang
+        self.inflight = {}
+
+    def record(self, name):
+        self.stats[name] += 1
+        count(f'forecast_cache.{name}')
+
+    def set_generation(self, generation):
+        # Dipanggil di bawah self.lock
+        if generation == self.generation:
+            return
+        if self.generation is not None:
+            self.entries.clear()
+            self.record('invalidations')
+            if self.disk_path and os.path.isdir(self.disk_path):
+                for name in os.listdir(self.disk_path):
+                    if name != generation_dir(generation):
+                        shutil.rmtree(os.path.join(self.disk_path, name), ignore_errors=True)
+        self.generation = generation
+
+    def disk_file(self, generation, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+        return os.path.join(self.disk_path, generation_dir(generation), f"{digest}.pkl")
+
+    def lookup(self, generation, key):
+        # (ditemukan, nilai, sumber); entri kedaluwarsa dianggap tidak ada
+        now = time.time()
+        expired = False
+        with self.lock:
+            self.set_generation(generation)
+            entry = self.entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl:
+                    self.entries.move_to_end(key)
+                    return True, value, 'hits'
+                del self.entries[key]
+                expired = True
+        if self.disk_path:
+            path = self.disk_file(generation, key)
+            try:
+                with open(path, 'rb') as f:
+                    created, value = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                created = None
+            if created is not None and now - created <= self.ttl:
+                self.store(generation, key, value, created, disk=False)
+                return True, value, 'disk_hits'
+            if created is not None:
+                expired = True
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        if expired:
+            with self.lock:
+                self.record('expired')
+        return False, None, 'misses'
+
+    def store(self, generation, key, value, created=None, disk=True):
+        created = time.time() if created is None else created
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[key] = (created, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.record('evictions')
+        if disk and self.disk_path:
+            path = self.disk_file(generation, key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp, 'wb') as f:
+                    pickle.dump((created, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, path)
+            except OSError:
+                pass
+
+    def get_or_compute(self, generation, key, compute):
+        found, value, source = self.lookup(generation, key)
+        if not found:
+            with self.lock:
+                flight = self.inflight.setdefault((generation, key), threading.Lock())
+            with flight:
+                # Bisa saja sudah diisi sesi lain selama menunggu
+                found, value, source = self.lookup(generation, key)
+                if not found:
+                    value = compute()
+                    self.store(generation, key, value)
+            with self.lock:
+                self.inflight.pop((generation, key), None)
+        with self.lock:
+            self.record(source)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.generation = None
+        if self.disk_path:
+            shutil.rmtree(self.disk_path, ignore_errors=True)
+
+    def info(self):
+        with self.lock:
+            stats = dict(self.stats)
+            size = len(self.entries)
+        requests = stats['hits'] + stats['disk_hits'] + stats['misses']
+        return {
+            **stats,
+            'requests': requests,
+            'hit_rate': (stats['hits'] + stats['disk_hits']) / requests if requests else 0.0,
+            'entries': size,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'disk': self.disk_path,
+        }
+
+def generation_dir(generation):
+    return '_'.join(str(part) for part in generation)
+
+def forecast_key(kabupaten, date, horizon):
+    import pandas as pd
+    return (str(kabupaten), pd.to_datetime(date).strftime('%Y-%m-%d'), int(horizon))
+
+def make_cache(disk=DISK_ENABLED):
+    return ForecastCache(disk_path=forecast_cache_path if disk else None)
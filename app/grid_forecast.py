@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+import argparse
+from datetime import date
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from Dataset.store import load_store
+from Dataset.ingest import with_snapshot
+from Dataset.store import store_version
+from app.modelling.registry import active_model
+from app.forecast import build_lookup, cached_forecast_grid, export_grid, grid_heatmap_frame
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramalan probabilitas hujan untuk semua kabupaten")
+    parser.add_argument("--date", default=date.today().isoformat(), help="tanggal awal (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=7, help="jumlah hari setelah tanggal awal")
+    parser.add_argument("--output", default="forecast_grid.csv", help="file .csv atau .npz")
+    parser.add_argument("--heatmap", default=None, help="simpan heatmap ke file .html")
+    parser.add_argument("--jobs", type=int, default=-1, help="jumlah thread untuk predict_proba (-1 = semua core)")
+    args = parser.parse_args()
+
+    model, kabupaten_mapping, version = active_model()
+    df = load_store(columns=['Date', 'Bulan', 'Kabupaten', 'Curah_Hujan'])
+    lookup = with_snapshot(build_lookup(df))
+
+    t0 = time.perf_counter()
+    result = cached_forecast_grid(model, lookup, kabupaten_mapping, version,
+                                  args.date, args.days, n_jobs=args.jobs, data_version=store_version())
+    elapsed = time.perf_counter() - t0
+
+    export_grid(result, args.output)
+    print(f"{result['Kabupaten'].nunique()} kabupaten x {result['Date'].nunique()} hari "
+          f"selesai dalam {elapsed:.3f} detik -> {args.output}")
+
+    if args.heatmap:
+        import plotly.express as px
+        fig = px.imshow(grid_heatmap_frame(result), color_continuous_scale='Blues', zmin=0, zmax=1,
+                        aspect='auto', title=f'Probabilitas Hujan mulai {args.date}')
+        fig.write_html(args.heatmap)
+        print(f"Heatmap tersimpan di: {args.heatmap}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from app.modelling.flat_forest import FlatForest, export_forest
+
+RANDOM_STATE = 42
+
+# Setiap backend menghasilkan estimator sklearn dengan predict_proba dan
+# classes_, jadi forecast.rain_proba dan layanan prediksi tidak perlu tahu
+# model mana yang dipakai. Yang berbeda hanya cara membuat, menyimpan, dan
+# memuat artefaknya. joblib, sklearn, dan daftar fitur baru diimpor saat
+# dipakai agar registry tetap ringan untuk diimpor aplikasi.
+
+class RandomForestBackend:
+    name = 'rf'
+    default_params = {'n_estimators': 200}
+    grid = {
+        'n_estimators': [100, 200],
+        'max_depth': [None, 20],
+        'min_samples_leaf': [1, 5],
+        'max_features': ['sqrt', 0.5],
+    }
+    quick_grid = {
+        'n_estimators': [30],
+        'max_depth': [12, None],
+        'min_samples_leaf': [5],
+        'max_features': ['sqrt'],
+    }
+    supports_incremental = True
+
+    def make(self, params=None, n_jobs=None):
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=n_jobs, **{**self.default_params, **(params or {})})
+
+    def save(self, model, path):
+        import joblib
+        joblib.dump(model, os.path.join(path, 'model.pkl'))
+        # Larik node datar untuk dimuat dengan mmap oleh aplikasi
+        export_forest(model, os.path.join(path, 'forest'))
+
+    def load(self, path, flat=True):
+        if flat and os.path.exists(os.path.join(path, 'forest', 'meta.json')):
+            return FlatForest(os.path.join(path, 'forest'))
+        import joblib
+        return joblib.load(os.path.join(path, 'model.pkl'))
+
+class HistGradientBoostingBackend:
+    name = 'hgb'
+    default_params = {'max_iter': 300, 'learning_rate': 0.1}
+    grid = {
+        'max_iter': [200, 400],
+        'learning_rate': [0.05, 0.1],
+        'max_leaf_nodes': [31, 63],
+    }
+    quick_grid = {
+        'max_iter': [100],
+        'learning_rate': [0.1],
+        'max_leaf_nodes': [31, 63],
+    }
+    supports_incremental = False
+
+    def make(self, params=None, n_jobs=None):
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        from app.modelling.features import FEATURE_COLUMNS
+        # Kolom pertama (Kabupaten_Code) diperlakukan sebagai kategori
+        categorical = [name == 'Kabupaten_Code' for name in FEATURE_COLUMNS]
+        return HistGradientBoostingClassifier(random_state=RANDOM_STATE, categorical_features=categorical,
+                                              early_stopping=False, **{**self.default_params, **(params or {})})
+
+    def save(self, model, path):
+        import joblib
+        joblib.dump(model, os.path.join(path, 'model.pkl'))
+
+    def load(self, path, flat=True):
+        import joblib
+        return joblib.load(os.path.join(path, 'model.pkl'))
+
+class LinearBackend:
+    name = 'linear'
+    default_params = {'C': 1.0}
+    grid = {'C': [0.1, 1.0, 10.0]}
+    quick_grid = {'C': [1.0]}
+    supports_incremental = False
+
+    def make(self, params=None, n_jobs=None):
+        from sklearn.compose import ColumnTransformer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+        from app.modelling.features import FEATURE_COLUMNS
+        kab = [i for i, name in enumerate(FEATURE_COLUMNS) if name == 'Kabupaten_Code']
+        numeric = [i for i, name in enumerate(FEATURE_COLUMNS) if name != 'Kabupaten_Code']
+        # Kode kabupaten di-one-hot; kode -1 (kabupaten baru) menjadi vektor nol
+        columns = ColumnTransformer([
+            ('kabupaten', OneHotEncoder(handle_unknown='ignore'), kab),
+            ('numeric', StandardScaler(), numeric),
+        ])
+        params = {**self.default_params, **(params or {})}
+        return Pipeline([('columns', columns), ('logreg', LogisticRegression(max_iter=1000, **params))])
+
+    def save(self, model, path):
+        import joblib
+        joblib.dump(model, os.path.join(path, 'model.pkl'))
+
+    def load(self, path, flat=True):
+        import joblib
+        return joblib.load(os.path.join(path, 'model.pkl'))
+
+BACKENDS = {backend.name: backend for backend in (RandomForestBackend(), HistGradientBoostingBackend(), LinearBackend())}
+DEFAULT_BACKEND = 'rf'
+
+def get_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Backend tidak dikenal: {name} (pilihan: {', '.join(BACKENDS)})")
+    return BACKENDS[name]
+
+def model_size(model):
+    # Jumlah estimator untuk meta registry; model non-ensemble dihitung satu,
+    # model bershard dijumlahkan dari semua shard
+    if hasattr(model, 'shards'):
+        return sum(model_size(shard) for shard in model.shards.values())
+    if hasattr(model, 'estimators_'):
+        return len(model.estimators_)
+    if hasattr(model, 'n_iter_'):
+        return int(model.n_iter_)
+    return 1
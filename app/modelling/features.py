@@ -0,0 +1,177 @@
+import os
+import numpy as np
+import pandas as pd
+
+from app.profiling import profiled
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+lag_table_path = os.path.join(project_root, 'Dataset', 'processed', 'lag_features.pkl')
+
+LAG_COLUMNS = ["rain_prev_1", "rain_prev_3", "rain_prev_7", "rain_prev_14", "rain_prev_30"]
+SEASONAL_COLUMNS = ["sin_bulan", "cos_bulan", "sin_tgl", "cos_tgl", "Musim"]
+FEATURE_COLUMNS = ["Kabupaten_Code"] + SEASONAL_COLUMNS + LAG_COLUMNS
+
+MUSIM_HUJAN = [10, 11, 12, 1, 2, 3]
+
+# (panjang jendela, agregasi) untuk tiap fitur lag. Jendela selalu
+# berisi hari-hari SEBELUM tanggal target, tanggal target tidak ikut.
+LAG_WINDOWS = {
+    "rain_prev_1": (1, "sum"),
+    "rain_prev_3": (3, "mean"),
+    "rain_prev_7": (7, "mean"),
+    "rain_prev_14": (14, "sum"),
+    "rain_prev_30": (30, "sum"),
+}
+
+def seasonal_features(bulan, tanggal):
+    bulan = np.asarray(bulan, dtype=np.float64)
+    tanggal = np.asarray(tanggal, dtype=np.float64)
+    return {
+        "sin_bulan": np.sin(2 * np.pi * bulan / 12),
+        "cos_bulan": np.cos(2 * np.pi * bulan / 12),
+        "sin_tgl": np.sin(2 * np.pi * tanggal / 31),
+        "cos_tgl": np.cos(2 * np.pi * tanggal / 31),
+        "Musim": np.isin(bulan, MUSIM_HUJAN).astype(np.int64),
+    }
+
+def kabupaten_codes(df):
+    # Kabupaten sebagai kategori berurutan abjad: groupby berjalan di atas kode
+    # integer, tetapi urutan hasilnya sama dengan groupby pada nama
+    kabupaten = df["Kabupaten"].astype("category")
+    return kabupaten.cat.reorder_categories(sorted(kabupaten.cat.categories))
+
+def kabupaten_daily(df):
+    # Rata-rata curah hujan semua pos dalam satu kabupaten per hari
+    df = df.dropna(subset=["Kabupaten", "Curah_Hujan"])
+    daily = (df.assign(Kabupaten=kabupaten_codes(df))
+               .groupby(["Kabupaten", "Date"], sort=True, observed=True)["Curah_Hujan"].mean())
+    return daily.astype(np.float64)
+
+def lag_windows(rain):
+    # rain: matriks (kabupaten x hari) dengan NaN untuk hari tanpa data.
+    # Jumlah per jendela dihitung dari selisih prefix sum, jadi seluruh
+    # tabel selesai dalam satu sapuan O(n).
+    valid = ~np.isnan(rain)
+    values = np.where(valid, rain, 0.0)
+    n_kab, n_days = rain.shape
+    csum = np.zeros((n_kab, n_days + 1))
+    ccnt = np.zeros((n_kab, n_days + 1))
+    np.cumsum(values, axis=1, out=csum[:, 1:])
+    np.cumsum(valid, axis=1, out=ccnt[:, 1:])
+
+    # Fitur untuk hari j memakai hari [j - w, j - 1]
+    end = np.arange(n_days)
+    out = {}
+    for name, (w, how) in LAG_WINDOWS.items():
+        start = np.maximum(end - w, 0)
+        total = csum[:, end] - csum[:, start]
+        count = ccnt[:, end] - ccnt[:, start]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            value = total / count if how == "mean" else total
+        out[name] = np.where(count > 0, value, np.nan)
+    return out
+
+@profiled('features.build_lag_table')
+def build_lag_table(df):
+    daily = kabupaten_daily(df)
+    kabupaten = daily.index.get_level_values("Kabupaten")
+    dates = daily.index.get_level_values("Date")
+
+    kab_names, kab_idx = np.unique(np.asarray(kabupaten), return_inverse=True)
+    # Kalender diperpanjang satu hari agar fitur untuk "besok" dari data terakhir tersedia
+    calendar = pd.date_range(dates.min(), dates.max() + pd.Timedelta(days=1), freq="D")
+    day_idx = (dates - calendar[0]).days.to_numpy()
+
+    rain = np.full((len(kab_names), len(calendar)), np.nan)
+    rain[kab_idx, day_idx] = daily.to_numpy()
+    windows = lag_windows(rain)
+
+    # Hanya simpan hari yang hari sebelumnya punya data
+    has_prev = ~np.isnan(windows["rain_prev_1"])
+    rows, cols = np.nonzero(has_prev)
+    table = pd.DataFrame({
+        "Kabupaten": kab_names[rows],
+        "Date": calendar[cols],
+        **{name: values[rows, cols] for name, values in windows.items()},
+    })
+    return table.set_index(["Kabupaten", "Date"])
+
+def to_day_number(dates):
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+@profiled('features.build_rain_index')
+def build_rain_index(df):
+    # Per kabupaten: nomor hari terurut, curah hujan harian, dan prefix sum-nya.
+    # Dibangun sekali saat aplikasi dimuat.
+    daily = kabupaten_daily(df)
+    kabupaten = np.asarray(daily.index.get_level_values("Kabupaten"))
+    days = to_day_number(daily.index.get_level_values("Date"))
+    rain = daily.to_numpy()
+
+    bounds = np.flatnonzero(kabupaten[1:] != kabupaten[:-1]) + 1
+    index = {}
+    for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(kabupaten)]):
+        csum = np.zeros(stop - start + 1)
+        np.cumsum(rain[start:stop], out=csum[1:])
+        index[kabupaten[start]] = (days[start:stop], rain[start:stop], csum)
+    return index
+
+def merge_rain_index(index, kabupaten, day_numbers, rain):
+    # Hari baru atau terkoreksi (mis. dari ingest harian) digabung ke salinan
+    # entri kabupaten yang terkena saja. Prefix sum sebelum hari paling awal
+    # yang berubah tetap dipakai; sisanya dihitung ulang dari titik itu.
+    kabupaten = np.asarray(kabupaten, dtype=object)
+    day_numbers = np.asarray(day_numbers, dtype=np.int64)
+    rain = np.asarray(rain, dtype=np.float64)
+    empty = (np.empty(0, dtype=np.int64), np.empty(0), np.zeros(1))
+    merged = dict(index)
+    for kab in pd.unique(kabupaten):
+        rows = kabupaten == kab
+        new_days, order = np.unique(day_numbers[rows], return_index=True)
+        new_rain = rain[rows][order]
+        old_days, old_rain, old_csum = index.get(kab, empty)
+        days = np.union1d(old_days, new_days)
+        values = np.empty(len(days))
+        values[np.searchsorted(days, old_days)] = old_rain
+        values[np.searchsorted(days, new_days)] = new_rain
+        first = int(np.searchsorted(days, new_days[0]))
+        csum = np.empty(len(days) + 1)
+        csum[:first + 1] = old_csum[:first + 1]
+        np.cumsum(values[first:], out=csum[first + 1:])
+        csum[first + 1:] += csum[first]
+        merged[kab] = (days, values, csum)
+    return merged
+
+def lags_from_index(entry, day_numbers):
+    # Hasilnya identik dengan build_lag_table: jendela [hari - w, hari - 1],
+    # dicari dengan searchsorted lalu dijumlah lewat selisih prefix sum.
+    days, _, csum = entry
+    day_numbers = np.atleast_1d(np.asarray(day_numbers, dtype=np.int64))
+    end = np.searchsorted(days, day_numbers, side="left")
+    out = {}
+    for name, (w, how) in LAG_WINDOWS.items():
+        start = np.searchsorted(days, day_numbers - w, side="left")
+        total = csum[end] - csum[start]
+        count = end - start
+        with np.errstate(invalid="ignore", divide="ignore"):
+            value = total / count if how == "mean" else total
+        out[name] = np.where(count > 0, value, np.nan)
+    return out
+
+@profiled('features.monthly_climatology')
+def monthly_climatology(df):
+    # Rata-rata curah hujan per bulan (12 nilai) untuk tiap kabupaten
+    df = df.dropna(subset=["Kabupaten", "Curah_Hujan"])
+    means = (df.assign(Kabupaten=kabupaten_codes(df))
+               .groupby(["Kabupaten", "Bulan"], observed=True)["Curah_Hujan"].mean()
+               .unstack("Bulan")
+               .reindex(columns=range(1, 13)))
+    return {kab: np.nan_to_num(row.to_numpy(dtype=np.float64)) for kab, row in means.iterrows()}
+
+def save_lag_table(table, path=lag_table_path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table.to_pickle(path)
+
+def load_lag_table(path=lag_table_path):
+    return pd.read_pickle(path)
@@ -0,0 +1,196 @@
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+models_path = os.path.join(current_dir, 'saved_models')
+model_file = os.path.join(models_path, 'model_rf.pkl')
+forest_path = os.path.join(models_path, 'forest')
+sys.path.insert(0, project_root)
+
+FOREST_VERSION = 1
+ROW_CHUNK = 4096
+LEAF_CHECK_EVERY = 4
+
+# Semua pohon digabung menjadi satu larik node dengan indeks global (offset
+# pohon sudah ditambahkan). Daun menunjuk ke dirinya sendiri (right = node,
+# threshold = -inf) sehingga penelusuran bisa maju beberapa level tanpa
+# memeriksa daun. value berisi proporsi kelas per node, (n_node, n_kelas).
+NODE_ARRAYS = {
+    'feature': np.int32,
+    'threshold': np.float64,
+    'left': np.int32,
+    'right': np.int32,
+    'missing_left': np.bool_,
+    'value': np.float64,
+}
+
+def source_version(path):
+    # Cukup dari ukuran dan waktu modifikasi: model berukuran ratusan MB
+    # terlalu lambat untuk di-hash setiap kali dipakai
+    import hashlib
+    stat = os.stat(path)
+    return hashlib.sha256(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:12]
+
+def effective_jobs(n_jobs):
+    # Konvensi joblib: None = 1, -1 = semua core, -2 = semua kecuali satu, dst.
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return max(1, n_jobs)
+
+def flatten_forest(model):
+    arrays = {name: [] for name in NODE_ARRAYS}
+    roots = []
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        node = np.arange(tree.node_count) + offset
+        is_leaf = tree.children_left < 0
+        # Normalisasi sama seperti DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :]
+        normalizer = value.sum(axis=1)
+        normalizer[normalizer == 0.0] = 1.0
+
+        roots.append(offset)
+        arrays['feature'].append(np.where(is_leaf, 0, tree.feature))
+        arrays['threshold'].append(np.where(is_leaf, -np.inf, tree.threshold))
+        arrays['left'].append(np.where(is_leaf, node, tree.children_left + offset))
+        arrays['right'].append(np.where(is_leaf, node, tree.children_right + offset))
+        arrays['missing_left'].append(~is_leaf & tree.missing_go_to_left.astype(bool))
+        arrays['value'].append(value / normalizer[:, None])
+        offset += tree.node_count
+
+    flat = {name: np.ascontiguousarray(np.concatenate(parts), dtype=NODE_ARRAYS[name])
+            for name, parts in arrays.items()}
+    flat['roots'] = np.asarray(roots, dtype=np.int32)
+    return flat
+
+def export_forest(model, path=forest_path, source=None):
+    os.makedirs(path, exist_ok=True)
+    flat = flatten_forest(model)
+    node = np.arange(len(flat['left']))
+    internal = flat['right'] != node
+    for name, values in flat.items():
+        np.save(os.path.join(path, f"{name}.npy"), values)
+    meta = {
+        'version': FOREST_VERSION,
+        'n_trees': len(flat['roots']),
+        'n_nodes': len(flat['feature']),
+        'n_features': int(model.n_features_in_),
+        'classes': [int(c) for c in model.classes_],
+        # Pembangun depth-first sklearn selalu menaruh anak kiri tepat setelah induknya
+        'left_is_next': bool(np.all(flat['left'][internal] == node[internal] + 1)),
+        'source_version': source_version(source) if source and os.path.exists(source) else None,
+    }
+    if hasattr(model, 'feature_names_in_'):
+        meta['feature_names'] = list(model.feature_names_in_)
+    tmp = os.path.join(path, 'meta.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(path, 'meta.json'))
+    return meta
+
+class FlatForest:
+    # Pengganti RandomForestClassifier untuk predict_proba. Larik node dibuka
+    # dengan mmap sehingga beberapa proses berbagi satu salinan di page cache.
+    def __init__(self, path=forest_path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        for name in list(NODE_ARRAYS) + ['roots']:
+            # np.asarray: tetap dipetakan ke file, tanpa overhead subclass np.memmap
+            setattr(self, name, np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')))
+        self.classes_ = np.asarray(self.meta['classes'])
+        self.n_features_in_ = self.meta['n_features']
+        self.left_is_next = self.meta['left_is_next']
+
+    def leaves(self, X):
+        # Semua pasangan (pohon, baris) ditelusuri bersamaan. Setiap
+        # LEAF_CHECK_EVERY level, pasangan yang sudah di daun dikeluarkan.
+        n_rows, n_features = X.shape
+        flat_x = X.ravel()
+        has_nan = bool(np.isnan(flat_x).any())
+        result = np.repeat(self.roots.astype(np.int64), n_rows)
+        offset = np.tile(np.arange(n_rows, dtype=np.int64) * n_features, len(self.roots))
+        active = np.arange(len(result))
+        current = result.copy()
+        while len(current):
+            for _ in range(LEAF_CHECK_EVERY):
+                x = flat_x[offset + self.feature[current]]
+                go_left = x <= self.threshold[current]
+                if has_nan:
+                    # NaN ikut arah missing_go_to_left milik pohon sklearn
+                    go_left |= np.isnan(x) & self.missing_left[current]
+                left = current + 1 if self.left_is_next else self.left[current]
+                current = np.where(go_left, left, self.right[current])
+            done = self.right[current] == current
+            result[active[done]] = current[done]
+            active, current, offset = active[~done], current[~done], offset[~done]
+        return result.reshape(len(self.roots), n_rows)
+
+    def chunk_proba(self, chunk):
+        leaf_values = self.value[self.leaves(chunk)]
+        total = np.zeros((chunk.shape[0], len(self.classes_)), dtype=np.float64)
+        for tree_values in leaf_values:
+            total += tree_values
+        return total / len(self.roots)
+
+    def predict_proba(self, X, n_jobs=None):
+        # sklearn memakai float32 untuk X dan menjumlah pohon satu per satu;
+        # urutan yang sama dipakai agar hasilnya identik bit per bit.
+        # n_jobs > 1 (atau -1 = semua core): baris dibagi ke beberapa thread;
+        # setiap baris dihitung sendiri, jadi hasilnya tetap sama.
+        X = np.asarray(X, dtype=np.float32)
+        proba = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+        workers = effective_jobs(n_jobs)
+        size = ROW_CHUNK if workers == 1 else max(1, min(ROW_CHUNK, -(-X.shape[0] // workers)))
+        starts = range(0, X.shape[0], size)
+
+        def fill(start):
+            proba[start:start + size] = self.chunk_proba(X[start:start + size])
+
+        if workers == 1 or len(starts) < 2:
+            for start in starts:
+                fill(start)
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(min(workers, len(starts))) as pool:
+                list(pool.map(fill, starts))
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+def forest_is_current(path=forest_path, source=model_file):
+    meta_file = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_file):
+        return False
+    with open(meta_file) as f:
+        meta = json.load(f)
+    if meta.get('version') != FOREST_VERSION:
+        return False
+    # Tanpa pickle sumber, hasil ekspor dipakai apa adanya
+    if not os.path.exists(source):
+        return True
+    return meta.get('source_version') == source_version(source)
+
+def load_model(path=forest_path, source=model_file):
+    if forest_is_current(path, source):
+        return FlatForest(path)
+    import joblib
+    return joblib.load(source)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ekspor model_rf.pkl ke larik node datar (mmap)")
+    parser.add_argument("--model", default=model_file)
+    parser.add_argument("--output", default=forest_path)
+    args = parser.parse_args()
+
+    import joblib
+    meta = export_forest(joblib.load(args.model), args.output, source=args.model)
+    print(f"{meta['n_trees']} pohon, {meta['n_nodes']} node -> {args.output}")
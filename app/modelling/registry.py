@@ -0,0 +1,206 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+models_path = os.path.join(current_dir, 'saved_models')
+registry_path = os.path.join(models_path, 'registry')
+legacy_model_file = os.path.join(models_path, 'model_rf.pkl')
+legacy_encoder_file = os.path.join(models_path, 'encoder_kabupaten.pkl')
+sys.path.insert(0, project_root)
+
+from app.modelling.flat_forest import load_model, source_version
+from app.modelling.backends import DEFAULT_BACKEND, get_backend, model_size
+from app.modelling.shards import ShardedModel
+
+# Struktur registry:
+#   registry/kabupaten_codes.json   daftar kabupaten, hanya bertambah di belakang
+#   registry/CURRENT                nama versi aktif
+#   registry/versions/v0001/        model.pkl, forest/ (mmap, khusus rf), meta.json
+#   registry/versions/v0002/        shards/000/, shards/001/, ... (model bershard), meta.json
+
+def write_json(data, path):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+def versions_path(root=registry_path):
+    return os.path.join(root, 'versions')
+
+def version_path(version, root=registry_path):
+    return os.path.join(versions_path(root), version)
+
+def code_table_file(root=registry_path):
+    return os.path.join(root, 'kabupaten_codes.json')
+
+def load_code_table(root=registry_path):
+    path = code_table_file(root)
+    if os.path.exists(path):
+        return read_json(path)
+    # Tabel awal mengikuti encoder lama agar model yang sudah ada tetap cocok
+    if os.path.exists(legacy_encoder_file):
+        import joblib
+        try:
+            return list(joblib.load(legacy_encoder_file)['kabupaten_mapping'])
+        except Exception:
+            pass
+    return []
+
+def extend_code_table(table, names):
+    # Kabupaten baru selalu mendapat kode di belakang; kode lama tidak bergeser
+    table = list(table)
+    known = set(table)
+    for name in sorted(set(names) - known):
+        table.append(name)
+    return table
+
+def save_code_table(table, root=registry_path):
+    old = load_code_table(root)
+    if table[:len(old)] != old:
+        raise ValueError("Tabel kode kabupaten hanya boleh ditambah di belakang")
+    os.makedirs(root, exist_ok=True)
+    write_json(table, code_table_file(root))
+
+def list_versions(root=registry_path):
+    if not os.path.exists(versions_path(root)):
+        return []
+    return sorted(name for name in os.listdir(versions_path(root))
+                  if not name.endswith('.tmp') and os.path.exists(os.path.join(versions_path(root), name, 'meta.json')))
+
+def read_version_meta(version, root=registry_path):
+    return read_json(os.path.join(version_path(version, root), 'meta.json'))
+
+def current_version(root=registry_path):
+    path = os.path.join(root, 'CURRENT')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read().strip() or None
+
+def set_current(version, root=registry_path):
+    if version not in list_versions(root):
+        raise ValueError(f"Versi tidak ditemukan: {version}")
+    tmp = os.path.join(root, 'CURRENT.tmp')
+    with open(tmp, 'w') as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(root, 'CURRENT'))
+
+def register_model(model, kabupaten_mapping, info=None, root=registry_path, activate=True, backend=DEFAULT_BACKEND):
+    save_code_table(kabupaten_mapping, root)
+
+    existing = list_versions(root)
+    version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+    # Ditulis ke folder sementara lalu di-rename, jadi versi yang terlihat selalu lengkap
+    tmp_dir = version_path(version, root) + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    shards = model.save(tmp_dir, backend) if isinstance(model, ShardedModel) else None
+    if shards is None:
+        get_backend(backend).save(model, tmp_dir)
+
+    meta = {
+        'version': version,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'backend': backend,
+        'n_trees': model_size(model),
+        'params': {k: v for k, v in model.get_params().items() if isinstance(v, (int, float, str, bool, type(None)))},
+        'kabupaten_mapping': list(kabupaten_mapping),
+    }
+    if shards is not None:
+        meta['shards'] = shards
+    meta.update(info or {})
+    write_json(meta, os.path.join(tmp_dir, 'meta.json'))
+    os.replace(tmp_dir, version_path(version, root))
+
+    if activate:
+        set_current(version, root)
+    return version
+
+def load_version(version, flat=True, root=registry_path):
+    path = version_path(version, root)
+    meta = read_version_meta(version, root)
+    # Isi versi tidak pernah berubah, jadi forest datarnya selalu cocok dengan model.pkl.
+    # Model bershard hanya membaca meta di sini; shard dimuat saat pertama dipakai.
+    if 'shards' in meta:
+        return ShardedModel.load(path, meta, flat), meta
+    model = get_backend(meta.get('backend', DEFAULT_BACKEND)).load(path, flat)
+    return model, meta
+
+def model_for_version(version, flat=True, root=registry_path):
+    # (model, kabupaten_mapping) untuk versi dari active_version()
+    if not version.startswith('legacy-'):
+        model, meta = load_version(version, flat, root)
+        return model, meta['kabupaten_mapping']
+    import joblib
+    encoder = joblib.load(legacy_encoder_file)
+    model = load_model(source=legacy_model_file) if flat else joblib.load(legacy_model_file)
+    return model, encoder['kabupaten_mapping']
+
+def mapping_for_version(version, root=registry_path):
+    # Daftar kabupaten tanpa memuat modelnya (cukup meta.json atau encoder kecil)
+    if not version.startswith('legacy-'):
+        return read_version_meta(version, root)['kabupaten_mapping']
+    import joblib
+    return joblib.load(legacy_encoder_file)['kabupaten_mapping']
+
+def active_model(flat=True, root=registry_path):
+    # (model, kabupaten_mapping, versi). Tanpa registry, model lama di saved_models dipakai.
+    version = active_version(root)
+    return (*model_for_version(version, flat, root), version)
+
+def active_version(root=registry_path):
+    # Murah untuk dipanggil setiap request/rerun: hanya membaca CURRENT atau stat file
+    version = current_version(root)
+    if version is not None:
+        return version
+    return 'legacy-' + source_version(legacy_model_file)
+
+def prune_versions(keep, root=registry_path):
+    active = current_version(root)
+    removed = []
+    for version in list_versions(root)[:-keep] if keep > 0 else []:
+        if version != active:
+            shutil.rmtree(version_path(version, root))
+            removed.append(version)
+    return removed
+
+def import_legacy(root=registry_path):
+    import joblib
+    model = joblib.load(legacy_model_file)
+    mapping = joblib.load(legacy_encoder_file)['kabupaten_mapping']
+    # Model lama dilatih dengan semua data di store saat itu
+    from Dataset.store import load_store
+    train_until = str(load_store(columns=['Date'])['Date'].max().date())
+    return register_model(model, mapping, {'kind': 'legacy', 'train_until': train_until}, root)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Registry versi model")
+    parser.add_argument("--list", action="store_true", help="tampilkan semua versi")
+    parser.add_argument("--use", metavar="VERSI", help="aktifkan versi tertentu (rollback)")
+    parser.add_argument("--import-legacy", action="store_true", help="daftarkan model_rf.pkl lama sebagai versi baru")
+    parser.add_argument("--keep", type=int, help="hapus versi lama, sisakan N terakhir")
+    args = parser.parse_args()
+
+    if args.import_legacy:
+        print(f"Model lama didaftarkan sebagai {import_legacy()}")
+    if args.use:
+        set_current(args.use)
+        print(f"Versi aktif: {args.use}")
+    if args.keep:
+        print(f"Dihapus: {prune_versions(args.keep) or '-'}")
+    if args.list or not (args.use or args.import_legacy or args.keep):
+        active = current_version()
+        for version in list_versions():
+            meta = read_version_meta(version)
+            mark = '*' if version == active else ' '
+            print(f"{mark} {version}  {meta['created']}  {meta.get('backend', DEFAULT_BACKEND):<7}"
+                  f"{meta.get('kind', '-'):<12}{meta['n_trees']:>5} estimator  data s/d {meta.get('train_until', '-')}")
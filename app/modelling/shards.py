@@ -0,0 +1,163 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from app.profiling import count
+
+# Model bershard: satu model kecil per kabupaten atau per BPSDA (wilayah
+# sungai, sama dengan nama file PDF sumber). Baris X diarahkan ke shard lewat
+# kolom Kabupaten_Code, jadi dari luar tetap estimator dengan predict_proba
+# dan classes_. Shard dimuat saat pertama diminta dan disimpan di cache LRU
+# yang dibatasi ukuran artefak di disk (JATENG_SHARD_CACHE_MB).
+SHARD_BY = ('kabupaten', 'basin')
+BASINS = ['BengawanSolo', 'BodriKuto', 'PemaliComal', 'Probolo', 'Seluna', 'SerayuCitanduy']
+OTHER_BASIN = 'Lainnya'
+CODE_COLUMN = 0
+CLASSES = np.array([0, 1])
+CACHE_MB = float(os.environ.get('JATENG_SHARD_CACHE_MB', 512))
+
+def kabupaten_basins():
+    # Kabupaten -> BPSDA dengan baris terbanyak di CSV hasil ekstraksi; kabupaten
+    # yang melintasi dua wilayah sungai ikut wilayah tempat sebagian besar posnya
+    import pandas as pd
+    from Dataset.preprocessing import find_csv_files
+    counts = {}
+    for _, file_path, _ in find_csv_files():
+        basin = os.path.splitext(os.path.basename(file_path))[0]
+        if basin not in BASINS:
+            continue
+        for kab, n in pd.read_csv(file_path, usecols=['Kabupaten'])['Kabupaten'].value_counts().items():
+            counts.setdefault(kab, {}).setdefault(basin, 0)
+            counts[kab][basin] += n
+    return {kab: max(per_basin, key=per_basin.get) for kab, per_basin in counts.items()}
+
+def shard_names(kabupaten, by):
+    # Nama shard untuk setiap nilai kabupaten
+    if by == 'kabupaten':
+        return {kab: kab for kab in kabupaten}
+    if by == 'basin':
+        basins = kabupaten_basins()
+        return {kab: basins.get(kab, OTHER_BASIN) for kab in kabupaten}
+    raise ValueError(f"Pembagian shard tidak dikenal: {by} (pilihan: {', '.join(SHARD_BY)})")
+
+def shard_dir(path, index):
+    # Nama folder dari urutan shard, bukan nama kabupaten (bisa berisi spasi/karakter aneh)
+    return os.path.join(path, 'shards', f"{index:03d}")
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+class ShardedModel:
+    def __init__(self, routes, priors, default_prior, shards=None, path=None, backend=None, flat=True,
+                 cache_mb=CACHE_MB):
+        # routes: kode kabupaten -> nama shard. Kode tanpa shard (datanya terlalu
+        # sedikit atau hanya satu kelas) memakai proporsi hari hujannya di priors;
+        # kode yang tidak dikenal sama sekali memakai proporsi seluruh data.
+        self.routes = {int(code): name for code, name in routes.items()}
+        self.priors = {int(code): float(p) for code, p in priors.items()}
+        self.default_prior = float(default_prior)
+        self.shards = dict(shards or {})
+        self.names = sorted(set(self.routes.values()))
+        self.path = path
+        self.backend = backend
+        self.flat = flat
+        self.max_bytes = cache_mb * 2**20
+        self.classes_ = CLASSES
+        self.loaded = OrderedDict()
+        self.sizes = {}
+        self.stats = {'hits': 0, 'loads': 0, 'evictions': 0}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, meta, flat=True, cache_mb=CACHE_MB):
+        info = meta['shards']
+        model = cls(info['routes'], info['priors'], info['default_prior'], path=path, backend=meta.get('backend'),
+                    flat=flat, cache_mb=cache_mb)
+        model.names = [shard['name'] for shard in info['shards']]
+        model.sizes = {shard['name']: shard['serving_bytes' if flat else 'bytes'] for shard in info['shards']}
+        return model
+
+    def save(self, path, backend):
+        from app.modelling.backends import get_backend
+        shards = []
+        for index, name in enumerate(self.names):
+            target = shard_dir(path, index)
+            os.makedirs(target)
+            get_backend(backend).save(self.shards[name], target)
+            # serving_bytes: yang benar-benar dibuka saat prediksi (forest datar untuk rf)
+            forest = os.path.join(target, 'forest')
+            shards.append({'name': name, 'dir': os.path.relpath(target, path), 'bytes': dir_size(target),
+                           'serving_bytes': dir_size(forest) if os.path.isdir(forest) else dir_size(target)})
+        return {
+            'routes': {str(code): name for code, name in self.routes.items()},
+            'priors': {str(code): p for code, p in self.priors.items()},
+            'default_prior': self.default_prior,
+            'shards': shards,
+        }
+
+    def shard(self, name):
+        # LRU: shard yang baru dipakai dipindah ke belakang; shard terdepan dibuang
+        # selama total ukurannya melebihi batas (shard yang sedang diminta tetap dimuat)
+        with self.lock:
+            if name in self.loaded:
+                self.loaded.move_to_end(name)
+                self.stats['hits'] += 1
+                return self.loaded[name]
+        model = self.shards.get(name)
+        if model is None:
+            from app.modelling.backends import get_backend
+            index = self.names.index(name)
+            model = get_backend(self.backend).load(shard_dir(self.path, index), self.flat)
+        with self.lock:
+            self.loaded[name] = model
+            self.stats['loads'] += 1
+            count('shards.load')
+            while len(self.loaded) > 1 and sum(self.sizes.get(n, 0) for n in self.loaded) > self.max_bytes:
+                self.loaded.popitem(last=False)
+                self.stats['evictions'] += 1
+        return model
+
+    def predict_proba(self, X):
+        columns = getattr(X, 'columns', None)
+        values = np.asarray(X, dtype=np.float64)
+        # Routing per kode unik, bukan per baris: permintaan tunggal cukup satu lookup
+        codes, inverse = np.unique(values[:, CODE_COLUMN].astype(np.int64), return_inverse=True)
+        prior = np.array([self.priors.get(code, self.default_prior) for code in codes])[inverse]
+        proba = np.column_stack([1 - prior, prior])
+        by_shard = {}
+        for i, code in enumerate(codes):
+            if code in self.routes:
+                by_shard.setdefault(self.routes[code], []).append(i)
+        for name, code_index in by_shard.items():
+            rows = slice(None) if len(codes) == 1 else np.flatnonzero(np.isin(inverse, code_index))
+            model = self.shard(name)
+            part = values[rows]
+            if columns is not None and hasattr(model, 'feature_names_in_'):
+                # Estimator sklearn dilatih dengan DataFrame; forest datar cukup larik
+                import pandas as pd
+                part = pd.DataFrame(part, columns=columns)
+            result = model.predict_proba(part)
+            proba[rows] = 0.0
+            # Kelas shard bisa berurutan lain; disusun ulang ke [0, 1]
+            for j, label in enumerate(model.classes_):
+                proba[rows, int(label)] = result[:, j]
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def get_params(self):
+        return next(iter(self.shards.values())).get_params() if self.shards else {}
+
+    def cache_info(self):
+        with self.lock:
+            return {**self.stats, 'loaded': list(self.loaded), 'n_shards': len(self.names),
+                    'loaded_mb': sum(self.sizes.get(n, 0) for n in self.loaded) / 2**20,
+                    'max_mb': self.max_bytes / 2**20}
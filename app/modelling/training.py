@@ -1,71 +1,103 @@
 import pandas as pd
 import numpy as np
 import os
-import joblib
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
 from sklearn.utils import resample
-from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
+from sklearn.metrics import accuracy_score, confusion_matrix, classification_report, f1_score, precision_score, recall_score
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(os.path.dirname(current_dir))
-processed_path = os.path.join(project_root, 'dataset', 'processed')
 models_path = os.path.join(current_dir, 'saved_models')
+fold_cache_path = os.path.join(project_root, 'Dataset', 'processed', 'cv_folds')
+cv_report_file = os.path.join(models_path, 'cv_report.json')
+sys.path.insert(0, project_root)
+
+from Dataset.store import load_store, store_exists, store_path, store_version
+from app.modelling.features import (
+    FEATURE_COLUMNS, build_lag_table, save_lag_table, load_lag_table,
+    lag_table_path, seasonal_features,
+)
+from app.modelling.backends import BACKENDS, DEFAULT_BACKEND, RANDOM_STATE, get_backend
+from app.profiling import profiled, span
+from app.modelling.registry import (
+    current_version, extend_code_table, load_code_table, load_version, read_version_meta, register_model,
+)
+from app.modelling.shards import SHARD_BY, ShardedModel, shard_names
 
 os.makedirs(models_path, exist_ok=True)
 
-def train_model():
-    data_file = os.path.join(processed_path, 'data_training_gabungan.csv')
-    if not os.path.exists(data_file):
-        print("Error: File data tidak ditemukan.")
-        return
+MIN_SHARD_ROWS = 200
 
-    df = pd.read_csv(data_file)
+@profiled('training.load_training_frame')
+def load_training_frame(path=store_path, lag_path=lag_table_path, max_rows=None):
+    df = load_store(columns=['Date', 'Tahun', 'Bulan', 'Tanggal', 'Kabupaten', 'Curah_Hujan'], path=path)
     df = df.dropna(subset=['Curah_Hujan', 'Kabupaten'])
 
-    df["Tanggal_Full"] = pd.to_datetime(df["Tahun"].astype(str) + "-" + df["Bulan"].astype(str) + "-" + df["Tanggal"].astype(str))
+    if not os.path.exists(lag_path):
+        save_lag_table(build_lag_table(df.assign(Kabupaten=df["Kabupaten"].astype(str))), lag_path)
+    if max_rows is not None and len(df) > max_rows:
+        # Sampel diambil selagi kolomnya masih kode numerik, sebelum kolom teks,
+        # merge, dan fitur dibuat: memori mengikuti max_rows, bukan ukuran store.
+        # Fitur lag tetap dihitung dari seluruh data.
+        df = df.sample(n=max_rows, random_state=RANDOM_STATE)
+    df["Kabupaten"] = df["Kabupaten"].astype(str)
+    lag_table = load_lag_table(lag_path)
 
-    df = df.sort_values("Tanggal_Full")
+    # Fitur lag diambil dari tabel per (Kabupaten, Date) yang juga dipakai aplikasi
+    df = df.merge(lag_table.reset_index(), on=["Kabupaten", "Date"], how="inner")
 
-    df["rain_prev_1"] = df["Curah_Hujan"].shift(1)
-    df["rain_prev_3"] = df["Curah_Hujan"].rolling(3).mean()
-    df["rain_prev_7"] = df["Curah_Hujan"].rolling(7).mean()
-    df["rain_prev_14"] = df["Curah_Hujan"].rolling(14).sum()
-    df["rain_prev_30"] = df["Curah_Hujan"].rolling(30).sum()
+    df["Label"] = (df["Curah_Hujan"] >= 1).astype(int)
 
-    df = df.dropna()
+    # Kode kabupaten dari tabel registry yang hanya bertambah di belakang,
+    # sehingga kabupaten baru tidak menggeser kode yang dipakai model lama
+    mapping = extend_code_table(load_code_table(), df["Kabupaten"].unique())
+    df["Kabupaten_Code"] = df["Kabupaten"].map({kab: i for i, kab in enumerate(mapping)}).astype(int)
 
-    df["Label"] = (df["Curah_Hujan"] >= 1).astype(int)
+    for name, values in seasonal_features(df["Bulan"], df["Tanggal"]).items():
+        df[name] = values
+    return df, mapping
 
+@profiled('training.upsample')
+def upsample(df, random_state=RANDOM_STATE):
     df_major = df[df["Label"] == 0]
     df_minor = df[df["Label"] == 1]
-    df_minor_up = resample(df_minor, replace=True, n_samples=len(df_major), random_state=42)
-    df_bal = pd.concat([df_major, df_minor_up])
+    df_minor_up = resample(df_minor, replace=True, n_samples=len(df_major), random_state=random_state)
+    return pd.concat([df_major, df_minor_up])
 
-    df_bal["Kabupaten_Code"] = df_bal["Kabupaten"].astype("category").cat.codes
+@profiled('training.save_model')
+def save_model(model, kabupaten_mapping, df, backend=DEFAULT_BACKEND, **info):
+    # Setiap model disimpan sebagai versi baru di registry, bukan menimpa file lama
+    info.setdefault("train_until", str(df["Date"].max().date()))
+    info.setdefault("n_rows", int(len(df)))
+    version = register_model(model, kabupaten_mapping, info, backend=backend)
+    print(f"Model disimpan sebagai versi {version}.")
+    return version
 
-    df_bal["sin_bulan"] = np.sin(2 * np.pi * df_bal["Bulan"] / 12)
-    df_bal["cos_bulan"] = np.cos(2 * np.pi * df_bal["Bulan"] / 12)
-    df_bal["sin_tgl"] = np.sin(2 * np.pi * df_bal["Tanggal"] / 31)
-    df_bal["cos_tgl"] = np.cos(2 * np.pi * df_bal["Tanggal"] / 31)
+def train_model(backend=DEFAULT_BACKEND, params=None):
+    if not store_exists():
+        print("Error: File data tidak ditemukan.")
+        return
 
-    df_bal["Musim"] = df_bal["Bulan"].apply(lambda x: 1 if x in [10, 11, 12, 1, 2, 3] else 0)
+    df, kabupaten_mapping = load_training_frame()
+    df_bal = upsample(df)
 
-    fitur = df_bal[[
-        "Kabupaten_Code",
-        "sin_bulan", "cos_bulan",
-        "sin_tgl", "cos_tgl",
-        "Musim",
-        "rain_prev_1", "rain_prev_3", "rain_prev_7",
-        "rain_prev_14", "rain_prev_30"
-    ]]
+    fitur = df_bal[FEATURE_COLUMNS]
 
     y = df_bal["Label"]
 
-    X_train, X_test, y_train, y_test = train_test_split(fitur, y, test_size=0.2, random_state=42)
+    X_train, X_test, y_train, y_test = train_test_split(fitur, y, test_size=0.2, random_state=RANDOM_STATE)
 
-    model = RandomForestClassifier(n_estimators=200, random_state=42)
-    model.fit(X_train, y_train)
+    model = get_backend(backend).make(params)
+    with span('training.fit', backend=backend, rows=len(X_train)):
+        model.fit(X_train, y_train)
 
     y_pred = model.predict(X_test)
 
@@ -74,12 +106,281 @@ def train_model():
     print(confusion_matrix(y_test, y_pred))
     print(classification_report(y_test, y_pred))
 
-    joblib.dump(model, os.path.join(models_path, "model_rf.pkl"))
-    joblib.dump({
-        "kabupaten_mapping": df_bal["Kabupaten"].astype("category").cat.categories.tolist()
-    }, os.path.join(models_path, "encoder_kabupaten.pkl"))
+    save_model(model, kabupaten_mapping, df, backend, kind="full", accuracy=acc)
+
+# ---------------------------------------------------------------------------
+# Model bershard: satu model per kabupaten atau per BPSDA, dilatih paralel.
+# Split dan upsampling sama dengan train_model agar akurasinya sebanding.
+# ---------------------------------------------------------------------------
+
+@profiled('training.fit_shard')
+def fit_shard(backend, params, X, y):
+    model = get_backend(backend).make(params, n_jobs=1)
+    model.fit(X, y)
+    return model
+
+@profiled('training.train_shards')
+def train_shards(train, kabupaten_mapping, by, priors_from, backend=DEFAULT_BACKEND, params=None, workers=None):
+    names = shard_names(kabupaten_mapping, by)
+    groups = dict(tuple(train.groupby(train["Kabupaten"].map(names))))
+    # Shard dengan data terlalu sedikit atau satu kelas tidak dilatih; kabupatennya memakai prior
+    trainable = {name: part for name, part in groups.items()
+                 if len(part) >= MIN_SHARD_ROWS and part["Label"].nunique() == 2}
+    models = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fit_shard, backend, params, part[FEATURE_COLUMNS], part["Label"]): name
+                   for name, part in trainable.items()}
+        for future in as_completed(futures):
+            models[futures[future]] = future.result()
+
+    rain_rate = priors_from.groupby("Kabupaten")["Label"].mean()
+    routes, priors = {}, {}
+    for code, kab in enumerate(kabupaten_mapping):
+        if names[kab] in models:
+            routes[code] = names[kab]
+        elif kab in rain_rate.index:
+            priors[code] = float(rain_rate[kab])
+    return ShardedModel(routes, priors, priors_from["Label"].mean(), shards=models, backend=backend)
+
+def train_sharded_model(by, backend=DEFAULT_BACKEND, params=None, workers=None):
+    if not store_exists():
+        print("Error: File data tidak ditemukan.")
+        return
+
+    df, kabupaten_mapping = load_training_frame()
+    df_bal = upsample(df)
+    train, test = train_test_split(df_bal, test_size=0.2, random_state=RANDOM_STATE)
+
+    t0 = time.perf_counter()
+    model = train_shards(train, kabupaten_mapping, by, df, backend, params, workers)
+    fit_seconds = time.perf_counter() - t0
+    y_pred = model.predict(test[FEATURE_COLUMNS])
+
+    acc = accuracy_score(test["Label"], y_pred)
+    print(f"{len(model.shards)} shard per {by} dilatih dalam {fit_seconds:.1f} detik "
+          f"({len(model.priors)} kabupaten memakai prior)")
+    print(f"Akurasi: {acc*100:.2f}%")
+    print(confusion_matrix(test["Label"], y_pred))
+    print(classification_report(test["Label"], y_pred))
+
+    return save_model(model, kabupaten_mapping, df, backend, kind="sharded", shard_by=by, accuracy=acc)
+
+# ---------------------------------------------------------------------------
+# Walk-forward CV: fold tahun Y dilatih dengan semua tahun < Y dan diuji pada
+# tahun Y. Upsampling hanya dilakukan pada data latih fold, data uji tetap
+# dengan distribusi asli.
+# ---------------------------------------------------------------------------
+
+def fold_cache_key(years):
+    h = hashlib.sha256()
+    h.update(store_version(store_path).encode())
+    stat = os.stat(lag_table_path)
+    h.update(f"{stat.st_size}:{stat.st_mtime_ns}:{years}:{RANDOM_STATE}:{FEATURE_COLUMNS}".encode())
+    h.update(json.dumps(load_code_table()).encode())
+    return h.hexdigest()[:12]
+
+@profiled('training.build_folds')
+def cv_years(df):
+    # Semua tahun yang ada di data, termasuk tahun baru dari preprocessing inkremental
+    return sorted(int(year) for year in df["Tahun"].unique())
 
-    print("Model berhasil disimpan.")
+def build_folds(df, years=None, cache_root=fold_cache_path):
+    # Matriks fitur tiap fold ditulis sekali sebagai .npy lalu dibuka dengan
+    # mmap oleh setiap worker, sehingga tidak dihitung ulang per kandidat.
+    years = cv_years(df) if years is None else years
+    cache_dir = os.path.join(cache_root, fold_cache_key(years))
+    folds = []
+    for test_year in years[1:]:
+        fold_dir = os.path.join(cache_dir, str(test_year))
+        folds.append((test_year, fold_dir))
+        if os.path.exists(os.path.join(fold_dir, 'done')):
+            continue
+        os.makedirs(fold_dir, exist_ok=True)
+        train = upsample(df[(df["Tahun"] >= years[0]) & (df["Tahun"] < test_year)])
+        test = df[df["Tahun"] == test_year]
+        for name, part in (("train", train), ("test", test)):
+            np.save(os.path.join(fold_dir, f"X_{name}.npy"), part[FEATURE_COLUMNS].to_numpy(dtype=np.float32))
+            np.save(os.path.join(fold_dir, f"y_{name}.npy"), part["Label"].to_numpy(dtype=np.int8))
+        open(os.path.join(fold_dir, 'done'), 'w').close()
+
+    # Cache dari versi data sebelumnya tidak dipakai lagi
+    if os.path.exists(cache_root):
+        for name in os.listdir(cache_root):
+            if name != os.path.basename(cache_dir):
+                shutil.rmtree(os.path.join(cache_root, name), ignore_errors=True)
+    return folds
+
+def param_candidates(grid):
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+@profiled('training.fit_fold')
+def fit_fold(backend, params, fold_dir):
+    started = time.time()
+    X_train = np.load(os.path.join(fold_dir, "X_train.npy"), mmap_mode='r')
+    y_train = np.load(os.path.join(fold_dir, "y_train.npy"))
+    X_test = np.load(os.path.join(fold_dir, "X_test.npy"), mmap_mode='r')
+    y_test = np.load(os.path.join(fold_dir, "y_test.npy"))
+
+    model = get_backend(backend).make(params, n_jobs=1)
+    model.fit(X_train, y_train)
+    y_pred = model.predict(X_test)
+    return {
+        "accuracy": accuracy_score(y_test, y_pred),
+        "f1": f1_score(y_test, y_pred, zero_division=0),
+        "precision": precision_score(y_test, y_pred, zero_division=0),
+        "recall": recall_score(y_test, y_pred, zero_division=0),
+        "fit_seconds": time.time() - started,
+        "started": started,
+        "finished": time.time(),
+    }
+
+@profiled('training.cross_validate')
+def cross_validate(grid=None, years=None, workers=None, refit=True, backend=DEFAULT_BACKEND):
+    if not store_exists():
+        print("Error: File data tidak ditemukan.")
+        return None
+
+    t0 = time.perf_counter()
+    df, kabupaten_mapping = load_training_frame()
+    years = cv_years(df) if years is None else years
+    folds = build_folds(df, years)
+    print(f"{len(folds)} fold ({', '.join(str(y) for y, _ in folds)}) siap dalam {time.perf_counter() - t0:.1f} detik")
+
+    candidates = param_candidates(grid or get_backend(backend).grid)
+    results = {i: {} for i in range(len(candidates))}
+    # Semua pasangan (kandidat, fold) dibagi ke process pool sekaligus
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(fit_fold, backend, params, fold_dir): (i, year)
+            for i, params in enumerate(candidates)
+            for year, fold_dir in folds
+        }
+        for future in as_completed(futures):
+            i, year = futures[future]
+            results[i][year] = future.result()
+
+    report = []
+    for i, params in enumerate(candidates):
+        per_fold = results[i]
+        report.append({
+            "params": params,
+            "mean_f1": float(np.mean([r["f1"] for r in per_fold.values()])),
+            "mean_accuracy": float(np.mean([r["accuracy"] for r in per_fold.values()])),
+            "fit_seconds": sum(r["fit_seconds"] for r in per_fold.values()),
+            "wall_seconds": max(r["finished"] for r in per_fold.values()) - min(r["started"] for r in per_fold.values()),
+            "folds": {str(year): {k: v for k, v in r.items() if k not in ("started", "finished")}
+                      for year, r in sorted(per_fold.items())},
+        })
+    report.sort(key=lambda r: r["mean_f1"], reverse=True)
+
+    print(f"{'f1':>7}{'akurasi':>9}{'fit (s)':>9}{'wall (s)':>10}  parameter")
+    for r in report:
+        print(f"{r['mean_f1']:>7.3f}{r['mean_accuracy']:>9.3f}{r['fit_seconds']:>9.1f}{r['wall_seconds']:>10.1f}  {r['params']}")
+
+    best = report[0]
+    summary = {
+        "backend": backend,
+        "years": years,
+        "metric": "mean_f1",
+        "best_params": best["params"],
+        "candidates": report,
+        "total_seconds": time.perf_counter() - t0,
+    }
+
+    if refit:
+        # Model akhir dilatih dengan seluruh data memakai parameter terbaik
+        t1 = time.perf_counter()
+        train = upsample(df)
+        model = get_backend(backend).make(best["params"], n_jobs=workers or -1)
+        with span('training.refit', backend=backend, rows=len(train)):
+            model.fit(train[FEATURE_COLUMNS], train["Label"])
+        if "n_jobs" in model.get_params():
+            model.set_params(n_jobs=None)
+        summary["refit_seconds"] = time.perf_counter() - t1
+        summary["version"] = save_model(model, kabupaten_mapping, train, backend, kind="cv", cv_mean_f1=best["mean_f1"])
+        print(f"Model terbaik {best['params']} dilatih ulang dalam {summary['refit_seconds']:.1f} detik.")
+
+    tmp = cv_report_file + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp, cv_report_file)
+    print(f"Laporan CV: {cv_report_file}")
+    return summary
+
+# ---------------------------------------------------------------------------
+# Training inkremental: pohon baru dilatih hanya dengan data setelah
+# train_until versi aktif lalu ditambahkan ke forest yang ada (warm start).
+# ---------------------------------------------------------------------------
+
+@profiled('training.train_incremental')
+def train_incremental(new_trees=20, since=None, max_trees=None, workers=None):
+    parent = current_version()
+    if parent is None:
+        print("Error: Belum ada versi di registry. Jalankan training penuh atau --import-legacy dulu.")
+        return None
+
+    t0 = time.perf_counter()
+    parent_meta = read_version_meta(parent)
+    backend = parent_meta.get("backend", DEFAULT_BACKEND)
+    if "shards" in parent_meta:
+        print("Error: Training inkremental belum mendukung model bershard; latih ulang dengan --shards.")
+        return None
+    if not get_backend(backend).supports_incremental:
+        print(f"Error: Backend '{backend}' tidak mendukung training inkremental.")
+        return None
+    since = pd.Timestamp(since or parent_meta.get("train_until") or "1970-01-01")
+    df, kabupaten_mapping = load_training_frame()
+    new = df[df["Date"] > since]
+    if new["Label"].nunique() < 2:
+        print(f"Data baru setelah {since.date()} tidak cukup ({len(new)} baris, perlu hujan dan tidak hujan).")
+        return None
+
+    model, _ = load_version(parent, flat=False)
+    n_old = len(model.estimators_)
+    train = upsample(new)
+    model.set_params(warm_start=True, n_estimators=n_old + new_trees, n_jobs=workers or -1)
+    with span('training.warm_start_fit', rows=len(train), new_trees=new_trees):
+        model.fit(train[FEATURE_COLUMNS], train["Label"])
+    model.set_params(warm_start=False, n_jobs=None)
+
+    pruned = 0
+    if max_trees and len(model.estimators_) > max_trees:
+        # Pohon tertua dibuang agar ukuran model tetap
+        pruned = len(model.estimators_) - max_trees
+        model.estimators_ = model.estimators_[pruned:]
+        model.set_params(n_estimators=max_trees)
+    fit_seconds = time.perf_counter() - t0
+
+    version = save_model(model, kabupaten_mapping, new, backend, kind="incremental", parent=parent,
+                         since=str(since.date()), added_trees=new_trees, pruned_trees=pruned)
+    print(f"{len(new)} baris baru, +{new_trees} pohon, -{pruned} pohon lama "
+          f"({n_old} -> {len(model.estimators_)}); fit {fit_seconds:.1f} detik, "
+          f"total {time.perf_counter() - t0:.1f} detik.")
+    return version
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Latih model prediksi hujan")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND, help="jenis model")
+    parser.add_argument("--cv", action="store_true", help="walk-forward CV per tahun + pencarian grid parameter")
+    parser.add_argument("--quick", action="store_true", help="grid kecil untuk uji cepat (dengan --cv)")
+    parser.add_argument("--workers", type=int, default=None, help="jumlah proses (default: semua core)")
+    parser.add_argument("--no-refit", action="store_true", help="hanya laporan CV, model tidak disimpan")
+    parser.add_argument("--incremental", action="store_true", help="tambah pohon dari data baru ke versi aktif")
+    parser.add_argument("--new-trees", type=int, default=20, help="jumlah pohon baru (dengan --incremental)")
+    parser.add_argument("--since", default=None, help="tanggal awal data baru (default: train_until versi aktif)")
+    parser.add_argument("--max-trees", type=int, default=None, help="buang pohon tertua jika melebihi N")
+    parser.add_argument("--shards", choices=SHARD_BY, default=None,
+                        help="latih satu model per kabupaten atau per BPSDA (wilayah sungai)")
+    args = parser.parse_args()
+
+    if args.shards:
+        train_sharded_model(args.shards, args.backend, workers=args.workers)
+    elif args.incremental:
+        train_incremental(args.new_trees, args.since, args.max_trees, args.workers)
+    elif args.cv:
+        backend = get_backend(args.backend)
+        cross_validate(backend.quick_grid if args.quick else backend.grid, workers=args.workers,
+                       refit=not args.no_refit, backend=args.backend)
+    else:
+        train_model(args.backend)
@@ -1,46 +1,282 @@
 import os
-import joblib
+import sys
+import json
+import time
+import asyncio
+import argparse
+import traceback
+from collections import deque
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
 import pandas as pd
-from datetime import datetime
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
-models_path = os.path.join(current_dir, 'modelling/saved_models')
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
 
-model = joblib.load(os.path.join(models_path, 'model_rf.pkl'))
-encoder = joblib.load(os.path.join(models_path, 'encoder_kabupaten.pkl'))
-feature_cols = joblib.load(os.path.join(models_path, 'feature_columns.pkl'))
+from Dataset.store import load_store
+from Dataset.ingest import snapshot_token, with_snapshot
+from app.forecast import build_lookup, pair_features, rain_proba
+from app.modelling.registry import active_version, model_for_version
 
-def predict_hujan(tanggal_str, kabupaten):
-    try:
-        t = datetime.strptime(tanggal_str, "%Y-%m-%d")
-    except:
-        t = datetime.strptime(tanggal_str, "%d-%m-%Y")
+MAX_BATCH = 256
+MAX_WAIT_MS = 3.0
+METRICS_WINDOW = 10000
+RELOAD_INTERVAL = 5.0
+
+def parse_tanggal(tanggal_str):
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return pd.to_datetime(tanggal_str, format=fmt)
+        except (ValueError, TypeError):
+            continue
+    raise ValueError(f"Format tanggal tidak dikenal: {tanggal_str!r}")
+
+class PredictionService:
+    # Model dan data dimuat sekali. Permintaan yang datang dalam beberapa
+    # milidetik digabung menjadi satu panggilan predict_proba.
+    def __init__(self, model, kabupaten_mapping, lookup, version=None, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.swap(model, kabupaten_mapping, version)
+        # Lookup dasar dari store; self.lookup = lookup dasar + snapshot ingest terbaru
+        self.base_lookup = lookup
+        self.snapshot = None
+        self.lookup = lookup
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.latencies = deque(maxlen=METRICS_WINDOW)
+        self.batch_sizes = deque(maxlen=METRICS_WINDOW)
+        self.requests = 0
+        self.errors = 0
+
+    def swap(self, model, kabupaten_mapping, version):
+        # Satu assignment: batch yang sedang berjalan tetap memakai model lama
+        mapping = list(kabupaten_mapping)
+        self.active = (model, mapping, {kab: i for i, kab in enumerate(mapping)}, version)
+
+    @property
+    def kabupaten_mapping(self):
+        return self.active[1]
+
+    @property
+    def version(self):
+        return self.active[3]
+
+    def refresh_observations(self):
+        # Snapshot ingest baru digabung ke lookup dasar, lalu diganti dengan satu assignment
+        token = snapshot_token()
+        if token != self.snapshot:
+            self.lookup = with_snapshot(self.base_lookup)
+            self.snapshot = token
+            return True
+        return False
+
+    async def watch_registry(self, interval=RELOAD_INTERVAL):
+        # Ganti model tanpa restart begitu versi aktif di registry berubah,
+        # dan pakai bacaan harian baru begitu snapshot ingest diterbitkan
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await loop.run_in_executor(None, self.refresh_observations):
+                    print(f"Data harian diperbarui (snapshot ingest #{self.lookup.get('snapshot')})")
+            except Exception as e:
+                print(f"Gagal memuat snapshot ingest: {e}")
+            try:
+                version = active_version()
+                if version != self.version:
+                    model, mapping = await loop.run_in_executor(None, model_for_version, version)
+                    self.swap(model, mapping, version)
+                    print(f"Model diganti ke versi {version}")
+            except Exception as e:
+                print(f"Gagal memuat versi baru: {e}")
+
+    def score(self, kabupaten, dates):
+        model, _, kab_codes, _ = self.active
+        codes = [kab_codes.get(kab, -1) for kab in kabupaten]
+        X = pair_features(self.lookup, kabupaten, codes, dates)
+        return rain_proba(model, X)
 
-    bulan = t.month
-    tanggal_hari = t.day
+    async def predict(self, tanggal, kabupaten):
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+            asyncio.get_running_loop().create_task(self.batcher())
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((parse_tanggal(tanggal), kabupaten, future))
+        return await future
 
-    kab_encoded = encoder.transform(pd.DataFrame({"Kabupaten": [kabupaten]}))
-    kab_cols = encoder.get_feature_names_out(["Kabupaten"])
-    df_kab = pd.DataFrame(kab_encoded.toarray(), columns=kab_cols)
+    async def batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
 
-    fitur_lain = pd.DataFrame([{
-        "Bulan": bulan,
-        "Tanggal": tanggal_hari
-    }])
+            dates = [item[0] for item in batch]
+            kabupaten = [item[1] for item in batch]
+            try:
+                # predict_proba dijalankan di thread lain agar event loop tetap menerima permintaan
+                probs = await loop.run_in_executor(None, self.score, kabupaten, dates)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batch_sizes.append(len(batch))
+            for (_, _, future), prob in zip(batch, probs):
+                if not future.done():
+                    future.set_result(float(prob))
 
-    X_new = pd.concat([fitur_lain, df_kab], axis=1)
-    X_new = X_new.reindex(columns=feature_cols, fill_value=0)
+    def metrics(self):
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        batches = np.array(self.batch_sizes) if self.batch_sizes else np.zeros(1)
+        model = self.active[0]
+        metrics = {
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_ms": {
+                "p50": float(np.percentile(latencies, 50)),
+                "p99": float(np.percentile(latencies, 99)),
+                "max": float(latencies.max()),
+            },
+            "batch_size": {
+                "mean": float(batches.mean()),
+                "p50": float(np.percentile(batches, 50)),
+                "max": int(batches.max()),
+                "batches": len(self.batch_sizes),
+            },
+        }
+        if hasattr(model, "cache_info"):
+            # Model bershard: shard mana yang sedang dimuat dan berapa kali dimuat/dibuang
+            metrics["shards"] = model.cache_info()
+        return metrics
 
-    pred = model.predict(X_new)[0]
-    return "Hujan" if pred == 1 else "Tidak Hujan"
+    async def handle_predict(self, params):
+        tanggal = params.get("tanggal")
+        kabupaten = params.get("kabupaten")
+        if not tanggal or not kabupaten:
+            return 400, {"error": "parameter 'tanggal' dan 'kabupaten' wajib diisi"}
+        if not isinstance(tanggal, str) or not isinstance(kabupaten, str):
+            return 400, {"error": "parameter 'tanggal' dan 'kabupaten' harus string"}
+        if kabupaten not in self.active[2]:
+            return 404, {"error": f"kabupaten tidak dikenal: {kabupaten}"}
+        try:
+            prob = await self.predict(tanggal, kabupaten)
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        label = int(prob > 0.5)
+        return 200, {
+            "tanggal": str(tanggal),
+            "kabupaten": kabupaten,
+            "probabilitas": prob,
+            "label": label,
+            "hasil": "Hujan" if label == 1 else "Tidak Hujan",
+        }
+
+    async def route(self, method, target, body):
+        url = urlsplit(target)
+        if url.path == "/predict":
+            if method == "POST":
+                try:
+                    params = json.loads(body or b"{}")
+                except ValueError:
+                    return 400, {"error": "body harus JSON"}
+                if not isinstance(params, dict):
+                    return 400, {"error": "body harus objek JSON"}
+            else:
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            return await self.handle_predict(params)
+        if url.path == "/metrics":
+            return 200, self.metrics()
+        if url.path == "/kabupaten":
+            return 200, self.kabupaten_mapping
+        if url.path == "/health":
+            return 200, {"status": "ok", "model_version": self.version}
+        return 404, {"error": "not found"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                t0 = time.perf_counter()
+                try:
+                    status, payload = await self.route(method, target, body)
+                except Exception as e:
+                    # Kesalahan tak terduga tetap dijawab (dan dihitung) agar koneksi tidak putus
+                    traceback.print_exc()
+                    status, payload = 500, {"error": f"kesalahan internal: {type(e).__name__}"}
+                if target.startswith("/predict"):
+                    self.requests += 1
+                    if status == 200:
+                        self.latencies.append(time.perf_counter() - t0)
+                    else:
+                        self.errors += 1
+
+                data = json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+def load_service(max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+    version = active_version()
+    model, mapping = model_for_version(version)
+    df = load_store(columns=['Date', 'Bulan', 'Kabupaten', 'Curah_Hujan'])
+    service = PredictionService(model, mapping, build_lookup(df), version, max_batch, max_wait_ms)
+    service.refresh_observations()
+    return service
+
+async def serve(host, port, service, reload_interval=RELOAD_INTERVAL):
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    watcher = asyncio.get_running_loop().create_task(service.watch_registry(reload_interval))
+    print(f"Layanan prediksi berjalan di http://{host}:{port} (GET /predict?tanggal=YYYY-MM-DD&kabupaten=...)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
 
 if __name__ == "__main__":
-    print("=== Prediksi Hujan Berdasarkan Tanggal & Kabupaten ===")
-    tanggal = input("Masukkan tanggal (YYYY-MM-DD): ")
-    kab = input("Masukkan nama kabupaten: ")
-
-    hasil = predict_hujan(tanggal, kab)
-    
-    print("-" * 50)
-    print(f"Prediksi {tanggal} di {kab}: {hasil}")
-    print("-" * 50)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Layanan HTTP prediksi hujan dengan micro-batching")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--reload-interval", type=float, default=RELOAD_INTERVAL, help="detik antar pengecekan versi model")
+    args = parser.parse_args()
+
+    service = load_service(args.max_batch, args.max_wait_ms)
+    try:
+        asyncio.run(serve(args.host, args.port, service, args.reload_interval))
+    except KeyboardInterrupt:
+        pass
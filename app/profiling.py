@@ -0,0 +1,109 @@
+import os
+import json
+import time
+import atexit
+import threading
+import functools
+import itertools
+import contextvars
+from collections import deque, defaultdict
+from contextlib import nullcontext
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# JATENG_PROFILE=1 mengaktifkan span; JATENG_PROFILE_FILE menentukan file
+# JSONL (default profile.jsonl di root proyek). Jika tidak aktif, profiled()
+# mengembalikan fungsi aslinya dan span() mengembalikan context kosong,
+# sehingga biayanya hampir nol.
+ENABLED = os.environ.get('JATENG_PROFILE', '').lower() not in ('', '0', 'false', 'no')
+PROFILE_FILE = os.environ.get('JATENG_PROFILE_FILE', os.path.join(project_root, 'profile.jsonl'))
+RECENT_SPANS = 5000
+
+recent = deque(maxlen=RECENT_SPANS)
+counters = defaultdict(int)
+_local = threading.local()
+_lock = threading.Lock()
+_file = None
+# Nomor run per konteks, bukan global: setiap sesi Streamlit menjalankan
+# skripnya di thread sendiri, jadi span sesi lain tidak ikut terhitung
+_run = contextvars.ContextVar('jateng_profile_run', default=0)
+_run_ids = itertools.count(1)
+_NULL = nullcontext()
+
+def _write(record):
+    global _file
+    recent.append(record)
+    with _lock:
+        if _file is None:
+            # Dibuka per proses; mode append agar worker ProcessPool bisa menulis ke file yang sama
+            _file = open(PROFILE_FILE, 'a', buffering=1)
+        _file.write(json.dumps(record, default=str) + '\n')
+
+class Span:
+    __slots__ = ('name', 'attrs', 'start', 'parent')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1] if stack else None
+        stack.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self.start) * 1000
+        _local.stack.pop()
+        record = {'ts': time.time(), 'span': self.name, 'ms': ms, 'pid': os.getpid(), 'run': _run.get()}
+        if self.parent:
+            record['parent'] = self.parent
+        if self.attrs:
+            record['attrs'] = self.attrs
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        _write(record)
+        return False
+
+def span(name, **attrs):
+    if not ENABLED:
+        return _NULL
+    return Span(name, attrs)
+
+def profiled(name=None):
+    def decorate(func):
+        if not ENABLED:
+            return func
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(label, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def count(name, n=1):
+    if ENABLED:
+        counters[name] += n
+
+def flush_counters():
+    if ENABLED and counters:
+        _write({'ts': time.time(), 'counters': dict(counters), 'pid': os.getpid(), 'run': _run.get()})
+        counters.clear()
+
+def start_run():
+    # Penanda satu rerun Streamlit (atau satu eksekusi CLI) untuk mengelompokkan span
+    flush_counters()
+    run = next(_run_ids)
+    _run.set(run)
+    return run
+
+def spans_for_runs(runs):
+    runs = set(runs)
+    return [record for record in list(recent) if record.get('run') in runs and 'span' in record]
+
+atexit.register(flush_counters)
@@ -1,240 +1,341 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import joblib
-import os
-from datetime import datetime, timedelta
-import plotly.express as px
+import io
+from datetime import datetime
+from app import profiling
+from app.profiling import span
+from app.modelling.registry import active_version, mapping_for_version, model_for_version
 
 # Configuration
 st.set_page_config(page_title="Jateng Rain Forecast", page_icon="🌧️", layout="wide")
 
+# Setiap rerun diberi nomor agar panel Performance bisa menampilkan N rerun terakhir;
+# hanya PERF_MAX_RUNS nomor terakhir yang disimpan di sesi
+PERF_MAX_RUNS = 20
+if profiling.ENABLED:
+    from collections import deque
+    st.session_state.setdefault('perf_runs', deque(maxlen=PERF_MAX_RUNS)).append(profiling.start_run())
+
 # Constants & Paths
-MODELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'modelling', 'saved_models')
-DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Dataset', 'processed', 'data_training_gabungan.csv')
+# Hanya kolom yang dipakai build_lookup; halaman EDA membaca cube agregat
+DATA_COLUMNS = ['Date', 'Bulan', 'Kabupaten', 'Curah_Hujan']
 
 # Load Data & Models
-@st.cache_resource
-def load_resources():
+# Tidak ada yang dimuat saat start. Masing-masing sumber daya punya cache sendiri:
+# model saat prediksi pertama, data + lookup saat ramalan pertama, cube EDA saat
+# halaman EDA pertama dibuka, dan plotly saat grafik pertama digambar.
+# Dikunci dengan versi store: data diproses ulang -> lookup dibangun ulang
+@st.cache_resource(max_entries=1)
+def load_lookup(data_version):
+    try:
+        from Dataset.store import load_store
+        from app.forecast import build_lookup
+        return build_lookup(load_store(columns=DATA_COLUMNS))
+    except Exception as e:
+        return None
+
+# Versi aktif dibaca setiap rerun dan dipakai sebagai kunci cache, jadi
+# begitu registry pindah versi, aplikasi memuat model baru tanpa restart
+@st.cache_resource(max_entries=2)
+def load_model_version(version):
     try:
-        model = joblib.load(os.path.join(MODELS_PATH, 'model_rf.pkl'))
-        encoder = joblib.load(os.path.join(MODELS_PATH, 'encoder_kabupaten.pkl'))
-        df = pd.read_csv(DATA_PATH)
-        df['Date'] = pd.to_datetime(df['Date'])
-        if 'Curah Hujan' in df.columns: df.rename(columns={'Curah Hujan': 'Curah_Hujan'}, inplace=True)
-        return model, encoder, df.sort_values('Date')
+        model, mapping = model_for_version(version)
+        return model, {'kabupaten_mapping': mapping}
     except Exception as e:
-        return None, None, None
+        return None, None
 
-model, encoder_data, df_data = load_resources()
+@st.cache_data(max_entries=4)
+def load_kabupaten_list(version):
+    try:
+        return list(mapping_for_version(version))
+    except Exception as e:
+        return []
 
-# Helper Functions
-def get_historical_features(kabupaten, date, df):
-    df_kab = df[df['Kabupaten'] == kabupaten]
-    target_date = pd.to_datetime(date)
-    
-    if target_date > df_kab['Date'].max():
-        return _get_average_features(df_kab, target_date.month)
-        
-    loc = df_kab[df_kab['Date'] == target_date]
-    if loc.empty: return _get_average_features(df_kab, target_date.month)
-    
-    rain_vals = df_kab[df_kab['Date'] < target_date].tail(30)['Curah_Hujan'].values
-    if len(rain_vals) < 1: return _get_average_features(df_kab, target_date.month)
-
-    return {
-        'rain_prev_1': rain_vals[-1],
-        'rain_prev_3': rain_vals[-3:].mean(),
-        'rain_prev_7': rain_vals[-7:].mean(),
-        'rain_prev_14': rain_vals[-14:].sum(),
-        'rain_prev_30': rain_vals[-30:].sum()
-    }
-
-def _get_average_features(df_kab, month):
-    avg_rain = df_kab[df_kab['Bulan'] == month]['Curah_Hujan'].mean()
-    avg_rain = 0 if pd.isna(avg_rain) else avg_rain
-    return {
-        'rain_prev_1': avg_rain, 'rain_prev_3': avg_rain, 'rain_prev_7': avg_rain,
-        'rain_prev_14': avg_rain * 14, 'rain_prev_30': avg_rain * 30
-    }
+def current_model_version():
+    try:
+        return active_version()
+    except OSError:
+        return None
+
+# Bacaan harian dari Dataset/ingest.py: snapshot terbaru digabung ke lookup dasar
+# (yang tetap di cache), jadi data baru terpakai tanpa membaca ulang store
+@st.cache_resource(max_entries=2)
+def load_live_lookup(data_version, token):
+    lookup = load_lookup(data_version)
+    if lookup is None or token is None:
+        return lookup
+    try:
+        from Dataset.ingest import with_snapshot
+        return with_snapshot(lookup)
+    except Exception as e:
+        return lookup
+
+def load_forecast_resources(version):
+    from Dataset.ingest import snapshot_token
+    with span('app.load_model', version=version):
+        model, _ = load_model_version(version)
+    with span('app.load_lookup'):
+        lookup = load_live_lookup(current_store_version(), snapshot_token())
+    return model, lookup
+
+# Satu cache ramalan per proses, dipakai bersama semua sesi
+@st.cache_resource
+def forecast_cache():
+    from app.forecast_cache import make_cache
+    return make_cache()
+
+def data_version(lookup):
+    # Versi store + nomor snapshot ingest yang sudah digabung ke lookup
+    snapshot = lookup.get('snapshot')
+    store = current_store_version()
+    return store if snapshot is None else f"{store}-s{snapshot}"
+
+# Ringkasan EDA dikunci dengan versi store: data baru -> cube dibangun ulang
+@st.cache_resource(max_entries=2)
+def load_eda_summary(version):
+    from Dataset.eda_cube import load_cube, page_summary
+    return page_summary(load_cube())
+
+def current_store_version():
+    # Sidik isi store (bukan hash meta.json): koreksi nilai juga mengganti versi
+    from Dataset.store import store_version
+    try:
+        return store_version()
+    except OSError:
+        return None
+
+def chart_modules():
+    # plotly.express baru diimpor saat grafik pertama digambar
+    import plotly.express as px
+    import plotly.graph_objects as go
+    return px, go
+
+@st.cache_data(max_entries=32)
+def load_grid(version, data_ver, snapshot, run_date, horizon, _model, _lookup, _kab_list):
+    from app.forecast import cached_forecast_grid
+    return cached_forecast_grid(_model, _lookup, _kab_list, version, run_date, horizon, data_version=data_ver)
+
+model_ver = current_model_version()
+kab_list = load_kabupaten_list(model_ver) if model_ver else []
 
 # UI & Navigation
 st.sidebar.title("Navigasi")
-page = st.sidebar.radio("Menu", ["🏠 Prediksi", "📊 EDA"])
-
-if page == "🏠 Prediksi":
-    st.title("🌧️ Jateng Rain Forecast")
-    
-    col1, col2 = st.columns([1, 2])
-    with col1:
-        st.subheader("⚙️ Parameter")
-        kab_list = encoder_data['kabupaten_mapping'] if encoder_data else []
-        selected_kab = st.selectbox("Wilayah", kab_list)
-        selected_date = st.date_input("Tanggal", datetime.today())
+page = st.sidebar.radio("Menu", ["🏠 Prediksi", "🗺️ Grid Provinsi", "📊 EDA"])
+if model_ver:
+    st.sidebar.caption(f"Versi model: {model_ver}")
+
+# Seluruh halaman dalam satu span; span tetap ditutup jika halaman error atau
+# dihentikan st.stop()/rerun
+with span('app.page', page=page):
+    if page == "🏠 Prediksi":
+        from app.forecast import MAX_HORIZON
+        st.title("🌧️ Jateng Rain Forecast")
         
-        if st.button("Mulai Prediksi", type="primary"):
-            date_obj = pd.to_datetime(selected_date)
-            # Feature Engineering
-            try: kab_code = kab_list.index(selected_kab)
-            except: kab_code = -1
-            
-            month, day = date_obj.month, date_obj.day
-            hist_feat = get_historical_features(selected_kab, date_obj, df_data)
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            st.subheader("⚙️ Parameter")
+            selected_kab = st.selectbox("Wilayah", kab_list)
+            selected_date = st.date_input("Tanggal", datetime.today())
+            horizon = st.slider("Jumlah hari ramalan", 1, MAX_HORIZON, 5)
             
-            input_data = pd.DataFrame([{
-                "Kabupaten_Code": kab_code,
-                "sin_bulan": np.sin(2 * np.pi * month / 12), "cos_bulan": np.cos(2 * np.pi * month / 12),
-                "sin_tgl": np.sin(2 * np.pi * day / 31), "cos_tgl": np.cos(2 * np.pi * day / 31),
-                "Musim": 1 if month in [10, 11, 12, 1, 2, 3] else 0,
-                **hist_feat
-            }])
-            
-            # Prediction
-            pred = model.predict(input_data)[0]
-            prob = model.predict_proba(input_data)[0][1]
-            
-            with col2:
-                st.markdown("---")
-                st.subheader("Hasil Prediksi Pada Tanggal Yang Dipilih")
-                if pred == 1:
-                    st.error(f"🌧️ HUJAN (Probabilitas: {prob:.1%})")
-                    st.caption("Sediakan payung/jas hujan.")
+            if st.button("Mulai Prediksi", type="primary"):
+                import pandas as pd
+                from app.forecast import forecast_days
+                from app.modelling.features import LAG_COLUMNS
+                model, lookup = load_forecast_resources(model_ver)
+                if model is None or lookup is None:
+                    st.error("Model atau data belum tersedia.")
                 else:
-                    st.success(f"☀️ CERAH/BERAWAN (Probabilitas Hujan: {prob:.1%})")
-                    st.caption("Aman untuk aktivitas luar.")
-                
-                with st.expander("Detail Input Features"):
-                    st.json(hist_feat)
-
-                # 5-Day Forecast
-                st.markdown("---")
-                st.subheader("📅 Ramalan 5 Hari ke Depan")
+                    date_obj = pd.to_datetime(selected_date)
+                    # Feature Engineering
+                    try: kab_code = kab_list.index(selected_kab)
+                    except (KeyError, ValueError): kab_code = -1
                 
-                forecast_cols = st.columns(5)
+                    # Tanggal terpilih + seluruh horizon diprediksi dalam satu batch; hasil yang
+                    # sama untuk versi model dan data yang sama diambil dari cache ramalan
+                    from app.forecast_cache import forecast_key
+                    with span('app.forecast', kabupaten=selected_kab, horizon=horizon):
+                        result = forecast_cache().get_or_compute(
+                            (model_ver, data_version(lookup)), forecast_key(selected_kab, date_obj, horizon),
+                            lambda: forecast_days(model, lookup, selected_kab, kab_code, date_obj, horizon))
+                    prob = result['Probabilitas'].iloc[0]
+                    hist_feat = {name: float(result[name].iloc[0]) for name in LAG_COLUMNS}
                 
-                for i in range(1, 6):
-                    next_date = date_obj + timedelta(days=i)
-                    n_month, n_day = next_date.month, next_date.day
-                    n_hist_feat = get_historical_features(selected_kab, next_date, df_data)
-                    
-                    n_input = pd.DataFrame([{
-                        "Kabupaten_Code": kab_code,
-                        "sin_bulan": np.sin(2 * np.pi * n_month / 12), "cos_bulan": np.cos(2 * np.pi * n_month / 12),
-                        "sin_tgl": np.sin(2 * np.pi * n_day / 31), "cos_tgl": np.cos(2 * np.pi * n_day / 31),
-                        "Musim": 1 if n_month in [10, 11, 12, 1, 2, 3] else 0,
-                        **n_hist_feat
-                    }])
+                    with col2:
+                        st.markdown("---")
+                        st.subheader("Hasil Prediksi Pada Tanggal Yang Dipilih")
+                        if result['Label'].iloc[0] == 1:
+                            st.error(f"🌧️ HUJAN (Probabilitas: {prob:.1%})")
+                            st.caption("Sediakan payung/jas hujan.")
+                        else:
+                            st.success(f"☀️ CERAH/BERAWAN (Probabilitas Hujan: {prob:.1%})")
+                            st.caption("Aman untuk aktivitas luar.")
                     
-                    n_pred = model.predict(n_input)[0]
-                    n_prob = model.predict_proba(n_input)[0][1]
+                        with st.expander("Detail Input Features"):
+                            st.json(hist_feat)
+
+                        # N-Day Forecast
+                        st.markdown("---")
+                        st.subheader(f"📅 Ramalan {horizon} Hari ke Depan")
                     
-                    with forecast_cols[i-1]:
-                        st.markdown(f"**{next_date.strftime('%d/%m')}**")
-                        if n_pred == 1:
-                             st.markdown("🌧️ **Hujan**")
-                             st.progress(int(n_prob*100))
-                        else:
-                             st.markdown("☀️ **Cerah**")
-                             st.progress(int(n_prob*100))
-                        st.caption(f"{n_prob*100:.0f}%")
-
-elif page == "📊 EDA":
-    st.title("📊 Exploratory Data Analysis")
-    
-    if df_data is not None:
-        c1, c2, c3 = st.columns(3)
-        c1.metric("Total Data", len(df_data))
-        c2.metric("Wilayah", df_data['Kabupaten'].nunique())
-        c3.metric("Periode", f"{df_data['Date'].min():%Y-%m} s/d {df_data['Date'].max():%Y-%m}")
-        
-        st.markdown("---")
-        
-        # 1. Line Plots
-        st.subheader("1. Analisis Tren (Line Plot)")
-        st.caption("Grafik garis digunakan untuk melihat pola perubahan curah hujan berdasarkan waktu.")
-        tab_lp1, tab_lp2 = st.tabs(["Pola Musiman (Bulanan)", "Tren Tahunan"])
-        
-        with tab_lp1:
-            avg_month = df_data.groupby('Bulan')['Curah_Hujan'].mean().reset_index()
-            fig_lp1 = px.line(avg_month, x='Bulan', y='Curah_Hujan', markers=True, 
-                             title='Rata-rata Curah Hujan per Bulan')
-            st.plotly_chart(fig_lp1, use_container_width=True)
-            st.info("Puncak curah hujan tertinggi biasanya terjadi di awal dan akhir tahun (Januari - Maret, Oktober - Desember).")
-
-        with tab_lp2:
-            avg_year = df_data.groupby('Tahun')['Curah_Hujan'].mean().reset_index()
-            fig_lp2 = px.line(avg_year, x='Tahun', y='Curah_Hujan', markers=True, 
-                             title='Rata-rata Curah Hujan per Tahun')
-            st.plotly_chart(fig_lp2, use_container_width=True)
-            st.info("Grafik ini menunjukkan fluktuasi rata-rata intensitas hujan dari tahun ke tahun.")
-
-        st.markdown("---")
-        
-        # 2. Box Plots
-        st.subheader("2. Distribusi Data (Box Plot)")
-        st.caption("Box plot berguna untuk melihat sebaran data dan mendeteksi outlier (nilai ekstrem).")
-        tab_bp1, tab_bp2 = st.tabs(["Sebaran per Bulan", "Sebaran per Wilayah (Top 10)"])
+                        for row_start in range(1, horizon + 1, 5):
+                            forecast_cols = st.columns(5)
+                            for i in range(row_start, min(row_start + 5, horizon + 1)):
+                                next_date = result['Date'].iloc[i]
+                                n_prob = result['Probabilitas'].iloc[i]
+                                with forecast_cols[i - row_start]:
+                                    st.markdown(f"**{next_date.strftime('%d/%m')}**")
+                                    if result['Label'].iloc[i] == 1:
+                                         st.markdown("🌧️ **Hujan**")
+                                         st.progress(int(n_prob*100))
+                                    else:
+                                         st.markdown("☀️ **Cerah**")
+                                         st.progress(int(n_prob*100))
+                                    st.caption(f"{n_prob*100:.0f}%")
+
+    elif page == "🗺️ Grid Provinsi":
+        st.title("🗺️ Probabilitas Hujan Seluruh Kabupaten")
         
-        with tab_bp1:
-            fig_bp1 = px.box(df_data, x='Bulan', y='Curah_Hujan', title='Distribusi Curah Hujan per Bulan')
-            st.plotly_chart(fig_bp1, use_container_width=True)
-            st.info("Box plot ini memperlihatkan variasi curah hujan di setiap bulan. Kotak yang lebih panjang menandakan variasi yang lebih besar.")
+        model, lookup = load_forecast_resources(model_ver) if model_ver else (None, None)
+        if model is not None:
+            from app.forecast import export_grid, grid_heatmap_frame
+            px, go = chart_modules()
+            c1, c2 = st.columns(2)
+            run_date = c1.date_input("Tanggal awal", datetime.today())
+            grid_days = c2.slider("Jumlah hari", 1, 14, 7)
+            
+            with span('app.load_grid', horizon=grid_days):
+                grid = load_grid(model_ver, current_store_version(), lookup.get('snapshot'), run_date.strftime('%Y-%m-%d'), grid_days,
+                                 model, lookup, kab_list)
             
-        with tab_bp2:
-            top_kab = df_data.groupby('Kabupaten')['Curah_Hujan'].mean().nlargest(10).index
-            df_top = df_data[df_data['Kabupaten'].isin(top_kab)]
-            fig_bp2 = px.box(df_top, x='Kabupaten', y='Curah_Hujan', title='Distribusi Curah Hujan di 10 Wilayah Terbasah')
-            st.plotly_chart(fig_bp2, use_container_width=True)
-            st.info("Distribusi ini fokus pada 10 wilayah dengan rata-rata hujan tertinggi.")
-
-        st.markdown("---")
-
-        # 3. Pie Charts
-        st.subheader("3. Proporsi Data (Pie Chart)")
-        st.caption("Pie chart menunjukkan persentase atau bagian dari keseluruhan.")
-        tab_pc1, tab_pc2 = st.tabs(["Proporsi Label", "Kontribusi Hujan per Bulan"])
+            fig_grid = px.imshow(grid_heatmap_frame(grid), color_continuous_scale='Blues', zmin=0, zmax=1,
+                                 aspect='auto', title='Probabilitas Hujan per Kabupaten')
+            fig_grid.update_layout(height=max(400, 22 * len(kab_list)))
+            st.plotly_chart(fig_grid, use_container_width=True)
+            
+            npz_buffer = io.BytesIO()
+            export_grid(grid, npz_buffer)
+            d1, d2 = st.columns(2)
+            d1.download_button("Unduh CSV", grid[['Kabupaten', 'Date', 'Probabilitas', 'Label']].to_csv(index=False),
+                               file_name=f"grid_{run_date}.csv", mime="text/csv")
+            d2.download_button("Unduh NPZ (kolumnar)", npz_buffer.getvalue(),
+                               file_name=f"grid_{run_date}.npz", mime="application/octet-stream")
+
+    elif page == "📊 EDA":
+        st.title("📊 Exploratory Data Analysis")
         
-        with tab_pc1:
-            if 'Label' in df_data.columns:
-                fig_pc1 = px.pie(df_data, names='Label', title='Persentase Hari Hujan (1) vs Tidak (0)',
+        data_ver = current_store_version()
+        if data_ver is not None:
+            import pandas as pd
+            with span('app.load_eda_summary'):
+                eda = load_eda_summary(data_ver)
+            px, go = chart_modules()
+            by_month = eda['by_month']
+
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Total Data", eda['rows'])
+            c2.metric("Wilayah", eda['n_kabupaten'])
+            c3.metric("Periode", f"{eda['date_min']:%Y-%m} s/d {eda['date_max']:%Y-%m}")
+            
+            st.markdown("---")
+            
+            # 1. Line Plots
+            st.subheader("1. Analisis Tren (Line Plot)")
+            st.caption("Grafik garis digunakan untuk melihat pola perubahan curah hujan berdasarkan waktu.")
+            tab_lp1, tab_lp2 = st.tabs(["Pola Musiman (Bulanan)", "Tren Tahunan"])
+            
+            with tab_lp1:
+                avg_month = by_month[['Bulan', 'mean']].rename(columns={'mean': 'Curah_Hujan'})
+                fig_lp1 = px.line(avg_month, x='Bulan', y='Curah_Hujan', markers=True, 
+                                 title='Rata-rata Curah Hujan per Bulan')
+                st.plotly_chart(fig_lp1, use_container_width=True)
+                st.info("Puncak curah hujan tertinggi biasanya terjadi di awal dan akhir tahun (Januari - Maret, Oktober - Desember).")
+
+            with tab_lp2:
+                avg_year = eda['by_year'][['Tahun', 'mean']].rename(columns={'mean': 'Curah_Hujan'})
+                fig_lp2 = px.line(avg_year, x='Tahun', y='Curah_Hujan', markers=True, 
+                                 title='Rata-rata Curah Hujan per Tahun')
+                st.plotly_chart(fig_lp2, use_container_width=True)
+                st.info("Grafik ini menunjukkan fluktuasi rata-rata intensitas hujan dari tahun ke tahun.")
+
+            st.markdown("---")
+            
+            # 2. Box Plots (statistik kotak dihitung dari histogram di cube, bukan dari baris mentah)
+            st.subheader("2. Distribusi Data (Box Plot)")
+            st.caption("Box plot berguna untuk melihat sebaran data dan mendeteksi outlier (nilai ekstrem).")
+            tab_bp1, tab_bp2 = st.tabs(["Sebaran per Bulan", "Sebaran per Wilayah (Top 10)"])
+            
+            with tab_bp1:
+                fig_bp1 = go.Figure(go.Box(x=by_month['Bulan'], name='Curah_Hujan', **eda['box_month']))
+                fig_bp1.update_layout(title='Distribusi Curah Hujan per Bulan', xaxis_title='Bulan', yaxis_title='Curah_Hujan')
+                st.plotly_chart(fig_bp1, use_container_width=True)
+                st.info("Box plot ini memperlihatkan variasi curah hujan di setiap bulan. Kotak yang lebih panjang menandakan variasi yang lebih besar.")
+                
+            with tab_bp2:
+                fig_bp2 = go.Figure(go.Box(x=eda['top_kabupaten'], name='Curah_Hujan', **eda['box_kabupaten']))
+                fig_bp2.update_layout(title='Distribusi Curah Hujan di 10 Wilayah Terbasah', xaxis_title='Kabupaten', yaxis_title='Curah_Hujan')
+                st.plotly_chart(fig_bp2, use_container_width=True)
+                st.info("Distribusi ini fokus pada 10 wilayah dengan rata-rata hujan tertinggi.")
+
+            st.markdown("---")
+
+            # 3. Pie Charts
+            st.subheader("3. Proporsi Data (Pie Chart)")
+            st.caption("Pie chart menunjukkan persentase atau bagian dari keseluruhan.")
+            tab_pc1, tab_pc2 = st.tabs(["Proporsi Label", "Kontribusi Hujan per Bulan"])
+            
+            with tab_pc1:
+                label_counts = pd.DataFrame({'Label': [0, 1], 'Jumlah': [eda['rows'] - eda['rain_days'], eda['rain_days']]})
+                fig_pc1 = px.pie(label_counts, values='Jumlah', names='Label', title='Persentase Hari Hujan (1) vs Tidak (0)',
                                 color_discrete_sequence=['#FFD200', '#4facfe'])
                 st.plotly_chart(fig_pc1, use_container_width=True)
                 st.info("Menunjukkan seberapa sering hujan terjadi dibandingkan hari cerah dalam dataset.")
-        
-        with tab_pc2:
-            # Filter only rainy days
-            rainy_days = df_data[df_data['Curah_Hujan'] > 0]
-            rain_counts = rainy_days['Bulan'].value_counts().reset_index()
-            rain_counts.columns = ['Bulan', 'Kejadian']
-            fig_pc2 = px.pie(rain_counts, values='Kejadian', names='Bulan', title='Proporsi Kejadian Hujan Berdasarkan Bulan')
-            st.plotly_chart(fig_pc2, use_container_width=True)
-            st.info("Bulan mana yang paling sering menyumbang kejadian hujan? Pie chart ini membagi total kejadian hujan berdasarkan bulan.")
-
-        st.markdown("---")
-
-        # 4. Scatter Plot
-        st.subheader("4. Hubungan Antar Variabel (Scatter Plot)")
-        st.caption("Scatter plot digunakan untuk melihat korelasi atau pola persebaran antara dua variabel.")
-        
-        # Sample data to avoid overplotting if dataset is huge
-        sample_df = df_data.sample(min(5000, len(df_data)), random_state=42)
-        fig_sp = px.scatter(sample_df, x='Bulan', y='Curah_Hujan', color='Curah_Hujan', 
-                           title='Scatter Plot: Bulan vs Intensitas Hujan (Sample 5000 Data)',
-                           color_continuous_scale='Bluered')
-        st.plotly_chart(fig_sp, use_container_width=True)
-        st.info("Plot ini memperlihatkan sebaran intensitas hujan di setiap bulan. Titik-titik yang lebih tinggi menunjukkan hari dengan hujan sangat lebat.")
-
-        st.markdown("---")
-
-        # 5. Correlation Matrix
-        st.subheader("5. Matriks Korelasi")
-        st.caption("Heatmap korelasi menunjukkan seberapa kuat hubungan antar fitur numerik.")
-        
-        numeric_cols = ['Curah_Hujan', 'Bulan', 'Tahun', 'Tanggal']
-        if 'Label' in df_data.columns: numeric_cols.append('Label')
-        
-        corr_matrix = df_data[numeric_cols].corr()
-        fig_corr = px.imshow(corr_matrix, text_auto=True, color_continuous_scale='RdBu_r', 
-                            title='Korelasi Antar Fitur Numerik', origin='lower')
-        st.plotly_chart(fig_corr, use_container_width=True)
-        st.info("Angka mendekati 1 berarti korelasi positif kuat, -1 korelasi negatif kuat, dan 0 tidak ada hubungan linier.")
+            
+            with tab_pc2:
+                # Hanya hari dengan curah hujan > 0
+                rain_counts = by_month[['Bulan', 'wet_days']].rename(columns={'wet_days': 'Kejadian'})
+                fig_pc2 = px.pie(rain_counts, values='Kejadian', names='Bulan', title='Proporsi Kejadian Hujan Berdasarkan Bulan')
+                st.plotly_chart(fig_pc2, use_container_width=True)
+                st.info("Bulan mana yang paling sering menyumbang kejadian hujan? Pie chart ini membagi total kejadian hujan berdasarkan bulan.")
+
+            st.markdown("---")
+
+            # 4. Scatter Plot
+            st.subheader("4. Hubungan Antar Variabel (Scatter Plot)")
+            st.caption("Scatter plot digunakan untuk melihat korelasi atau pola persebaran antara dua variabel.")
+            
+            # Sampel 5000 baris diambil sekali saat cube dibangun
+            sample_df = eda['sample']
+            fig_sp = px.scatter(sample_df, x='Bulan', y='Curah_Hujan', color='Curah_Hujan', 
+                               title=f'Scatter Plot: Bulan vs Intensitas Hujan (Sample {len(sample_df)} Data)',
+                               color_continuous_scale='Bluered')
+            st.plotly_chart(fig_sp, use_container_width=True)
+            st.info("Plot ini memperlihatkan sebaran intensitas hujan di setiap bulan. Titik-titik yang lebih tinggi menunjukkan hari dengan hujan sangat lebat.")
+
+            st.markdown("---")
+
+            # 5. Correlation Matrix
+            st.subheader("5. Matriks Korelasi")
+            st.caption("Heatmap korelasi menunjukkan seberapa kuat hubungan antar fitur numerik.")
+            
+            corr_matrix = eda['corr']
+            fig_corr = px.imshow(corr_matrix, text_auto=True, color_continuous_scale='RdBu_r', 
+                                title='Korelasi Antar Fitur Numerik', origin='lower')
+            st.plotly_chart(fig_corr, use_container_width=True)
+            st.info("Angka mendekati 1 berarti korelasi positif kuat, -1 korelasi negatif kuat, dan 0 tidak ada hubungan linier.")
+
+# Panel tersembunyi: hanya muncul jika JATENG_PROFILE aktif
+if profiling.ENABLED:
+    with st.sidebar.expander("⏱️ Performance"):
+        import pandas as pd
+        n_runs = st.slider("Rerun terakhir", 1, PERF_MAX_RUNS, 5, key="perf_n_runs")
+        records = profiling.spans_for_runs(list(st.session_state.perf_runs)[-n_runs:])
+        if records:
+            perf = (pd.DataFrame(records).groupby('span')['ms']
+                    .agg(['count', 'mean', 'median', 'max'])
+                    .sort_values('max', ascending=False))
+            st.dataframe(perf.round(2), use_container_width=True)
+        else:
+            st.caption("Belum ada span yang tercatat.")
+        cache_info = forecast_cache().info()
+        st.caption(f"Cache ramalan: hit rate {cache_info['hit_rate']:.0%} dari {cache_info['requests']} permintaan")
+        st.json(cache_info, expanded=False)
@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from app.modelling.backends import BACKENDS, get_backend
+from app.modelling.features import FEATURE_COLUMNS
+from app.modelling.training import build_folds, fit_fold, load_training_frame, upsample
+
+# Parameter lebih kecil untuk --quick agar seluruh benchmark selesai dalam beberapa menit
+QUICK_PARAMS = {
+    'rf': {'n_estimators': 50},
+    'hgb': {'max_iter': 100},
+    'linear': {},
+}
+COLUMNS = [
+    "backend", "cv_f1", "cv_accuracy", "train_s", "artifact_mb", "load_s",
+    "single_p50_ms", "single_p99_ms", "batch_rows", "batch_ms", "rows_per_s", "peak_rss_mb",
+]
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def bench_one(name, params, single_calls=200, batch_rows=1024):
+    backend = get_backend(name)
+    df, _ = load_training_frame()
+    folds = build_folds(df)
+
+    # Walk-forward CV per tahun, fold yang sama dengan training.py --cv
+    scores = [fit_fold(name, params, fold_dir) for _, fold_dir in folds]
+
+    train = upsample(df)
+    t0 = time.perf_counter()
+    model = backend.make(params, n_jobs=1)
+    model.fit(train[FEATURE_COLUMNS], train["Label"])
+    train_s = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend.save(model, tmp)
+        artifact = dir_size(tmp)
+        t0 = time.perf_counter()
+        served = backend.load(tmp, flat=True)
+        load_s = time.perf_counter() - t0
+
+        # Jalur prediksi aplikasi: predict_proba pada matriks numpy
+        X = df[FEATURE_COLUMNS].sample(n=batch_rows, replace=True, random_state=0).to_numpy(dtype=np.float64)
+        served.predict_proba(X[:1])
+        single = []
+        for i in range(single_calls):
+            t0 = time.perf_counter()
+            served.predict_proba(X[i % batch_rows:i % batch_rows + 1])
+            single.append(time.perf_counter() - t0)
+        batch = []
+        for _ in range(5):
+            t0 = time.perf_counter()
+            served.predict_proba(X)
+            batch.append(time.perf_counter() - t0)
+
+    single_ms = np.array(single) * 1000
+    return {
+        "backend": name,
+        "params": params,
+        "cv_f1": float(np.mean([s["f1"] for s in scores])),
+        "cv_accuracy": float(np.mean([s["accuracy"] for s in scores])),
+        "cv_folds": len(scores),
+        "train_s": train_s,
+        "artifact_mb": artifact / 2**20,
+        "load_s": load_s,
+        "single_p50_ms": float(np.percentile(single_ms, 50)),
+        "single_p99_ms": float(np.percentile(single_ms, 99)),
+        "batch_rows": batch_rows,
+        "batch_ms": min(batch) * 1000,
+        "rows_per_s": batch_rows / min(batch),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def write_table(rows, path):
+    if path.endswith(".csv"):
+        import csv
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, "w") as f:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "rows": rows}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandingkan backend model: akurasi, waktu, ukuran, memori")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--quick", action="store_true", help="parameter kecil (lihat QUICK_PARAMS)")
+    parser.add_argument("--output", default=os.path.join(project_root, "benchmarks", "backends.json"),
+                        help="hasil dalam .json atau .csv")
+    parser.add_argument("--one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        params = QUICK_PARAMS[args.one] if args.quick else get_backend(args.one).default_params
+        print(json.dumps(bench_one(args.one, params)))
+        return
+
+    # Fold dibuat sekali di sini agar proses anak hanya memakai cache
+    build_folds(load_training_frame()[0])
+
+    rows = []
+    print(f"{'backend':<8}{'cv f1':>7}{'akurasi':>9}{'train s':>9}{'MB':>8}{'muat s':>8}"
+          f"{'1 baris ms':>11}{'batch ms':>10}{'baris/s':>10}{'RSS MB':>8}")
+    for name in args.backends:
+        # Setiap backend di proses baru agar puncak memori tidak tercampur
+        cmd = [sys.executable, os.path.abspath(__file__), "--one", name] + (["--quick"] if args.quick else [])
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        row = json.loads(out.stdout.strip().splitlines()[-1])
+        rows.append(row)
+        print(f"{name:<8}{row['cv_f1']:>7.3f}{row['cv_accuracy']:>9.3f}{row['train_s']:>9.1f}"
+              f"{row['artifact_mb']:>8.1f}{row['load_s']:>8.3f}{row['single_p50_ms']:>11.2f}"
+              f"{row['batch_ms']:>10.1f}{row['rows_per_s']:>10.0f}{row['peak_rss_mb']:>8.0f}")
+
+    write_table(rows, args.output)
+    print(f"Hasil: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import statistics
+import pdfplumber
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root, 'Dataset'))
+
+import extract
+
+
+def legacy_page(page):
+    # Jalur lama: extract_text() lalu extract_tables() (dua kali analisis layout)
+    text = page.extract_text() or ""
+    extract.extract_metadata_from_text(text)
+    page.extract_tables()
+    return sum(1 for line in text.splitlines() if extract.parse_table_line(line))
+
+
+def single_pass_page(page):
+    _, rows = extract.parse_page(page)
+    return len(rows)
+
+
+def time_pages(pdf_path, parse, limit=None):
+    timings = []
+    rows = 0
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[:limit]:
+            t0 = time.perf_counter()
+            rows += parse(page)
+            timings.append(time.perf_counter() - t0)
+            page.close()
+    return timings, rows
+
+
+def summarize(label, timings):
+    ms = [t * 1000 for t in timings]
+    return (f"{label:<12} halaman={len(ms):>4} total={sum(ms) / 1000:7.2f}s "
+            f"median={statistics.median(ms):7.1f}ms maks={max(ms):7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark waktu parsing per halaman PDF")
+    parser.add_argument("pdfs", nargs="*", help="default: semua PDF di Dataset/Input")
+    parser.add_argument("--pages", type=int, default=None, help="batasi jumlah halaman per PDF")
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    pdfs = args.pdfs or sorted(glob.glob(os.path.join(extract.input_root, "*", "*.pdf")))
+    all_new, all_old = [], []
+    for pdf_path in pdfs:
+        name = os.path.relpath(pdf_path, extract.input_root)
+        new_t, new_rows = time_pages(pdf_path, single_pass_page, args.pages)
+        all_new += new_t
+        print(name)
+        print("  " + summarize("single-pass", new_t) + f" baris={new_rows}")
+        if not args.skip_legacy:
+            old_t, old_rows = time_pages(pdf_path, legacy_page, args.pages)
+            all_old += old_t
+            print("  " + summarize("legacy", old_t) + f" baris={old_rows}")
+
+    if not all_new:
+        return
+    print("-" * 70)
+    print(summarize("single-pass", all_new))
+    if all_old:
+        print(summarize("legacy", all_old))
+        print(f"Speedup: {sum(all_old) / sum(all_new):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+import joblib
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from app.modelling.features import FEATURE_COLUMNS, load_lag_table, seasonal_features
+from app.modelling.flat_forest import FlatForest, export_forest, forest_path, model_file, models_path
+
+# Setiap skenario dijalankan di proses baru agar waktu muat dan memori
+# tidak terpengaruh objek yang sudah ada di proses benchmark.
+SCENARIOS = {
+    "joblib (pickle)": """
+import joblib
+model = joblib.load(MODEL)
+""",
+    "flat (mmap)": """
+from app.modelling.flat_forest import FlatForest
+model = FlatForest(FOREST)
+""",
+}
+
+RUNNER = """
+import sys, time, json
+sys.path.insert(0, {root!r})
+import numpy as np
+MODEL, FOREST = {model!r}, {forest!r}
+
+def rss_kb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+
+X = np.load({features!r})
+before = rss_kb()
+t0 = time.perf_counter()
+{body}
+load = time.perf_counter() - t0
+rss_load = rss_kb()
+t0 = time.perf_counter()
+model.predict_proba(X)
+predict = time.perf_counter() - t0
+print(json.dumps({{
+    "load_s": load,
+    "rss_load_mb": (rss_load - before) / 1024,
+    "rss_predict_mb": (rss_kb() - before) / 1024,
+    "rows_per_s": len(X) / predict,
+}}))
+"""
+
+
+def feature_matrix(n_rows, seed=42):
+    lag_table = load_lag_table().dropna().reset_index()
+    sample = lag_table.sample(n=min(n_rows, len(lag_table)), random_state=seed)
+    encoder = joblib.load(os.path.join(models_path, 'encoder_kabupaten.pkl'))
+    codes = {kab: i for i, kab in enumerate(encoder['kabupaten_mapping'])}
+    sample["Kabupaten_Code"] = sample["Kabupaten"].map(codes).fillna(-1)
+    for name, values in seasonal_features(sample["Date"].dt.month, sample["Date"].dt.day).items():
+        sample[name] = values
+    return sample[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+
+
+def run_scenario(body, features, forest):
+    code = RUNNER.format(root=project_root, model=model_file, forest=forest, features=features, body=body)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandingkan model_rf.pkl (joblib) dengan forest datar (mmap)")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--forest", default=forest_path)
+    args = parser.parse_args()
+
+    X = feature_matrix(args.rows)
+    model = joblib.load(model_file)
+    if not os.path.exists(os.path.join(args.forest, 'meta.json')):
+        export_forest(model, args.forest, source=model_file)
+
+    expected = model.predict_proba(X)
+    actual = FlatForest(args.forest).predict_proba(X)
+    same = np.array_equal(expected, actual)
+    print(f"{len(X)} baris, prediksi identik: {same} (selisih maks {np.abs(expected - actual).max():.3g})")
+    del model
+
+    with tempfile.TemporaryDirectory() as tmp:
+        features = os.path.join(tmp, 'X.npy')
+        np.save(features, X)
+        print(f"{'skenario':<18}{'muat (s)':>10}{'RSS muat':>10}{'RSS +pred':>10}{'baris/s':>10}")
+        for name, body in SCENARIOS.items():
+            results = [run_scenario(body, features, args.forest) for _ in range(args.repeat)]
+            best = min(results, key=lambda r: r["load_s"])
+            print(f"{name:<18}{best['load_s']:>10.3f}{best['rss_load_mb']:>10.1f}"
+                  f"{best['rss_predict_mb']:>10.1f}{max(r['rows_per_s'] for r in results):>10.0f}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
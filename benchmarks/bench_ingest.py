@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from Dataset.store import load_store, load_stations
+from Dataset.ingest import Ingestor, with_snapshot
+from app.forecast import build_lookup
+
+DATA_COLUMNS = ['Date', 'Bulan', 'Kabupaten', 'Curah_Hujan']
+
+# Satu hari bacaan untuk semua pos yang aktif di akhir store, dimasukkan lewat
+# log ingest, dibandingkan dengan jalur lama (muat ulang store + build_lookup).
+def daily_records(days, late=0, seed=0):
+    catalog = load_stations()
+    df = load_store(columns=['Date', 'Stasiun'])
+    last = df.groupby('Stasiun')['Date'].max()
+    active = last[last >= last.max() - pd.Timedelta(days=30)].index
+    rng = np.random.default_rng(seed)
+    batches = []
+    for day in pd.date_range(last.max() + pd.Timedelta(days=1), periods=days):
+        batch = [{'date': day.strftime('%Y-%m-%d'), 'station': catalog.loc[sid, 'name'],
+                  'kabupaten': catalog.loc[sid, 'kabupaten'], 'rain': float(rng.gamma(0.6, 15))}
+                 for sid in active]
+        # Bacaan terlambat: hari-hari sebelumnya untuk pos acak
+        for sid in rng.choice(active, late):
+            past = day - pd.Timedelta(days=int(rng.integers(1, 40)))
+            batch.append({'date': past.strftime('%Y-%m-%d'), 'station': catalog.loc[sid, 'name'],
+                          'kabupaten': catalog.loc[sid, 'kabupaten'], 'rain': float(rng.gamma(0.6, 15))})
+        batches.append(batch)
+    return batches
+
+def main():
+    parser = argparse.ArgumentParser(description="Waktu ingest harian dibandingkan muat ulang penuh")
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--late", type=int, default=10, help="bacaan terlambat per hari")
+    args = parser.parse_args()
+
+    batches = daily_records(args.days, args.late)
+    t0 = time.perf_counter()
+    base = build_lookup(load_store(columns=DATA_COLUMNS))
+    reload_s = time.perf_counter() - t0
+
+    tmp = tempfile.mkdtemp(prefix='bench_ingest_')
+    try:
+        t0 = time.perf_counter()
+        ingestor = Ingestor.open(tmp)
+        open_s = time.perf_counter() - t0
+        append_s, publish_s, merge_s = [], [], []
+        for batch in batches:
+            t0 = time.perf_counter()
+            ingestor.append(batch)
+            append_s.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            ingestor.publish()
+            publish_s.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            with_snapshot(base, tmp)
+            merge_s.append(time.perf_counter() - t0)
+        n = sum(len(batch) for batch in batches)
+        t0 = time.perf_counter()
+        os.remove(os.path.join(tmp, 'snapshot.pkl'))
+        Ingestor.open(tmp)
+        replay_s = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"{n} bacaan dalam {args.days} hari ({len(batches[0])} per hari, {args.late} terlambat)")
+    print(f"{'muat ulang store + build_lookup':<36}{reload_s * 1000:>10.1f} ms")
+    print(f"{'buka ingest (seed dari store)':<36}{open_s * 1000:>10.1f} ms")
+    print(f"{'append per hari':<36}{np.median(append_s) * 1000:>10.1f} ms "
+          f"({np.sum(append_s) / n * 1e6:.1f} µs/bacaan)")
+    print(f"{'publish snapshot per hari':<36}{np.median(publish_s) * 1000:>10.1f} ms")
+    print(f"{'gabung snapshot ke lookup (app)':<36}{np.median(merge_s) * 1000:>10.1f} ms")
+    print(f"{'bangun ulang dari store + log':<36}{replay_s * 1000:>10.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from sklearn.metrics import accuracy_score, f1_score
+from app.modelling.features import FEATURE_COLUMNS
+from app.modelling.backends import DEFAULT_BACKEND, get_backend
+from app.modelling.registry import load_version, register_model, version_path
+from app.modelling.shards import dir_size
+from app.modelling.training import load_training_frame, train_shards, upsample
+
+# Model global dibandingkan dengan model bershard (per kabupaten dan per BPSDA)
+# dengan parameter yang sama: dilatih dengan tahun < --test-year, diuji pada
+# --test-year dengan distribusi asli. Semua model disimpan ke registry
+# sementara lalu dimuat lagi seperti di aplikasi (forest datar, shard lewat LRU).
+def request_latency(model, X, n, seed=0):
+    # Satu baris per panggilan, seperti permintaan /predict tanpa batching
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(X), n, replace=False)
+    times = []
+    for i in rows:
+        t0 = time.perf_counter()
+        model.predict_proba(X.iloc[[i]])
+        times.append(time.perf_counter() - t0)
+    return np.array(times) * 1000
+
+def first_requests(model, X):
+    # Permintaan pertama untuk tiap kabupaten pada model yang baru dimuat
+    # (shard ikut dimuat di sini), satu baris per kabupaten
+    first = X.groupby('Kabupaten_Code', sort=False).head(1)
+    times = []
+    for i in range(len(first)):
+        t0 = time.perf_counter()
+        model.predict_proba(first.iloc[[i]])
+        times.append(time.perf_counter() - t0)
+    return np.array(times) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandingkan model global dengan model bershard")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND)
+    parser.add_argument("--trees", type=int, default=None, help="n_estimators (rf); default parameter backend")
+    parser.add_argument("--test-year", type=int, default=2024)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--cache-mb", type=float, default=None, help="batas cache shard saat uji latensi")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", help="simpan hasil sebagai JSON")
+    args = parser.parse_args()
+
+    params = {'n_estimators': args.trees} if args.trees else None
+    df, mapping = load_training_frame()
+    train_raw = df[df["Tahun"] < args.test_year]
+    test = df[df["Tahun"] == args.test_year]
+    train = upsample(train_raw)
+    X_test = test[FEATURE_COLUMNS]
+    print(f"latih {len(train)} baris (setelah upsampling), uji {len(test)} baris tahun {args.test_year}")
+
+    root = tempfile.mkdtemp(prefix='bench_shards_')
+    results = {}
+    try:
+        for name in ('global', 'kabupaten', 'basin'):
+            t0 = time.perf_counter()
+            if name == 'global':
+                model = get_backend(args.backend).make(params, n_jobs=args.workers or -1)
+                model.fit(train[FEATURE_COLUMNS], train["Label"])
+                if "n_jobs" in model.get_params():
+                    model.set_params(n_jobs=None)
+            else:
+                model = train_shards(train, mapping, name, train_raw, args.backend, params, args.workers)
+            fit_s = time.perf_counter() - t0
+            version = register_model(model, mapping, root=root, activate=False, backend=args.backend)
+
+            loaded, meta = load_version(version, root=root)
+            if args.cache_mb is not None and hasattr(loaded, 'max_bytes'):
+                loaded.max_bytes = args.cache_mb * 2**20
+            cold = first_requests(loaded, X_test)
+            warm = request_latency(loaded, X_test, min(args.requests, len(X_test)))
+            t0 = time.perf_counter()
+            proba = loaded.predict_proba(X_test)[:, 1]
+            batch_s = time.perf_counter() - t0
+            y_pred = (proba > 0.5).astype(int)
+            path = version_path(version, root)
+            results[name] = {
+                'shards': len(meta['shards']['shards']) if 'shards' in meta else 1,
+                'fit_s': fit_s,
+                'artifact_mb': dir_size(path) / 2**20,
+                # Yang dibuka aplikasi (forest datar untuk rf); model.pkl hanya untuk training lanjutan
+                'serving_mb': sum(dir_size(os.path.join(dirpath, 'forest'))
+                                  for dirpath, dirnames, _ in os.walk(path) if 'forest' in dirnames) / 2**20,
+                'accuracy': accuracy_score(test["Label"], y_pred),
+                'f1': f1_score(test["Label"], y_pred, zero_division=0),
+                'first_request_ms': float(cold.mean()),
+                'request_p50_ms': float(np.percentile(warm, 50)),
+                'request_p99_ms': float(np.percentile(warm, 99)),
+                'batch_ms_per_1k': batch_s * 1000 / len(X_test) * 1000,
+                'cache': loaded.cache_info() if hasattr(loaded, 'cache_info') else None,
+            }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(f"{'model':<11}{'shard':>6}{'fit s':>8}{'artefak MB':>12}{'serving MB':>12}{'akurasi':>9}{'f1':>7}"
+          f"{'awal ms':>9}{'p50 ms':>8}{'p99 ms':>8}{'ms/1k':>8}")
+    for name, r in results.items():
+        print(f"{name:<11}{r['shards']:>6}{r['fit_s']:>8.1f}{r['artifact_mb']:>12.1f}{r['serving_mb']:>12.1f}"
+              f"{r['accuracy']:>9.3f}{r['f1']:>7.3f}{r['first_request_ms']:>9.2f}{r['request_p50_ms']:>8.2f}{r['request_p99_ms']:>8.2f}"
+              f"{r['batch_ms_per_1k']:>8.1f}")
+        if r['cache']:
+            c = r['cache']
+            print(f"{'':<11}cache: {c['loads']} muat, {c['hits']} hit, {c['evictions']} dibuang, "
+                  f"{c['loaded_mb']:.1f}/{c['max_mb']:.0f} MB")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Setiap skenario dijalankan di proses baru (cold start) lewat AppTest.
+# Langkah pertama selalu render awal halaman default; langkah berikutnya
+# mensimulasikan aksi pertama pengguna di halaman tertentu.
+SCENARIOS = {
+    'render awal': [],
+    'prediksi pertama': ['click:Mulai Prediksi'],
+    'EDA pertama': ['page:📊 EDA'],
+    'grid pertama': ['page:🗺️ Grid Provinsi'],
+}
+PACKAGES = ['pandas', 'numpy', 'plotly.express', 'joblib', 'sklearn', 'scipy', 'pyarrow']
+# Data dan model tidak ada di git, jadi pohon --ref memakai milik working tree
+SHARED_PATHS = [os.path.join('Dataset', 'processed'), os.path.join('app', 'modelling', 'saved_models')]
+
+RUNNER = """
+import sys, time, json
+sys.path.insert(0, {root!r})
+from streamlit.testing.v1 import AppTest
+
+def mark(label):
+    sys.stderr.write('@@mark ' + label + '\\n')
+    sys.stderr.flush()
+
+at = AppTest.from_file({app!r}, default_timeout=600)
+times = []
+mark('render')
+t0 = time.perf_counter()
+at.run()
+times.append(time.perf_counter() - t0)
+for step in {steps!r}:
+    kind, arg = step.split(':', 1)
+    if kind == 'page':
+        at.sidebar.radio[0].set_value(arg)
+    else:
+        next(b for b in at.button if b.label == arg).click()
+    mark(step)
+    t0 = time.perf_counter()
+    at.run()
+    times.append(time.perf_counter() - t0)
+mark('end')
+print(json.dumps({{'times': times, 'errors': [str(e.value) for e in at.exception]}}))
+"""
+
+def parse_importtime(stderr):
+    # Impor per langkah: jumlah waktu kumulatif impor level teratas, dan
+    # waktu kumulatif paket yang dipantau (hanya yang baru diimpor di langkah itu)
+    steps, current = {}, None
+    for line in stderr.splitlines():
+        if line.startswith('@@mark '):
+            current = line[len('@@mark '):]
+            steps[current] = {'import_ms': 0.0, 'packages': {}}
+            continue
+        if current is None or not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|', 2)
+        stripped = name.strip()
+        if name[1:] == name[1:].lstrip():
+            steps[current]['import_ms'] += int(cumulative) / 1000
+        if stripped in PACKAGES:
+            steps[current]['packages'][stripped] = int(cumulative) / 1000
+    steps.pop('end', None)
+    return steps
+
+def run_scenario(root, steps):
+    code = RUNNER.format(root=root, app=os.path.join(root, 'app_streamlit.py'), steps=steps)
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                         capture_output=True, text=True, cwd=root)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr[-2000:])
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result['imports'] = parse_importtime(out.stderr)
+    return result
+
+def checkout(ref):
+    # Salinan pohon pada revisi lain (tanpa mengubah working tree)
+    tree = tempfile.mkdtemp(prefix='bench_startup_')
+    archive = subprocess.run(['git', 'archive', ref], cwd=project_root, capture_output=True, check=True)
+    subprocess.run(['tar', '-x', '-C', tree], input=archive.stdout, check=True)
+    for rel in SHARED_PATHS:
+        shutil.rmtree(os.path.join(tree, rel), ignore_errors=True)
+        os.makedirs(os.path.dirname(os.path.join(tree, rel)), exist_ok=True)
+        os.symlink(os.path.join(project_root, rel), os.path.join(tree, rel))
+    return tree
+
+def measure(root, repeat):
+    results = {}
+    for name, steps in SCENARIOS.items():
+        runs = [run_scenario(root, steps) for _ in range(repeat)]
+        best = min(runs, key=lambda r: r['times'][-1])
+        last = (steps or ['render'])[-1]
+        results[name] = {
+            'seconds': best['times'][-1],
+            'render_s': best['times'][0],
+            'import_ms': best['imports'].get(last, {}).get('import_ms', 0.0),
+            'packages': best['imports'].get(last, {}).get('packages', {}),
+            'errors': best['errors'],
+        }
+    return results
+
+def print_results(label, results):
+    print(f"-- {label}")
+    print(f"{'skenario':<20}{'detik':>8}{'impor ms':>10}  paket baru diimpor")
+    for name, r in results.items():
+        packages = ', '.join(f"{p} {ms:.0f}" for p, ms in sorted(r['packages'].items(), key=lambda x: -x[1]))
+        print(f"{name:<20}{r['seconds']:>8.3f}{r['import_ms']:>10.0f}  {packages or '-'}")
+        for error in r['errors']:
+            print(f"{'':<20}error: {error[:120]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Waktu cold start app_streamlit.py per halaman, dengan -X importtime")
+    parser.add_argument('--ref', help='bandingkan dengan revisi git lain, mis. HEAD~1')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='simpan hasil sebagai JSON')
+    args = parser.parse_args()
+
+    report = {'working tree': measure(project_root, args.repeat)}
+    if args.ref:
+        tree = checkout(args.ref)
+        try:
+            report[args.ref] = measure(tree, args.repeat)
+        finally:
+            shutil.rmtree(tree, ignore_errors=True)
+
+    for label, results in reversed(list(report.items())):
+        print_results(label, results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from Dataset.preprocessing import output_file
+
+# Setiap skenario dijalankan di proses baru agar waktu muat dan memori
+# tidak terpengaruh objek yang sudah ada di proses benchmark.
+SCENARIOS = {
+    "csv": """
+df = pd.read_csv(CSV)
+df['Date'] = pd.to_datetime(df['Date'])
+""",
+    "csv (app awal)": """
+df = pd.read_csv(CSV)
+df['Date'] = pd.to_datetime(df['Date'])
+df = df.sort_values('Date')
+""",
+    "store (semua kolom)": """
+df = load_store()
+""",
+    "store (kolom app)": """
+df = load_store(columns=['Date', 'Bulan', 'Kabupaten', 'Curah_Hujan'])
+""",
+    "store (kolom training)": """
+df = load_store(columns=['Date', 'Bulan', 'Tanggal', 'Kabupaten', 'Curah_Hujan'])
+""",
+}
+
+RUNNER = """
+import sys, time, json, resource
+sys.path.insert(0, {root!r})
+import pandas as pd
+from Dataset.store import load_store
+CSV = {csv!r}
+
+def rss_kb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+before = rss_kb()
+t0 = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{
+    "seconds": elapsed,
+    "rows": len(df),
+    "rss_mb": (rss_kb() - before) / 1024,
+    "frame_mb": df.memory_usage(deep=True).sum() / 2**20,
+}}))
+"""
+
+
+def run_scenario(body):
+    code = RUNNER.format(root=project_root, csv=output_file, body=body)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandingkan waktu muat CSV dengan store kolumnar")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'skenario':<24}{'waktu (s)':>10}{'RSS +MB':>10}{'frame MB':>10}{'baris':>10}")
+    for name, body in SCENARIOS.items():
+        results = [run_scenario(body) for _ in range(args.repeat)]
+        best = min(results, key=lambda r: r["seconds"])
+        print(f"{name:<24}{best['seconds']:>10.3f}{best['rss_mb']:>10.1f}"
+              f"{best['frame_mb']:>10.1f}{best['rows']:>10}")
+
+
+if __name__ == "__main__":
+    main()
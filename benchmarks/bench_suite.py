@@ -0,0 +1,266 @@
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+default_output = os.path.join(project_root, 'benchmarks', 'suite_latest.json')
+default_baseline = os.path.join(project_root, 'benchmarks', 'suite_baseline.json')
+
+SCALES = [1, 10, 100]
+# Urutan penting: setiap tahap membaca hasil tahap yang menjadi dependensinya dari workdir
+STAGES = ['preprocess', 'lag_features', 'training', 'forecast_single', 'forecast_5day', 'eda']
+DEPENDS = {
+    'lag_features': 'preprocess',
+    'training': 'lag_features',
+    'forecast_single': 'training',
+    'forecast_5day': 'training',
+    'eda': 'preprocess',
+}
+TRAIN_TREES = 20
+# Di atas batas ini data latih diambil sampelnya (sebelum frame latih dibangun)
+# agar skala 100x muat di memori
+MAX_TRAIN_ROWS = 2_000_000
+FORECAST_REPEAT = 20
+PDF_PAGES = 40
+REGRESSION_RATIO = 1.25
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# ---------------------------------------------------------------------------
+# Tahap. Setiap fungsi dijalankan di proses sendiri dan mengembalikan
+# (jumlah item, satuan, info tambahan); waktu dan memori diukur oleh runner.
+# Jika info berisi 'timed_s', waktu itu yang dipakai (tanpa waktu persiapan).
+# ---------------------------------------------------------------------------
+
+def stage_pdf_parse(workdir, args):
+    import pdfplumber
+    from Dataset.extract import find_pdfs, parse_page
+    pdfs = [path for path, _, _ in find_pdfs()]
+    pages = 0
+    for pdf_path in pdfs:
+        with pdfplumber.open(pdf_path) as pdf:
+            for page in pdf.pages[:args.pdf_pages - pages]:
+                parse_page(page)
+                page.close()
+                pages += 1
+        if pages >= args.pdf_pages:
+            break
+    return pages, 'halaman', {}
+
+def stage_preprocess(workdir, args):
+    import pandas as pd
+    from Dataset.preprocessing import finalize, melt_file
+    from Dataset.store import write_store
+    parts = []
+    for path in sorted(glob.glob(os.path.join(workdir, 'raw', '*', '*.csv'))):
+        parts.append(melt_file(path, int(os.path.basename(os.path.dirname(path)))))
+    df = finalize(pd.concat(parts, ignore_index=True))
+    write_store(df, rebuild=True, path=os.path.join(workdir, 'store'))
+    return len(df), 'baris', {}
+
+def stage_lag_features(workdir, args):
+    from Dataset.store import load_store
+    from app.modelling.features import build_lag_table, save_lag_table
+    df = load_store(columns=['Date', 'Kabupaten', 'Curah_Hujan'], path=os.path.join(workdir, 'store'))
+    table = build_lag_table(df)
+    save_lag_table(table, os.path.join(workdir, 'lag_features.pkl'))
+    return len(df), 'baris', {'lag_rows': len(table)}
+
+def stage_training(workdir, args):
+    import joblib
+    from app.modelling.backends import get_backend
+    from app.modelling.features import FEATURE_COLUMNS
+    from Dataset.store import read_meta
+    from app.modelling.training import load_training_frame, upsample
+    # Sampel diambil sebelum frame latih dibangun (lihat load_training_frame);
+    # setelah upsampling jumlah baris dibatasi lagi ke max_train_rows
+    store = os.path.join(workdir, 'store')
+    df, mapping = load_training_frame(store, os.path.join(workdir, 'lag_features.pkl'), max_rows=args.max_train_rows)
+    train = upsample(df)
+    sampled = sum(read_meta(store)['partitions'].values()) > args.max_train_rows or len(train) > args.max_train_rows
+    if len(train) > args.max_train_rows:
+        train = train.sample(n=args.max_train_rows, random_state=42)
+    model = get_backend('rf').make({'n_estimators': args.train_trees}, n_jobs=-1)
+    model.fit(train[FEATURE_COLUMNS], train['Label'])
+    model.set_params(n_jobs=None)
+    joblib.dump({'model': model, 'kabupaten_mapping': mapping}, os.path.join(workdir, 'model.pkl'))
+    return len(train), 'baris', {'trees': args.train_trees, 'sampled': sampled}
+
+def forecast_stage(workdir, args, horizon):
+    import joblib
+    import numpy as np
+    import pandas as pd
+    from Dataset.store import load_store
+    from app.forecast import build_lookup, forecast_days
+    t0 = time.perf_counter()
+    saved = joblib.load(os.path.join(workdir, 'model.pkl'))
+    df = load_store(columns=['Date', 'Bulan', 'Kabupaten', 'Curah_Hujan'], path=os.path.join(workdir, 'store'))
+    lookup = build_lookup(df)
+    setup = time.perf_counter() - t0
+
+    kabupaten = saved['kabupaten_mapping'][0]
+    start = df['Date'].max() - pd.Timedelta(days=10)
+    latencies = []
+    for _ in range(args.forecast_repeat):
+        t0 = time.perf_counter()
+        forecast_days(saved['model'], lookup, kabupaten, 0, start, horizon)
+        latencies.append(time.perf_counter() - t0)
+    return args.forecast_repeat, 'ramalan', {
+        'timed_s': float(sum(latencies)),
+        'setup_s': setup,
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p99_ms': float(np.percentile(latencies, 99) * 1000),
+    }
+
+def stage_forecast_single(workdir, args):
+    return forecast_stage(workdir, args, 0)
+
+def stage_forecast_5day(workdir, args):
+    return forecast_stage(workdir, args, 5)
+
+def stage_eda(workdir, args):
+    # Waktu tahap = membangun cube dari store (sekali per perubahan data);
+    # ringkasan yang digambar halaman EDA dicatat terpisah sebagai summary_ms
+    from Dataset.eda_cube import build_cube, page_summary
+    cube = build_cube(os.path.join(workdir, 'store'))
+    t0 = time.perf_counter()
+    page_summary(cube)
+    return cube['rows'], 'baris', {'summary_ms': (time.perf_counter() - t0) * 1000, 'cube_cells': len(cube['cells'])}
+
+# ---------------------------------------------------------------------------
+
+def run_stage(name, workdir, args):
+    before = rss_mb()
+    t0 = time.perf_counter()
+    items, unit, extra = globals()[f"stage_{name}"](workdir, args)
+    seconds = extra.pop('timed_s', time.perf_counter() - t0)
+    return {
+        'seconds': seconds,
+        'items': items,
+        'unit': unit,
+        'throughput': items / seconds if seconds > 0 else None,
+        'peak_rss_mb': rss_mb(),
+        'import_rss_mb': before,
+        **extra,
+    }
+
+def spawn_stage(name, workdir, args):
+    cmd = [sys.executable, os.path.abspath(__file__), '--stage', name, '--workdir', workdir,
+           '--train-trees', str(args.train_trees), '--max-train-rows', str(args.max_train_rows),
+           '--forecast-repeat', str(args.forecast_repeat), '--pdf-pages', str(args.pdf_pages)]
+    out = subprocess.run(cmd, capture_output=True, text=True)
+    if out.returncode == -9:
+        return {'error': "dihentikan (SIGKILL), kemungkinan kehabisan memori"}
+    if out.returncode != 0:
+        return {'error': out.stderr.strip().splitlines()[-1] if out.stderr.strip() else f"exit {out.returncode}"}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def compare(results, baseline, ratio=REGRESSION_RATIO):
+    # Regresi: waktu atau puncak memori lebih dari `ratio` kali baseline
+    regressions = []
+    for key, current in results['stages'].items():
+        old = baseline.get('stages', {}).get(key)
+        if not old or 'error' in old or 'error' in current:
+            continue
+        for metric in ('seconds', 'peak_rss_mb'):
+            if old[metric] and current[metric] / old[metric] > ratio:
+                regressions.append((key, metric, old[metric], current[metric]))
+    return regressions
+
+def print_row(key, r, old=None):
+    if 'error' in r:
+        print(f"{key:<24} ERROR {r['error']}")
+        return
+    delta = f"{r['seconds'] / old['seconds']:>7.2f}x" if old and 'error' not in old and old['seconds'] else f"{'-':>8}"
+    tput = f"{r['throughput']:,.0f} {r['unit']}/s" if r['throughput'] else '-'
+    print(f"{key:<24}{r['seconds']:>9.3f}{delta}{r['peak_rss_mb']:>9.0f}  {tput}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end dengan data sintetis 1x/10x/100x")
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES)
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+    parser.add_argument('--no-pdf', action='store_true', help='lewati tahap parsing PDF')
+    parser.add_argument('--train-trees', type=int, default=TRAIN_TREES)
+    parser.add_argument('--max-train-rows', type=int, default=MAX_TRAIN_ROWS)
+    parser.add_argument('--forecast-repeat', type=int, default=FORECAST_REPEAT)
+    parser.add_argument('--pdf-pages', type=int, default=PDF_PAGES)
+    parser.add_argument('--output', default=default_output)
+    parser.add_argument('--baseline', default=default_baseline)
+    parser.add_argument('--save-baseline', action='store_true', help='simpan hasil sebagai baseline baru')
+    parser.add_argument('--keep', action='store_true', help='jangan hapus workdir sintetis')
+    parser.add_argument('--stage', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        print(json.dumps(run_stage(args.stage, args.workdir, args)))
+        return 0
+
+    from benchmarks.synthetic import generate
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {'train_trees': args.train_trees, 'max_train_rows': args.max_train_rows, 'forecast_repeat': args.forecast_repeat, 'pdf_pages': args.pdf_pages},
+        'stages': {},
+    }
+    print(f"{'tahap':<24}{'detik':>9}{'vs base':>8}{'RSS MB':>9}  throughput")
+
+    if not args.no_pdf:
+        key = 'pdf_parse'
+        results['stages'][key] = spawn_stage('pdf_parse', project_root, args)
+        print_row(key, results['stages'][key], baseline.get('stages', {}).get(key))
+
+    for scale in args.scales:
+        workdir = tempfile.mkdtemp(prefix=f'bench_{scale}x_')
+        try:
+            t0 = time.perf_counter()
+            station_rows = generate(os.path.join(workdir, 'raw'), scale)
+            print(f"-- skala {scale}x: {station_rows} baris stasiun dibuat dalam {time.perf_counter() - t0:.1f} detik")
+            failed = set()
+            for stage in args.stages:
+                key = f"{stage}@{scale}x"
+                if DEPENDS.get(stage) in failed:
+                    failed.add(stage)
+                    results['stages'][key] = {'error': f"dilewati, {DEPENDS[stage]} gagal"}
+                else:
+                    results['stages'][key] = spawn_stage(stage, workdir, args)
+                    if 'error' in results['stages'][key]:
+                        failed.add(stage)
+                print_row(key, results['stages'][key], baseline.get('stages', {}).get(key))
+        finally:
+            if args.keep:
+                print(f"   workdir: {workdir}")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Hasil: {args.output}")
+
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Baseline disimpan: {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline)
+    for key, metric, old, new in regressions:
+        print(f"REGRESI {key} {metric}: {old:.3f} -> {new:.3f}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
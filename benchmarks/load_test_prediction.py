@@ -0,0 +1,79 @@
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from datetime import date, timedelta
+
+
+async def request(reader, writer, host, path):
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    status = (await reader.readline()).split()[1]
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        key, _, value = line.decode().partition(":")
+        if key.lower() == "content-length":
+            length = int(value)
+    body = await reader.readexactly(length)
+    return int(status), json.loads(body)
+
+
+async def worker(host, port, paths, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for path in paths:
+            t0 = time.perf_counter()
+            status, _ = await request(reader, writer, host, path)
+            latencies.append(time.perf_counter() - t0)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def main(args):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    _, kabupaten = await request(reader, writer, args.host, "/kabupaten")
+    writer.close()
+
+    rng = random.Random(42)
+    start = date.fromisoformat(args.start)
+    paths = [
+        f"/predict?tanggal={start + timedelta(days=rng.randrange(args.span))}"
+        f"&kabupaten={rng.choice(kabupaten).replace(' ', '%20')}"
+        for _ in range(args.requests)
+    ]
+    per_conn = [paths[i::args.concurrency] for i in range(args.concurrency)]
+
+    latencies, errors = [], []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(args.host, args.port, p, latencies, errors) for p in per_conn))
+    elapsed = time.perf_counter() - t0
+
+    ms = sorted(x * 1000 for x in latencies)
+    print(f"{len(ms)} permintaan, {args.concurrency} koneksi, {elapsed:.2f} s "
+          f"-> {len(ms) / elapsed:.0f} req/s, {len(errors)} error")
+    print(f"latensi klien: p50={statistics.median(ms):.1f} ms "
+          f"p99={ms[int(0.99 * (len(ms) - 1))]:.1f} ms maks={ms[-1]:.1f} ms")
+
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    _, metrics = await request(reader, writer, args.host, "/metrics")
+    writer.close()
+    print("metrik server:", json.dumps(metrics, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Uji beban layanan prediksi (app/prediction.py)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--start", default="2024-01-01", help="tanggal awal acak")
+    parser.add_argument("--span", type=int, default=400, help="rentang hari acak")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,58 @@
+import os
+import sys
+import glob
+import argparse
+
+import numpy as np
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from Dataset.preprocessing import month_map, raw_data_path
+
+# Data sintetis dibuat dari CSV asli di Dataset/Output. Replika ke-k (k > 0)
+# mendapat nama pos dan kabupaten baru (seperti provinsi tambahan), dan
+# curah hujan yang tidak nol dikalikan noise lognormal. Pola hari kering
+# dan hari kosong tetap sama dengan data asli.
+
+def template_files(source=raw_data_path):
+    files = []
+    for path in sorted(glob.glob(os.path.join(source, '*', '*.csv'))):
+        year = os.path.basename(os.path.dirname(path))
+        if year.isdigit():
+            files.append((year, os.path.basename(path), pd.read_csv(path)))
+    return files
+
+def replicate(df, k, rng):
+    out = df.copy()
+    if k > 0:
+        for column in ('Nama Pos', 'Kabupaten'):
+            out[column] = out[column].astype(str) + f" #{k}"
+    months = [m for m in month_map if m in out.columns]
+    values = np.array(out[months], dtype=np.float64)
+    wet = values > 0
+    noise = rng.lognormal(mean=0.0, sigma=0.3, size=values.shape)
+    values[wet] = np.round(values[wet] * noise[wet], 1)
+    out[months] = values
+    return out
+
+def generate(output, scale, seed=42, source=raw_data_path):
+    # Satu CSV per (tahun, file asli), berisi semua replika
+    rng = np.random.default_rng(seed)
+    rows = 0
+    for year, name, df in template_files(source):
+        os.makedirs(os.path.join(output, year), exist_ok=True)
+        parts = [replicate(df, k, rng) for k in range(scale)]
+        merged = pd.concat(parts, ignore_index=True)
+        merged.to_csv(os.path.join(output, year, name), index=False)
+        rows += len(merged)
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Buat CSV stasiun sintetis (format Dataset/Output) pada skala N x")
+    parser.add_argument("output")
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(f"{generate(args.output, args.scale, args.seed)} baris stasiun -> {args.output}")